@@ -1,9 +1,13 @@
 import json
 import os
-import re
-import polib
 import glob
-from tkinter import filedialog, messagebox
+import hashlib
+import concurrent.futures
+import heapq
+import po_stream
+import localization_tool
+import translation_memory
+import key_categories
 
 def format_po_string(text):
 	"""Форматирует текст для записи в PO-файл, экранируя спецсимволы."""
@@ -13,85 +17,74 @@ def format_po_string(text):
 	text = text.replace('\n', '\\n')
 	return text
 
-def get_po_file(po_path):
-	"""Создает новый PO-файл с стандартным заголовком."""
-	po = polib.POFile()
-	po.metadata = {
-		'Project-Id-Version': 'Aion2 Localization',
-		'Report-Msgid-Bugs-To': '',
-		'POT-Creation-Date': '2025-01-01 00:00+0000',
-		'PO-Revision-Date': 'YEAR-MO-DA HO:MI+ZONE',
-		'Last-Translator': 'FULL NAME <EMAIL@ADDRESS>',
-		'Language-Team': 'Russian',
-		'Language': 'ru',
-		'MIME-Version': '1.0',
-		'Content-Type': 'text/plain; charset=UTF-8',
-		'Content-Transfer-Encoding': '8bit',
-	}
-	return po
-def categorize_and_export_po(input_json_path, output_dir="po_categories", separator='_'):
+# Стандартный заголовок (metadata) новых PO-файлов
+PO_METADATA = {
+	'Project-Id-Version': 'Aion2 Localization',
+	'Report-Msgid-Bugs-To': '',
+	'POT-Creation-Date': '2025-01-01 00:00+0000',
+	'PO-Revision-Date': 'YEAR-MO-DA HO:MI+ZONE',
+	'Last-Translator': 'FULL NAME <EMAIL@ADDRESS>',
+	'Language-Team': 'Russian',
+	'Language': 'ru',
+	'MIME-Version': '1.0',
+	'Content-Type': 'text/plain; charset=UTF-8',
+	'Content-Transfer-Encoding': '8bit',
+}
+
+# Отчет о дубликатах msgctxt при объединении категорий
+COMBINE_DUPLICATES_REPORT = "combine_duplicates.json"
+
+# Правила категорий и классификатор Key - в key_categories.py
+CATEGORY_RULES_FILE = key_categories.CATEGORY_RULES_FILE
+CategoryClassifier = key_categories.CategoryClassifier
+
+# Файл с хешами категорий для синхронизации (хранится в директории категорий)
+SYNC_STATE_FILE = ".po_sync_state.json"
+# Подпапка, куда переносятся .po исчезнувших категорий
+OBSOLETE_DIR = "obsolete"
+# Индекс памяти переводов по директории категорий
+TRANSLATION_MEMORY_FILE = ".translation_memory.tm"
+
+def categorize_records(data, separator='_', rules_path=CATEGORY_RULES_FILE):
+	"""Раскладывает записи JSON по категориям: {префикс: [записи]} в исходном порядке."""
+	classify = CategoryClassifier.from_rules(rules_path, separator).classify
+	categories = {}
+	
+	for item in data:
+		prefix = classify(item.get('Key', ''))
+		
+		# Добавляем элемент в соответствующую категорию
+		if prefix not in categories:
+			categories[prefix] = []
+		
+		categories[prefix].append(item)
+	return categories
+
+def categorize_and_export_po(input_json_path, output_dir="po_categories", separator='_', workers=None):
 	"""
 	Группирует записи из JSON по заданному сложному списку префиксов 
 	и экспортирует каждую группу в отдельный .po файл.
+	Файлы создаются заново; для обновления после патча игры (с сохранением
+	переводов) используйте sync_po_categories.
+	Файлы пишутся параллельно пулом из workers процессов (по умолчанию - по числу ядер).
 	"""
 	
-	# ПОЛНЫЙ И ОЧИЩЕННЫЙ СПИСОК ИСКЛЮЧЕНИЙ
-	# NOTE: Исключения упорядочены по длине, чтобы при поиске совпадал максимально длинный префикс.
-	EXCEPTIONS = [
-		"SkillString_STR_SKILL_PC_ASSASSIN", "SkillString_STR_SKILL_PC_CHANTER",
-		"SkillString_STR_SKILL_PC_CLERIC", "SkillString_STR_SKILL_PC_ELEMENTALIST",
-		"SkillString_STR_SKILL_PC_GLADIATOR", "SkillString_STR_SKILL_PC_RANGER",
-		"SkillString_STR_SKILL_PC_SORCERER", "SkillString_STR_SKILL_PC_TEMPLAR",
-		"SkillAbnormalString", "SkillCondString", "SkillString", 
-		"AchievementString", "AnonymousNameData", "CurrencyInfo", "CutsceneSubtitle", 
-		"EnvObjData", "EventContentsString", "GatherSkill", "NpcTalk",
-		"GuideData", "InputKeyMapping", "InputKeyText", "InventoryFilter", 
-		"NoteData", "PackageList", "Post", "QuestPart", "QuestString", "ServerName",
-		"SkinMaterial", "SkinSet", "String_AttrStatName", "String_StatName", 
-		"String_STR", "String_UI", "TeleportArtifact", "TitleCategory", 
-		"Message", "PcSocialAction", "Tag", "Title", "TradeTab", "Wing", "Skin", "String"
-	]
-	
-	# 1. Сортировка исключений по убыванию длины для поиска максимально длинного префикса
-	EXCEPTIONS.sort(key=len, reverse=True)
-	
-	# 2. Загрузка данных из JSON
+	# 1. Загрузка данных из JSON (повторно - из кеша разбора)
 	try:
-		with open(input_json_path, 'r', encoding='utf-8') as f:
-			data = json.load(f)
+		data = localization_tool.RecordTable.load_json(input_json_path)
 	except Exception as e:
 		print(f"❌ Ошибка при загрузке JSON: {e}")
 		return
 	
-	# 3. Создание шаблона поиска префиксов (для всех исключений)
-	# Шаблон: ^(ДлинныйПрефикс|КороткийПрефикс)(_ или конец строки)
-	prefix_search_pattern = r"^(" + "|".join(re.escape(p) for p in EXCEPTIONS) + r")(?:" + re.escape(separator) + r"|$)"
-	
-	# 4. Категоризация данных
-	categories = {}
-	
+	# 2. Категоризация данных
 	print(f"🔄 Начат анализ {len(data)} записей...")
+	try:
+		categories = categorize_records(data, separator)
+	except Exception as e:
+		print(f"❌ Ошибка при загрузке правил категорий {CATEGORY_RULES_FILE}: {e}")
+		return
 	
-	for item in data:
-		key = item.get('Key', '')
-		
-		# 4.1. Поиск совпадения с исключением (максимально длинным)
-		match = re.match(prefix_search_pattern, key)
-		
-		if match:
-			prefix = match.group(1) # Берем совпавший префикс (Message_MSG, SkillString_STR_SKILL_PC_ASSASSIN и т.д.)
-		else:
-			# 4.2. Стандартное правило: первые 3 элемента
-			key_parts = key.split(separator)
-			prefix = separator.join(key_parts[:3]) if len(key_parts) >= 3 else f"UNCATEGORIZED_{key}"
-			
-		# 4.3. Добавляем элемент в соответствующую категорию
-		if prefix not in categories:
-			categories[prefix] = []
-		
-		categories[prefix].append(item)
-	
-	# 5. Экспорт каждой категории в отдельный PO-файл
+	# 3. Экспорт каждой категории в отдельный PO-файл
 	
 	if not os.path.exists(output_dir):
 		os.makedirs(output_dir)
@@ -101,124 +94,357 @@ def categorize_and_export_po(input_json_path, output_dir="po_categories", separa
 	
 	print(f"✅ Найдено {len(categories)} уникальных категорий. Начало экспорта...")
 	
+	workers = workers or os.cpu_count() or 1
+	executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+	submit = executor.submit if executor is not None else _run_now
+	try:
+		jobs = []
+		for prefix, items in categories.items():
+			output_filename = os.path.join(output_dir, f"{prefix}.po")
+			
+			# Записи передаются кортежами (msgctxt, msgid, msgstr) и пишутся потоково.
+			# Если Russian_value пуст, msgstr будет пустым, что стандартно для PO.
+			entries = [
+				(item.get('Key', ''), item.get('Value', ''), item.get('Russian_Value', ''))
+				for item in items
+			]
+			jobs.append((output_filename, len(items), submit(po_stream.write_po, output_filename, entries, PO_METADATA)))
+		
+		# Результаты собираются в порядке категорий
+		for output_filename, item_count, job in jobs:
+			try:
+				total_entries += job.result()
+				exported_count += 1
+				print(f"   -> Экспортировано {item_count} записей в: {os.path.basename(output_filename)}")
+			except Exception as e:
+				print(f"❌ Ошибка при экспорте PO-файла {output_filename}: {e}")
+	finally:
+		if executor is not None:
+			executor.shutdown()
+	
+	print(f"\n🎉 Категоризация завершена. Создано {exported_count} файлов ({total_entries} записей) в '{output_dir}'.")
+
+def _run_now(function, *args):
+	"""Выполняет функцию сразу и возвращает Future с результатом (режим без пула)."""
+	future = concurrent.futures.Future()
+	try:
+		future.set_result(function(*args))
+	except Exception as e:
+		future.set_exception(e)
+	return future
+
+def _category_source_hash(items):
+	"""Хеш исходных данных категории (Key и Value в порядке JSON)."""
+	digest = hashlib.sha256()
+	for item in items:
+		digest.update(json.dumps([item.get('Key', ''), item.get('Value', '')], ensure_ascii=False).encode('utf-8'))
+		digest.update(b'\n')
+	return digest.hexdigest()
+
+def _po_file_signature(po_path):
+	"""[размер, mtime] PO-файла или None, если файла нет."""
+	try:
+		stat = os.stat(po_path)
+	except FileNotFoundError:
+		return None
+	return [stat.st_size, stat.st_mtime_ns]
+
+def _load_sync_state(state_path):
+	try:
+		with open(state_path, 'r', encoding='utf-8') as f:
+			return json.load(f).get('categories', {})
+	except (FileNotFoundError, ValueError):
+		return {}
+
+def _save_sync_state(state_path, categories):
+	temp_path = state_path + ".tmp"
+	with open(temp_path, 'w', encoding='utf-8') as f:
+		json.dump({'version': 1, 'categories': categories}, f, ensure_ascii=False, indent=1, sort_keys=True)
+	os.replace(temp_path, state_path)
+
+def sync_po_categories(input_json_path, output_dir="po_categories", separator='_', use_memory=True):
+	"""
+	Синхронизирует директорию категорий с новым JSON (после патча игры).
+	
+	Для каждой категории хранится хеш исходных данных (Key + Value) и размер/mtime
+	ее .po файла. Если хеш не изменился и файл никто не трогал, категория
+	пропускается без чтения. Иначе записи сливаются как в update_po_from_json:
+	INSERT, UPDATE (fuzzy + "(OLD TRANSLATION: ...)") и DELETE. Файл перезаписывается,
+	только если его записи действительно изменились. Файлы исчезнувших категорий
+	переносятся в подпапку obsolete/; трогаются только файлы, которые прошлая
+	синхронизация записала в SYNC_STATE_FILE, остальные .po в директории не меняются.
+	При use_memory новые и измененные строки без перевода получают fuzzy-подсказку
+	из памяти переводов, построенной по всем категориям.
+	"""
+	
+	# 1. Загрузка данных из JSON (повторно - из кеша разбора)
+	try:
+		data = localization_tool.RecordTable.load_json(input_json_path)
+	except Exception as e:
+		print(f"❌ Ошибка при загрузке JSON: {e}")
+		return
+	
+	# 2. Категоризация данных
+	print(f"🔄 Начат анализ {len(data)} записей...")
+	try:
+		categories = categorize_records(data, separator)
+	except Exception as e:
+		print(f"❌ Ошибка при загрузке правил категорий {CATEGORY_RULES_FILE}: {e}")
+		return
+	
+	os.makedirs(output_dir, exist_ok=True)
+	state_path = os.path.join(output_dir, SYNC_STATE_FILE)
+	old_state = _load_sync_state(state_path)
+	new_state = {}
+	memory = None
+	if use_memory:
+		memory = translation_memory.load_translation_memory([output_dir], os.path.join(output_dir, TRANSLATION_MEMORY_FILE))
+	
+	unchanged_count = 0
+	rewritten_count = 0
+	totals = {'updated': 0, 'inserted': 0, 'skipped': 0, 'deleted': 0, 'suggested': 0}
+	
+	print(f"✅ Найдено {len(categories)} категорий. Начало синхронизации...")
+	
+	# 3. Слияние категорий, у которых изменились исходные данные или сам файл
 	for prefix, items in categories.items():
 		output_filename = os.path.join(output_dir, f"{prefix}.po")
+		source_hash = _category_source_hash(items)
+		signature = _po_file_signature(output_filename)
+		previous = old_state.get(prefix)
 		
-		po = get_po_file(output_filename) # Создаем новый PO-файл
+		if signature is not None and previous and previous.get('source') == source_hash and previous.get('file') == signature:
+			new_state[prefix] = previous
+			unchanged_count += 1
+			continue
 		
-		for item in items:
-			# Создаем новую запись polib.POEntry
+		try:
+			if signature is not None:
+				existing_entries, metadata, header, metadata_is_fuzzy = localization_tool.read_po_cached(output_filename)
+				metadata = metadata or PO_METADATA
+			else:
+				existing_entries, header, metadata, metadata_is_fuzzy = [], '', PO_METADATA, False
 			
-			# Если Russian_value пуст, msgstr будет пустым, что стандартно для PO.
-			new_entry = polib.POEntry(
-				msgctxt=item.get('Key', ''),
-				msgid=item.get('Value', ''),
-				msgstr=item.get('Russian_Value', '')
-			)
-			po.append(new_entry)
-			total_entries += 1
+			records = ((item.get('Key', ''), item.get('Value', ''), item.get('Russian_Value', '')) for item in items)
+			new_entries, stats = localization_tool.merge_po_entries(existing_entries, records, memory)
+			
+			if signature is None or localization_tool.po_entries_changed(existing_entries, new_entries):
+				po_stream.write_po(output_filename, new_entries, metadata, header, metadata_is_fuzzy)
+				rewritten_count += 1
+				print(f"   -> {os.path.basename(output_filename)}: +{stats['inserted']} ~{stats['updated']} -{stats['deleted']}")
+			else:
+				unchanged_count += 1
+			
+			for name, value in stats.items():
+				totals[name] += value
+		except Exception as e:
+			print(f"❌ Ошибка при синхронизации PO-файла {output_filename}: {e}")
+			continue
 		
+		new_state[prefix] = {'source': source_hash, 'file': _po_file_signature(output_filename)}
+	
+	# 4. Файлы категорий, которых больше нет в JSON, уходят в obsolete/
+	#    (переводы из них остаются в памяти переводов)
+	removed_count = 0
+	obsolete_dir = os.path.join(output_dir, OBSOLETE_DIR)
+	for prefix in old_state:
+		po_path = os.path.join(output_dir, f"{prefix}.po")
+		if prefix in categories or not os.path.exists(po_path):
+			continue
 		try:
-			po.save(output_filename)
-			exported_count += 1
-			print(f"   -> Экспортировано {len(items)} записей в: {os.path.basename(output_filename)}")
-		except Exception as e:
-			print(f"❌ Ошибка при экспорте PO-файла {output_filename}: {e}")
+			os.makedirs(obsolete_dir, exist_ok=True)
+			os.replace(po_path, os.path.join(obsolete_dir, f"{prefix}.po"))
+			removed_count += 1
+			print(f"   📦 Категория перенесена в {OBSOLETE_DIR}/: {prefix}.po")
+		except OSError as e:
+			print(f"❌ Не удалось перенести {po_path}: {e}")
 	
-	print(f"\n🎉 Категоризация завершена. Создано {exported_count} файлов ({total_entries} записей) в '{output_dir}'.")
+	_save_sync_state(state_path, new_state)
 	
-def combine_po_files(input_directory, output_file_path):
+	print("\n--- Результат синхронизации ---")
+	print(f"🎉 Перезаписано файлов: {rewritten_count}, без изменений: {unchanged_count}, перенесено в {OBSOLETE_DIR}/: {removed_count}")
+	print(f"🔄 Обновлено записей (Value отличался): {totals['updated']}")
+	print(f"➕ Добавлено новых записей (INSERT): {totals['inserted']}")
+	print(f"🗑️ Удалено старых/лишних записей: {totals['deleted']}")
+	print(f"💡 Подсказок из памяти переводов (fuzzy): {totals['suggested']}")
+	
+def _notify(kind, title, message, gui=False):
+	"""Сообщение в консоль и, если gui=True и tkinter доступен, в диалоговое окно."""
+	print(message)
+	if not gui:
+		return
+	try:
+		from tkinter import messagebox
+		getattr(messagebox, kind)(title, message)
+	except Exception:
+		# Без дисплея/tkinter работаем только через консоль
+		pass
+
+def _load_key_order(reference_path):
+	"""{Key: позиция} в порядке оригинального .dat (или JSON/.aionrec-выгрузки)."""
+	if reference_path.lower().endswith(('.json', localization_tool.RECORD_PACK_EXTENSION)):
+		keys = localization_tool.RecordTable.load_json(reference_path).keys
+	else:
+		keys = localization_tool._iter_dat_keys(reference_path)
+	order = {}
+	for position, key in enumerate(keys):
+		order.setdefault(key, position)
+	return order
+
+def _parse_po_part(file_path):
+	"""Разбор одного файла категории (выполняется в процессе пула, через кеш разбора)."""
+	entries, metadata, _, _ = localization_tool.read_po_cached(file_path)
+	return entries, metadata
+
+def combine_po_files(input_directory, output_file_path, reference_path=None, workers=None,
+		report_path=COMBINE_DUPLICATES_REPORT, gui=False):
 	"""
 	Находит и объединяет все .po файлы в заданной директории в один мастер-файл.
-	УВЕЛИЧЕНИЕ СКОРОСТИ: Использован Set для проверки дубликатов.
-	"""
 	
-	master_po = polib.POFile()
+	- Файлы разбираются параллельно пулом из workers процессов (по умолчанию - по числу ядер).
+	- Порядок детерминирован: если задан reference_path (оригинальный .dat или JSON),
+	  записи идут в порядке его Key (устойчивое k-way слияние отсортированных файлов),
+	  иначе - файлы по алфавиту, записи в порядке файла. Записи, которых нет в
+	  reference_path, идут в конце.
+	- При повторе msgctxt остается первая запись, остальные попадают в отчет report_path.
+	- Мастер-файл пишется потоково; диалоговые окна tkinter - только при gui=True.
+	"""
 	
-	# 1. Поиск файлов
+	# 1. Поиск файлов (сортировка - чтобы результат не зависел от порядка glob),
+	#    кроме перенесенных синхронизацией в obsolete/
 	search_pattern = os.path.join(input_directory, '**', '*.po')
-	all_files = glob.glob(search_pattern, recursive=True)
+	obsolete_dir = os.path.join(input_directory, OBSOLETE_DIR, '')
+	all_files = sorted(path for path in glob.glob(search_pattern, recursive=True) if not path.startswith(obsolete_dir))
 	
 	if not all_files:
-		messagebox.showerror("Ошибка", f"Файлы .po не найдены в директории: {input_directory}")
+		_notify('showerror', "Ошибка", f"❌ Файлы .po не найдены в директории: {input_directory}", gui)
 		return
 	
 	print(f"✅ Найдено {len(all_files)} файлов для объединения.")
-	added_entries_count = 0
 	
-	# --- ОПТИМИЗАЦИЯ СКОРОСТИ: Набор существующих контекстов ---
-	# Храним все msgctxt в наборе для проверки дубликатов за O(1)
-	existing_contexts = set()
-	# ------------------------------------------------------------
-	
-	# 2. Загрузка и объединение записей
-	for file_path in all_files:
+	key_order = {}
+	if reference_path:
 		try:
-			po_part = polib.pofile(file_path)
-			
-			# Если это первый файл, копируем его метаданные в мастер-файл
-			if not master_po.metadata:
-				master_po.metadata = po_part.metadata
-				
-			# Добавляем записи
-			for entry in po_part:
-				# Пропускаем записи-заголовки
-				if entry.msgid == '':
-					continue
-					
-				context = entry.msgctxt.strip() if entry.msgctxt else ''
-				
-				# ИСПРАВЛЕНИЕ: Проверка дубликатов с использованием Set
-				if context not in existing_contexts:
-					master_po.append(entry)
-					existing_contexts.add(context) # Добавляем новый ключ в набор
-					added_entries_count += 1
-			
-			print(f"   + Добавлено записей из: {os.path.basename(file_path)}")
-			
+			key_order = _load_key_order(reference_path)
+			print(f"📑 Порядок записей: {os.path.basename(reference_path)} ({len(key_order)} Key)")
 		except Exception as e:
-			print(f"❌ Ошибка при обработке файла {os.path.basename(file_path)}: {e}")
-			messagebox.showwarning("Ошибка файла", f"Проблема с файлом {os.path.basename(file_path)}. Пропущен.")
-			continue
+			print(f"⚠️ Не удалось прочитать порядок Key из {reference_path}: {e}. Используется порядок файлов.")
 	
-	# 3. Сохранение финального мастер-файла
-	if added_entries_count > 0:
-		try:
-			master_po.save(output_file_path)
-			messagebox.showinfo(
-				"Успех", 
-				f"Объединение завершено!\nВсего записей добавлено: {added_entries_count}"
-			)
-			print("\n--- Результат ---")
-			print(f"🎉 Объединение успешно завершено. Файл сохранен как: {output_file_path}")
-			print(f"📊 Всего записей в мастер-файле: {added_entries_count}")
-		except Exception as e:
-			messagebox.showerror("Ошибка сохранения", f"Не удалось сохранить мастер-файл: {e}")
-	else:
-		messagebox.showwarning("Предупреждение", "Не найдено ни одной записи для сохранения.")
+	# 2. Параллельная загрузка файлов
+	workers = workers or os.cpu_count() or 1
+	executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+	submit = executor.submit if executor is not None else _run_now
+	parts = []
+	try:
+		futures = [(file_path, submit(_parse_po_part, file_path)) for file_path in all_files]
+		for file_path, future in futures:
+			try:
+				entries, metadata = future.result()
+			except Exception as e:
+				_notify('showwarning', "Ошибка файла", f"❌ Ошибка при обработке файла {os.path.basename(file_path)}: {e}. Пропущен.", gui)
+				continue
+			parts.append((file_path, entries, metadata))
+			print(f"   + Загружено записей из: {os.path.basename(file_path)}")
+	finally:
+		if executor is not None:
+			executor.shutdown()
+	
+	# Метаданные мастер-файла - из первого (по алфавиту) файла
+	master_metadata = next((metadata for _, _, metadata in parts if metadata), {})
+	
+	# 3. Устойчивое k-way слияние: ключ (позиция Key в .dat, номер файла, номер записи).
+	# Внутри файла записи сортируются по тому же ключу (sorted устойчив).
+	missing_position = len(key_order)
+	streams = []
+	for file_rank, (file_path, entries, _) in enumerate(parts):
+		keyed = [
+			((key_order.get(entry.msgctxt.strip() if entry.msgctxt else '', missing_position), file_rank, index), file_path, entry)
+			for index, entry in enumerate(entries)
+		]
+		if key_order:
+			keyed.sort(key=lambda item: item[0])
+		streams.append(keyed)
+	
+	# --- ОПТИМИЗАЦИЯ СКОРОСТИ: Набор существующих контекстов ---
+	# Храним msgctxt -> (файл, запись) для проверки дубликатов за O(1)
+	existing_contexts = {}
+	duplicates = []
+	
+	def merged_entries():
+		for _, file_path, entry in heapq.merge(*streams, key=lambda item: item[0]):
+			# Пропускаем записи-заголовки
+			if entry.msgid == '':
+				continue
+			context = entry.msgctxt.strip() if entry.msgctxt else ''
+			first = existing_contexts.get(context)
+			if first is None:
+				existing_contexts[context] = (file_path, entry)
+				yield entry
+				continue
+			# Дубликат msgctxt: не теряем молча, а записываем в отчет
+			first_path, first_entry = first
+			duplicates.append({
+				'Key': context,
+				'Kept_File': os.path.basename(first_path),
+				'Dropped_File': os.path.basename(file_path),
+				'Same_Value': first_entry.msgid == entry.msgid,
+				'Same_Translation': first_entry.msgstr == entry.msgstr,
+			})
+	
+	# 4. Потоковая запись мастер-файла
+	try:
+		added_entries_count = po_stream.write_po(output_file_path, merged_entries(), master_metadata)
+	except Exception as e:
+		_notify('showerror', "Ошибка сохранения", f"❌ Не удалось сохранить мастер-файл: {e}", gui)
+		return
+	
+	if duplicates:
+		with open(report_path, 'w', encoding='utf-8') as f:
+			json.dump(duplicates, f, ensure_ascii=False, indent=2)
+		print(f"⚠️ Дубликатов msgctxt (оставлена первая запись): {len(duplicates)}. Отчет: {report_path}")
+	
+	if added_entries_count == 0:
+		os.remove(output_file_path)
+		_notify('showwarning', "Предупреждение", "⚠️ Не найдено ни одной записи для сохранения.", gui)
+		return
+	
+	print("\n--- Результат ---")
+	print(f"🎉 Объединение успешно завершено. Файл сохранен как: {output_file_path}")
+	_notify('showinfo', "Успех", f"📊 Объединение завершено! Всего записей в мастер-файле: {added_entries_count}", gui)
 
 def combine_po():
 	INPUT_DIR = "po_categories" 
 	
 	# Имя выходного мастер-файла
 	OUTPUT_MASTER_FILE = "master_localization.po"
-	combine_po_files(INPUT_DIR, OUTPUT_MASTER_FILE)
+	
+	# Оригинальный .dat (или JSON) задает порядок записей в мастер-файле
+	REFERENCE_PATH = input("Оригинальный бинарный файл для порядка записей (Enter - порядок файлов): ").strip().strip('"')
+	combine_po_files(INPUT_DIR, OUTPUT_MASTER_FILE, REFERENCE_PATH or None, gui=True)
+
+def sync_po():
+	INPUT_JSON_PATH = input("Введите путь к JSON-файлу (или .aionrec) с новыми данными: ")
+	
+	# Синхронизация директории категорий (перезаписываются только измененные файлы)
+	sync_po_categories(INPUT_JSON_PATH)
 
 def categorize_and_split_json():
 	# Ввод файла от пользователя
-	INPUT_JSON_PATH = input("Введите путь или имя JSON файла для упаковки: ")
+	INPUT_JSON_PATH = input("Введите путь или имя JSON файла (или .aionrec) для упаковки: ")
 	
 	# 1. Запуск упаковщика
 	categorize_and_export_po(INPUT_JSON_PATH)
 	
 if __name__ == '__main__':
 	print("--- ИНСТРУМЕНТ ЛОКАЛИЗАЦИИ AION2 ---")
-	mode = input("Выберите режим (1-categorize_and_split_json, 2-combine_po): ")
+	mode = input("Выберите режим (1-categorize_and_split_json, 2-combine_po, 3-sync_po): ")
 	
 	if mode == "1":
 		categorize_and_split_json()
 	elif mode =="2":
 		combine_po()
+	elif mode =="3":
+		sync_po()
 	# elif mode =="3":
 	# 	# potojson()
 	# elif mode =="4":
@@ -226,4 +452,4 @@ if __name__ == '__main__':
 	# # elif mode =="5":
 	# #     mergejson()        
 	else:
-		print("Неверный режим. Пожалуйста, введите 1, 2, 3, 4 или 5.")
\ No newline at end of file
+		print("Неверный режим. Пожалуйста, введите 1, 2 или 3.")
\ No newline at end of file
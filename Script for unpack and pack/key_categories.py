@@ -0,0 +1,59 @@
+import os
+import json
+
+# --- КАТЕГОРИИ КЛЮЧЕЙ ---
+#
+# Категория Key определяет, в какой PO-файл категорий попадает запись.
+# Классификатор общий для Create Dictionary.py и хранилища переводов.
+
+# Правила категорий (префиксы-исключения и правило по умолчанию) лежат рядом со скриптом
+CATEGORY_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "category_rules.json")
+
+class CategoryClassifier:
+    """
+    Определяет категорию Key по самому длинному префиксу-исключению.
+    
+    Префиксы хранятся в дереве (trie) по частям Key между разделителями, поэтому
+    классификация - один проход по частям Key со словарными переходами, без
+    перебора альтернатив регулярного выражения. Результат тот же, что у прежнего
+    шаблона ^(ДлинныйПрефикс|...|КороткийПрефикс)(_|$): побеждает самый длинный
+    префикс, за которым идет разделитель или конец Key. Если префикс не найден,
+    категория - первые default_parts частей Key (или UNCATEGORIZED_<Key>).
+    """
+
+    # Метка конца префикса в узле дерева (части Key - всегда строки)
+    _END = None
+
+    def __init__(self, prefixes, separator='_', default_parts=3):
+        self.separator = separator
+        self.default_parts = default_parts
+        self.root = {}
+        for prefix in prefixes:
+            node = self.root
+            for part in prefix.split(separator):
+                node = node.setdefault(part, {})
+            node[self._END] = prefix
+
+    @classmethod
+    def from_rules(cls, rules_path=CATEGORY_RULES_FILE, separator='_'):
+        """Создает классификатор из файла правил (JSON: prefixes, default_parts)."""
+        with open(rules_path, 'r', encoding='utf-8') as f:
+            rules = json.load(f)
+        return cls(rules.get('prefixes', []), separator, rules.get('default_parts', 3))
+
+    def classify(self, key):
+        key_parts = key.split(self.separator)
+        node = self.root
+        prefix = None
+        for part in key_parts:
+            node = node.get(part)
+            if node is None:
+                break
+            prefix = node.get(self._END, prefix)
+        if prefix is not None:
+            return prefix # Самый длинный совпавший префикс (Message, SkillString_STR_SKILL_PC_ASSASSIN и т.д.)
+        
+        # Стандартное правило: первые default_parts элементов
+        if len(key_parts) >= self.default_parts:
+            return self.separator.join(key_parts[:self.default_parts])
+        return f"UNCATEGORIZED_{key}"
@@ -2,40 +2,275 @@ import struct
 import json
 import os
 import binascii
+import mmap
+import array
+import sys
+import contextlib
+import hashlib
+import io
+import time
+import concurrent.futures
+import itertools
 import pandas as pd
 import csv
 import re
-import polib
+import glob
+import pickle
+import tempfile
+import zlib
+import pak_tool
+import po_stream
+import translation_memory
+
+try:
+    import zstandard # Необязательно: сжатие zstd для файлов .aionrec
+except ImportError:
+    zstandard = None
 
 # --- ОСНОВНЫЕ ФУНКЦИИ ОБРАБОТКИ ДАННЫХ ---
 
-def extract_key_value_filtered_v6_4(file_path):
+# Формат L10NString.dat: 14-байтовый заголовок, затем записи
+# [int32 длина Key][Key + терминатор][int32 длина Value][Value + терминатор].
+# Положительная длина - UTF-8 (в байтах), отрицательная - UTF-16 (в символах).
+LENGTH_FIELD_SIZE = 4
+MAX_SAFE_KEY_LENGTH = 20 * 1024
+MAX_SAFE_VALUE_LENGTH = 10 * 1024 * 1024
+
+# ФИКСИРОВАННЫЙ РАЗМЕР ЗАГОЛОВКА
+HEADER_SIZE = 14
+
+@contextlib.contextmanager
+def _open_dat_view(file_path, quiet=False):
     """
-    Извлекает пары Key-Value из бинарного файла, используя 4-байтовые поля длины.
-    Поддерживает UTF-8 и UTF-16 для Key и Value.
+    Отображает файл в память и выдаёт memoryview на его содержимое.
+    Для .pak файл локализации распаковывается из архива в память.
+    Для отсутствующего или пустого файла выдаёт None.
+    """
+    if file_path.lower().endswith('.pak'):
+        with _open_pak_dat_view(file_path, quiet) as view:
+            yield view
+        return
     
-    ДОБАВЛЕНО: Пропуск фиксированного 14-байтового заголовка файла.
+    try:
+        f = open(file_path, 'rb')
+    except FileNotFoundError:
+        print(f"Ошибка: Файл не найден по пути {file_path}")
+        yield None
+        return
+    
+    with f:
+        data_len = os.fstat(f.fileno()).st_size
+        if not quiet:
+            print(f"Размер файла: {data_len} байт ({data_len:X} HEX)")
+        
+        if data_len == 0:
+            # Пустой файл нельзя отобразить в память
+            yield None
+            return
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                yield view
+            finally:
+                # Освобождаем memoryview до закрытия mmap
+                view.release()
+
+# Число записей в одном пакете для параллельного декодирования
+DECODE_CHUNK_SIZE = 8192
+
+@contextlib.contextmanager
+def _open_pak_dat_view(pak_path, quiet=False):
+    """Распаковывает L10NString.dat из .pak блок за блоком и выдаёт memoryview на него."""
+    try:
+        data = pak_tool.read_dat_from_pak(pak_path)
+    except FileNotFoundError:
+        print(f"Ошибка: Файл не найден по пути {pak_path}")
+        data = None
+    except ValueError as e:
+        print(f"❌ Ошибка при чтении .pak: {e}")
+        data = None
+    
+    if not data:
+        yield None
+        return
+    
+    if not quiet:
+        print(f"Размер файла (распакован из {os.path.basename(pak_path)}): {len(data)} байт ({len(data):X} HEX)")
+    view = memoryview(data)
+    try:
+        yield view
+    finally:
+        view.release()
+
+def iter_records(file_path, workers=1):
     """
+    Потоково извлекает пары Key-Value из бинарного файла.
     
-    LENGTH_FIELD_SIZE = 4
-    MAX_SAFE_KEY_LENGTH = 20 * 1024 
-    MAX_SAFE_VALUE_LENGTH = 10 * 1024 * 1024 
+    Файл отображается в память (mmap) и обходится через memoryview и
+    struct.unpack_from, без чтения всего файла в bytes и без промежуточных
+    срезов. Записи выдаются по одной в том же формате, что и
+    extract_key_value_filtered_v6_4, поэтому экспорт, сравнение и
+    синхронизация PO могут обрабатывать файл в ограниченном объёме памяти.
+    Вместо .dat можно передать .pak: L10NString.dat будет распакован из него
+    в память, без извлечения на диск.
     
-    # ФИКСИРОВАННЫЙ РАЗМЕР ЗАГОЛОВКА
-    HEADER_SIZE = 14 
+    При workers > 1 разбор идёт в две фазы: быстрый последовательный проход
+    собирает только границы записей, затем пакеты границ декодируются
+    (UTF-8/UTF-16) в пуле процессов. Порядок записей сохраняется.
+    """
+    if workers > 1:
+        yield from _iter_records_parallel(file_path, workers)
+        return
     
-    extracted_data = []
+    with _open_dat_view(file_path) as data:
+        if data is None:
+            return
+        for span in _iter_record_spans(data):
+            yield _decode_record(data, span)
+
+def _iter_records_parallel(file_path, workers):
+    # Фаза 1: последовательный поиск границ записей (без декодирования строк)
+    decode_path = file_path
+    with _open_dat_view(file_path) as data:
+        if data is None:
+            return
+        spans = list(_iter_record_spans(data))
+        if file_path.lower().endswith('.pak'):
+            # .dat распаковывается из .pak один раз: процессы отображают в память
+            # временную копию, а не распаковывают архив заново на каждый пакет
+            with tempfile.NamedTemporaryFile(suffix='.dat', delete=False) as temp_file:
+                temp_file.write(data)
+            decode_path = temp_file.name
     
+    # Фаза 2: декодирование пакетов границ в пуле процессов.
+    # executor.map возвращает результаты в порядке пакетов, т.е. в порядке файла.
+    chunks = [spans[start : start + DECODE_CHUNK_SIZE] for start in range(0, len(spans), DECODE_CHUNK_SIZE)]
     try:
-        with open(file_path, 'rb') as f:
-            data = f.read()
-    except FileNotFoundError:
-        print(f"Ошибка: Файл не найден по пути {file_path}")
-        return []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_decode_span_chunk, itertools.repeat(decode_path), chunks)
+            for chunk, (keys, values) in zip(chunks, results):
+                for (_, key_length_signed, _), key, value in zip(chunk, keys, values):
+                    yield _make_record(key, value, key_length_signed)
+    finally:
+        if decode_path != file_path:
+            os.remove(decode_path)
+
+def _decode_span_chunk(file_path, spans):
+    """
+    Декодирует Key и Value для пакета границ (выполняется в дочернем процессе).
+    Возвращает два списка строк: передавать их между процессами дешевле, чем словари.
+    """
+    keys = []
+    values = []
+    with _open_dat_view(file_path, quiet=True) as data:
+        for record_start, key_length_signed, value_length_signed in spans:
+            key_data_start = record_start + LENGTH_FIELD_SIZE
+            value_data_start = key_data_start + _field_byte_length(key_length_signed)[0] + LENGTH_FIELD_SIZE
+            keys.append(_decode_string(data, key_data_start, key_length_signed))
+            values.append(_decode_string(data, value_data_start, value_length_signed))
+    return keys, values
+
+# Кандидат на начало записи: int32 длина Key в допустимом диапазоне.
+# UTF-8: 1..MAX_SAFE_KEY_LENGTH байт (старшие байты нулевые), за полем - первый байт Key.
+# UTF-16: -1..-(MAX_SAFE_KEY_LENGTH // 2) символов (старшие байты 0xFF).
+# Поиск выполняется регулярным выражением на уровне C, а не циклом по байтам.
+_UTF8_KEY_CANDIDATE = rb'[\x01-\xff][\x00-\x50]\x00\x00|\x00[\x01-\x50]\x00\x00'
+_UTF16_KEY_CANDIDATE = rb'[\x00-\xff][\xd8-\xff]\xff\xff'
+_RECORD_CANDIDATE_RE = {
+    None: re.compile(rb'(?=' + _UTF8_KEY_CANDIDATE + rb'|' + _UTF16_KEY_CANDIDATE + rb')'),
+    "UTF-8": re.compile(rb'(?=' + _UTF8_KEY_CANDIDATE + rb')'),
+    "UTF-16": re.compile(rb'(?=' + _UTF16_KEY_CANDIDATE + rb')'),
+}
+
+def _plausible_record_end(data, pos, key_data_type=None):
+    """
+    Проверяет, начинается ли в позиции pos корректная запись Key-Value.
+    Если задан key_data_type, Key должен быть в этой кодировке.
+    Возвращает позицию конца записи или None.
+    """
+    data_len = len(data)
+    
+    if pos + LENGTH_FIELD_SIZE > data_len:
+        return None
+    key_length_signed = struct.unpack_from('<i', data, pos)[0]
+    if key_length_signed >= 0:
+        key_length, terminator_len = key_length_signed, 1
+    else:
+        key_length, terminator_len = -key_length_signed * 2, 2
+    if key_length < terminator_len or key_length > MAX_SAFE_KEY_LENGTH:
+        return None
+    if key_data_type is not None and key_data_type != ("UTF-8" if terminator_len == 1 else "UTF-16"):
+        return None
+    
+    key_data_end = pos + LENGTH_FIELD_SIZE + key_length
+    if key_data_end + LENGTH_FIELD_SIZE > data_len or any(data[key_data_end - terminator_len : key_data_end]):
+        return None
+    
+    value_length_signed = struct.unpack_from('<i', data, key_data_end)[0]
+    if value_length_signed >= 0:
+        value_length, terminator_len = value_length_signed, 1
+    else:
+        value_length, terminator_len = -value_length_signed * 2, 2
+    if value_length > MAX_SAFE_VALUE_LENGTH:
+        return None
+    
+    value_data_end = key_data_end + LENGTH_FIELD_SIZE + value_length
+    if value_data_end > data_len:
+        return None
+    if value_length and any(data[value_data_end - terminator_len : value_data_end]):
+        return None
+    return value_data_end
+
+def resync_to_next_record(data, pos, key_data_type=None):
+    """
+    Находит следующую правдоподобную границу записи, начиная с pos + 1.
+    
+    Кандидаты ищутся скомпилированным регулярным выражением по полю длины Key,
+    затем проверяются терминаторы Key/Value и то, что за записью следует
+    ещё одна корректная запись (или конец файла). Пропущенный диапазон
+    выводится одной строкой на весь разрыв, а не по строке на каждый байт.
+    
+    key_data_type - кодировка Key последней корректной записи. Key и Value
+    имеют одинаковую структуру, поэтому без неё синхронизация может
+    "съехать" на пару (Value, следующий Key).
+    """
+    data_len = len(data)
+    next_pos = data_len
+    
+    for match in _RECORD_CANDIDATE_RE[key_data_type].finditer(data, pos + 1):
+        candidate = match.start()
+        record_end = _plausible_record_end(data, candidate, key_data_type)
+        if record_end is None:
+            continue
+        if record_end == data_len or _plausible_record_end(data, record_end, key_data_type) is not None:
+            next_pos = candidate
+            break
+    
+    if next_pos < data_len:
+        print(f"⚠️ Пропущено {next_pos - pos} байт нераспознанных данных ({pos:X}-{next_pos:X} HEX). Синхронизация на {next_pos:X}.")
+    else:
+        print(f"⚠️ Пропущено {data_len - pos} байт нераспознанных данных ({pos:X} HEX - конец файла).")
+    return next_pos
+
+def _field_byte_length(length_signed):
+    """Возвращает (длина данных в байтах, длина терминатора) по полю длины."""
+    if length_signed >= 0:
+        return length_signed, 1
+    return -length_signed * 2, 2
+
+def _iter_record_spans(data):
+    """
+    Обходит записи в буфере (memoryview) без декодирования строк.
+    
+    Выдаёт кортежи (смещение записи, поле длины Key, поле длины Value).
+    По ним _decode_record восстанавливает запись, а индекс (.idx) -
+    сохраняет границы записей.
+    """
     
     i = 0
     data_len = len(data)
-    print(f"Размер файла: {data_len} байт ({data_len:X} HEX)")
+    last_key_data_type = None
 
     # --- СМЕЩЕНИЕ НАЧАЛА ---
     if data_len >= HEADER_SIZE:
@@ -45,15 +280,6 @@ def extract_key_value_filtered_v6_4(file_path):
         print("Предупреждение: Файл слишком мал для заголовка. Начинаем с 0.")
     # ----------------------
 
-    def read_length_field(data_slice, signed=False):
-        if len(data_slice) < LENGTH_FIELD_SIZE:
-            return None
-        raw_length = data_slice[0:LENGTH_FIELD_SIZE]
-        if signed:
-            return struct.unpack('<i', raw_length)[0]
-        else:
-            return struct.unpack('<I', raw_length)[0]
-
     while i < data_len:
         
         # 1. Чтение 4-байтового поля длины Key
@@ -62,136 +288,1050 @@ def extract_key_value_filtered_v6_4(file_path):
 
         key_length_start = i
         
-        key_length_signed = read_length_field(data[key_length_start : key_length_start + LENGTH_FIELD_SIZE], signed=True)
+        key_length_signed = struct.unpack_from('<i', data, key_length_start)[0]
         
         key_data_start = key_length_start + LENGTH_FIELD_SIZE
         
         # --- ФИЛЬТР И ОПРЕДЕЛЕНИЕ КОДИРОВКИ KEY ---
-        key_data_type = "UTF-8" # По умолчанию
+        # Отрицательное значение для Key Length означает UTF-16
+        current_key_length_with_terminator, key_terminator_len = _field_byte_length(key_length_signed)
+        key_data_type = "UTF-8" if key_terminator_len == 1 else "UTF-16"
         
-        if key_length_signed >= 0:
-            current_key_length_with_terminator = key_length_signed
-        else: # Отрицательное значение для Key Length означает UTF-16
-            current_key_length_with_terminator = abs(key_length_signed) * 2 
-            key_data_type = "UTF-16"
+        key_data_end = key_data_start + current_key_length_with_terminator
         
-        if current_key_length_with_terminator <= 0 or current_key_length_with_terminator > MAX_SAFE_KEY_LENGTH:
-            print(f"Предупреждение: Некорректная/нереалистичная длина Key ({key_length_signed}) на {key_length_start:X}. Пропуск 1 байта.")
-            i += 1 
+        if (current_key_length_with_terminator <= 0 or current_key_length_with_terminator > MAX_SAFE_KEY_LENGTH
+                or key_data_end > data_len):
+            # Некорректная длина Key: ищем следующую правдоподобную запись одним проходом
+            i = resync_to_next_record(data, key_length_start, last_key_data_type)
             continue
         
-        key_data_end = key_data_start + current_key_length_with_terminator
-        
-        if key_data_end > data_len:
-            print(f"Ошибка: Key Length ({key_length_signed}) выходит за пределы файла. Остановка.")
-            break
-            
-        raw_key_data_with_terminator = data[key_data_start : key_data_end]
-        
-        # 2. Извлечение Key String (KeyData)
-        if key_data_type == "UTF-8":
-            raw_key_string = raw_key_data_with_terminator[:-1]
-            key_terminator_len = 1
-            encoding = 'utf-8'
-        else: # UTF-16
-            raw_key_string = raw_key_data_with_terminator[:-2]
-            key_terminator_len = 2
-            encoding = 'utf-16-le'
-        
-        # Проверка терминатора
-        if len(raw_key_data_with_terminator) < key_terminator_len or raw_key_data_with_terminator[-key_terminator_len:] != (b'\x00' * key_terminator_len):
+        # 2. Проверка терминатора Key
+        if any(data[key_data_end - key_terminator_len : key_data_end]):
              print(f"Предупреждение: Key на {key_length_start:X} не заканчивается корректным терминатором ({key_data_type}).")
-
-        try:
-            current_key = raw_key_string.decode(encoding, errors='replace')
-        except:
-            current_key = binascii.hexlify(raw_key_string).decode('ascii')
             
         # 3. Чтение 4-байтового поля длины Value (со знаком)
         value_length_field_start = key_data_end
         
         if value_length_field_start + LENGTH_FIELD_SIZE > data_len:
+            current_key = _decode_string(data, key_data_start, key_length_signed)
             print(f"Ошибка: Key '{current_key}' найден, но нет 4-байтового поля длины Value на {value_length_field_start:X}. Остановка.")
             break
 
-        value_length_signed = read_length_field(data[value_length_field_start : value_length_field_start + LENGTH_FIELD_SIZE], signed=True)
+        value_length_signed = struct.unpack_from('<i', data, value_length_field_start)[0]
         
         value_data_start = value_length_field_start + LENGTH_FIELD_SIZE
         
-        # 4. Диспетчер длины и кодировки Value
-        is_length_error = False
+        # 4. Проверка длины Value
+        value_length_bytes, _ = _field_byte_length(value_length_signed)
+        value_data_end = value_data_start + value_length_bytes
+        
+        # --- ЛОГИКА ПРОПУСКА ПРИ ОШИБКЕ ДЛИНЫ ---
+        if value_data_end > data_len or value_length_bytes > MAX_SAFE_VALUE_LENGTH:
+            current_key = _decode_string(data, key_data_start, key_length_signed)
+            print(f"!!! ОШИБКА ДЛИНЫ !!! Key '{current_key}'. Объявленная длина Value ({value_length_bytes} байт) нереалистична/выходит за пределы файла. Пропуск блока.")
+            i = resync_to_next_record(data, value_length_field_start, last_key_data_type)
+            continue
+        # --- КОНЕЦ ЛОГИКИ ПРОПУСКА ---
+        
+        yield key_length_start, key_length_signed, value_length_signed
+        
+        last_key_data_type = key_data_type
+        i = value_data_end
+
+def _decode_string(data, data_start, length_signed):
+    """Декодирует строку (без терминатора) по полю длины."""
+    length_bytes, terminator_len = _field_byte_length(length_signed)
+    raw_string = data[data_start : data_start + length_bytes - terminator_len]
+    encoding = 'utf-8' if terminator_len == 1 else 'utf-16-le'
+    try:
+        return str(raw_string, encoding, 'replace')
+    except:
+        return binascii.hexlify(raw_string).decode('ascii')
+
+def _decode_record(data, span):
+    """Собирает словарь записи для JSON по границам из _iter_record_spans."""
+    record_start, key_length_signed, value_length_signed = span
+    
+    key_data_start = record_start + LENGTH_FIELD_SIZE
+    key_length_bytes, _ = _field_byte_length(key_length_signed)
+    value_data_start = key_data_start + key_length_bytes + LENGTH_FIELD_SIZE
+    
+    return _make_record(
+        _decode_string(data, key_data_start, key_length_signed),
+        _decode_string(data, value_data_start, value_length_signed),
+        key_length_signed,
+    )
+
+def _make_record(key, value, key_length_signed):
+    """Собирает словарь записи в формате JSON-выгрузки."""
+    return {
+        "Key": key,
+        "Value": value,
+        "Key_Type": "UTF-8" if key_length_signed >= 0 else "UTF-16",
+        "Russian_Value": "", # Оставляем пустым для перевода
+        "Russian_Data_Type": "", 
+    }
+
+def extract_key_value_filtered_v6_4(file_path, workers=1):
+    """
+    Извлекает пары Key-Value из бинарного файла, используя 4-байтовые поля длины.
+    Поддерживает UTF-8 и UTF-16 для Key и Value.
+    
+    ДОБАВЛЕНО: Пропуск фиксированного 14-байтового заголовка файла.
+    Тонкая обёртка над iter_records, собирающая все записи в список.
+    workers > 1 включает параллельное декодирование в пуле процессов.
+    """
+    
+    return list(iter_records(file_path, workers))
+
+def benchmark_parallel_decode(file_path, worker_counts=None):
+    """
+    Замеряет время полного разбора файла при разном числе процессов.
+    Возвращает список (workers, секунды, число записей).
+    """
+    cpu_count = os.cpu_count() or 1
+    worker_counts = worker_counts or sorted({1, 2, 4, 8, cpu_count})
+    
+    results = []
+    print(f"⏱️ Бенчмарк разбора {os.path.basename(file_path)} (ядер: {cpu_count})")
+    for workers in worker_counts:
+        # Подавляем служебный вывод парсера, чтобы не искажать замер
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            count = sum(1 for _ in iter_records(file_path, workers))
+            elapsed = time.perf_counter() - started
+        results.append((workers, elapsed, count))
+        speedup = results[0][1] / elapsed if elapsed else 0.0
+        print(f"   workers={workers:<3} {elapsed:7.3f} с  {count} записей  ускорение x{speedup:.2f}")
+    return results
+
+def _dump_json_array(items, f):
+    """
+    Пишет итерируемый объект как JSON-массив по одному элементу.
+    Результат совпадает с json.dump(list(items), f, ensure_ascii=False, indent=4).
+    Возвращает число записанных элементов.
+    """
+    count = 0
+    for item in items:
+        chunk = json.dumps(item, ensure_ascii=False, indent=4)
+        f.write('[\n    ' if count == 0 else ',\n    ')
+        f.write(chunk.replace('\n', '\n    '))
+        count += 1
+    f.write('\n]' if count else '[]')
+    return count
+
+def export_to_json(data, filename="output_data.json"):
+    """
+    Экспортирует список словарей в JSON-файл.
+    
+    Принимает любой итерируемый объект (в том числе генератор iter_records):
+    записи пишутся в файл по одной, результат совпадает с json.dump(indent=4).
+    Если filename оканчивается на .aionrec, пишется бинарный формат обмена.
+    """
+    try:
+        if _is_record_pack_path(filename):
+            count, _ = write_record_pack(filename, data)
+        else:
+            with open(filename, 'w', encoding='utf-8') as f:
+                count = _dump_json_array(data, f)
+        print(f"\n✅ Данные успешно экспортированы в файл: {filename}")
+        print(f"   Объектов экспортировано: {count}")
+    except Exception as e:
+        print(f"\n❌ Ошибка при экспорте в JSON: {e}")
+
+# --- КОЛОНОЧНОЕ ХРАНИЛИЩЕ ЗАПИСЕЙ ---
+
+# Коды кодировок в RecordTable
+ENCODING_UNSET = -1
+ENCODING_UTF8 = 0
+ENCODING_UTF16 = 1
+ENCODING_AUTO = 2 # Выбирается при упаковке (choose_value_encoding)
+ENCODING_NAMES = {ENCODING_UTF8: "UTF-8", ENCODING_UTF16: "UTF-16"}
+ENCODING_CODES = {"UTF-8": ENCODING_UTF8, "UTF-16": ENCODING_UTF16}
+
+def _encoding_name(code):
+    """Имя кодировки Key для JSON и упаковки; нераспознанный тип (ENCODING_UNSET) - пустая строка."""
+    return ENCODING_NAMES.get(code, "")
+
+def _parse_data_type_flag(flag):
+    """Переводит значение Russian_Data_Type из JSON (0/1/"auto"/""/None) в код кодировки."""
+    if isinstance(flag, str) and flag.strip().lower() == "auto":
+        return ENCODING_AUTO
+    try:
+        flag = int(flag)
+    except (ValueError, TypeError):
+        return ENCODING_UNSET
+    return flag if flag in (ENCODING_UTF8, ENCODING_UTF16) else ENCODING_UNSET
+
+def choose_value_encoding(text):
+    """
+    Возвращает самую компактную кодировку Value, которую корректно читает игра.
+    
+    Положительная длина в .dat - однобайтовая строка (ANSI FString в UE),
+    поэтому UTF-8 допустим только для чистого ASCII: там он вдвое меньше
+    UTF-16. Всё остальное (кириллица и т.п.) - UTF-16.
+    """
+    return "UTF-8" if text.isascii() else "UTF-16"
+
+def _encoded_value_size(text, value_data_type):
+    """Размер Value в .dat (данные + терминатор) в байтах."""
+    if value_data_type == "UTF-8":
+        return len(text.encode('utf-8')) + 1
+    return len(text.encode('utf-16-le')) + 2
+
+# Представление специальных кодов в поле Russian_Data_Type JSON-выгрузки
+_DATA_TYPE_FLAG_OUTPUT = {ENCODING_UNSET: "", ENCODING_AUTO: "auto"}
+
+class RecordTable:
+    """
+    Компактное колоночное хранилище записей локализации.
+    
+    Вместо списка словарей с пятью полями хранит параллельные колонки:
+    интернированные Key, исходные Value, переводы (Russian_Value) и
+    упакованные в array('b') флаги кодировок Key и перевода
+    (ENCODING_UTF8 / ENCODING_UTF16 / ENCODING_UNSET). Итерация выдаёт
+    словари в формате JSON-выгрузки, поэтому таблицу можно передавать
+    в export_to_json и везде, где раньше был список словарей.
+    """
+
+    __slots__ = ('keys', 'values', 'translations', 'key_types', 'translation_types')
+
+    def __init__(self):
+        self.keys = []
+        self.values = []
+        self.translations = []
+        self.key_types = array.array('b')
+        self.translation_types = array.array('b')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return (self.row(index) for index in range(len(self.keys)))
+
+    def append(self, key, value, key_type=ENCODING_UTF8, translation='', translation_type=ENCODING_UNSET):
+        self.keys.append(sys.intern(key))
+        self.values.append(value)
+        self.translations.append(translation)
+        self.key_types.append(key_type)
+        self.translation_types.append(translation_type)
+
+    def append_dict(self, item):
+        """Добавляет запись в формате JSON-выгрузки."""
+        self.append(
+            str(item.get('Key', '')),
+            item.get('Value', ''),
+            # Неизвестный Key_Type не подменяется на UTF-8: упаковщик предупредит и пропустит запись
+            ENCODING_CODES.get(str(item.get('Key_Type', 'UTF-8')).upper(), ENCODING_UNSET),
+            str(item.get('Russian_Value', '')),
+            _parse_data_type_flag(item.get('Russian_Data_Type')),
+        )
+
+    def row(self, index):
+        """Возвращает запись index в формате JSON-выгрузки."""
+        translation_type = self.translation_types[index]
+        return {
+            "Key": self.keys[index],
+            "Value": self.values[index],
+            "Key_Type": _encoding_name(self.key_types[index]),
+            "Russian_Value": self.translations[index],
+            "Russian_Data_Type": _DATA_TYPE_FLAG_OUTPUT.get(translation_type, translation_type),
+        }
+
+    def extend(self, other):
+        """Добавляет в конец все строки другой таблицы."""
+        self.keys.extend(other.keys)
+        self.values.extend(other.values)
+        self.translations.extend(other.translations)
+        self.key_types.extend(other.key_types)
+        self.translation_types.extend(other.translation_types)
+
+    def select(self, indices):
+        """Возвращает новую таблицу из строк с указанными индексами."""
+        table = RecordTable()
+        for index in indices:
+            table.keys.append(self.keys[index])
+            table.values.append(self.values[index])
+            table.translations.append(self.translations[index])
+            table.key_types.append(self.key_types[index])
+            table.translation_types.append(self.translation_types[index])
+        return table
+
+    def key_index(self):
+        """Словарь Key -> номер строки (при повторах - последняя строка)."""
+        return {key: index for index, key in enumerate(self.keys)}
+
+    @classmethod
+    def from_dicts(cls, items):
+        table = cls()
+        for item in items:
+            table.append_dict(item)
+        return table
+
+    @classmethod
+    def from_dat(cls, file_path, workers=1, use_cache=True):
+        """
+        Загружает таблицу напрямую из бинарного файла (через кеш разбора).
+        Для отсутствующего файла, как и без кеша, выводит ошибку и возвращает пустую таблицу.
+        """
+        if use_cache:
+            try:
+                return PARSED_CACHE.load('dat-table', file_path, lambda path: cls.from_dat(path, workers, use_cache=False))
+            except FileNotFoundError:
+                pass
+        return cls.from_dicts(iter_records(file_path, workers))
+
+    @classmethod
+    def load_json(cls, json_file_path, use_cache=True):
+        """
+        Загружает таблицу из JSON-выгрузки.
+        
+        Объекты JSON переносятся в колонки прямо во время разбора
+        (object_hook), поэтому полный список словарей в памяти не строится.
+        Повторная загрузка неизмененного файла берется из кеша разбора.
+        Файл .aionrec (определяется по magic) читается напрямую, без кеша.
+        Исключения FileNotFoundError/json.JSONDecodeError пробрасываются.
+        """
+        if is_record_pack(json_file_path):
+            return read_record_pack(json_file_path)
+        if use_cache:
+            return PARSED_CACHE.load('json-table', json_file_path, lambda path: cls.load_json(path, use_cache=False))
+        table = cls()
+        
+        def collect(item):
+            table.append_dict(item)
+            return None
+        
+        with open(json_file_path, 'r', encoding='utf-8') as f:
+            json.load(f, object_hook=collect)
+        return table
+
+    def save_json(self, json_file_path):
+        export_to_json(self, json_file_path)
+
+# --- БИНАРНЫЙ ФОРМАТ ОБМЕНА (.aionrec) ---
+
+# Компактная замена JSON-выгрузки с indent=4 (та же схема записей):
+# [заголовок 48 байт][массив записей по 16 байт][таблица строк]
+# Запись: номера строк Key, Value, Russian_Value (uint32) и коды кодировок
+# Key и перевода (int8). Таблица строк: смещения (uint32, строк + 1) и UTF-8 данные;
+# одинаковые строки (пустые переводы, повторяющиеся Value) хранятся один раз.
+# Массив записей всегда несжатый и читается через mmap по мере обращения;
+# таблица строк может быть сжата zlib или zstd (zstandard) целиком.
+# Порядок байт little-endian, как в .dat.
+RECORD_PACK_EXTENSION = ".aionrec"
+RECORD_PACK_MAGIC = b'AIONREC\x00'
+RECORD_PACK_VERSION = 1
+# magic, версия, сжатие, записей, строк, смещение таблицы строк, ее размер в файле и без сжатия
+RECORD_PACK_HEADER = struct.Struct('<8sIIIIQQQ')
+RECORD_PACK_RECORD = struct.Struct('<IIIbbxx')
+
+PACK_COMPRESSION_NONE = 0
+PACK_COMPRESSION_ZLIB = 1
+PACK_COMPRESSION_ZSTD = 2
+PACK_COMPRESSION_CODES = {None: PACK_COMPRESSION_NONE, "none": PACK_COMPRESSION_NONE,
+                          "zlib": PACK_COMPRESSION_ZLIB, "zstd": PACK_COMPRESSION_ZSTD}
+
+def is_record_pack(file_path):
+    """True, если файл - бинарная выгрузка .aionrec (проверяется magic, а не расширение)."""
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read(len(RECORD_PACK_MAGIC)) == RECORD_PACK_MAGIC
+    except OSError:
+        return False
+
+def _is_record_pack_path(file_path):
+    return str(file_path).lower().endswith(RECORD_PACK_EXTENSION)
+
+def _compress_strings(section, compression):
+    if compression == PACK_COMPRESSION_ZLIB:
+        return zlib.compress(section, 6)
+    if compression == PACK_COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(section)
+    return section
+
+def _decompress_strings(section, compression, raw_size):
+    if compression == PACK_COMPRESSION_ZLIB:
+        return zlib.decompress(section)
+    if compression == PACK_COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise ValueError("файл сжат zstd, но модуль zstandard не установлен (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(section, max_output_size=raw_size)
+    return section
+
+def write_record_pack(file_path, records, compression=None):
+    """
+    Записывает записи (RecordTable или словари JSON-выгрузки) в файл .aionrec.
+    compression - None/"none", "zlib" или "zstd" (без модуля zstandard - zlib).
+    Возвращает (число записей, размер файла).
+    """
+    if compression not in PACK_COMPRESSION_CODES:
+        raise ValueError(f"неизвестное сжатие: {compression}")
+    compression = PACK_COMPRESSION_CODES[compression]
+    if compression == PACK_COMPRESSION_ZSTD and zstandard is None:
+        print("⚠️ Модуль zstandard не установлен, таблица строк будет сжата zlib.")
+        compression = PACK_COMPRESSION_ZLIB
+    table = records if isinstance(records, RecordTable) else RecordTable.from_dicts(records)
+    
+    string_ids = {'': 0}
+    strings = ['']
+    
+    def string_id(text):
+        index = string_ids.get(text)
+        if index is None:
+            index = string_ids[text] = len(strings)
+            strings.append(text)
+        return index
+    
+    record_array = bytearray(len(table) * RECORD_PACK_RECORD.size)
+    for index in range(len(table)):
+        RECORD_PACK_RECORD.pack_into(
+            record_array, index * RECORD_PACK_RECORD.size,
+            string_id(table.keys[index]), string_id(table.values[index]), string_id(table.translations[index]),
+            table.key_types[index], table.translation_types[index],
+        )
+    
+    encoded = [text.encode('utf-8') for text in strings]
+    offsets = array.array('I', [0])
+    offsets.extend(itertools.accumulate(len(data) for data in encoded))
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    section = offsets.tobytes() + b''.join(encoded)
+    stored = _compress_strings(section, compression)
+    
+    strings_offset = RECORD_PACK_HEADER.size + len(record_array)
+    with open(file_path, 'wb') as f:
+        f.write(RECORD_PACK_HEADER.pack(RECORD_PACK_MAGIC, RECORD_PACK_VERSION, compression, len(table),
+                                        len(strings), strings_offset, len(stored), len(section)))
+        f.write(record_array)
+        f.write(stored)
+    return len(table), strings_offset + len(stored)
+
+class RecordPack:
+    """
+    Ленивое чтение файла .aionrec: файл отображается в память (mmap),
+    запись и ее строки декодируются только при обращении.
+    
+    Использование:
+        with RecordPack("extracted_localization.aionrec") as pack:
+            print(len(pack), pack[0]['Key'])
+            table = pack.to_table()
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{file_path}: пустой файл")
+        self._views = []
+        try:
+            (magic, version, compression, self.record_count, self.string_count,
+             strings_offset, stored_size, raw_size) = RECORD_PACK_HEADER.unpack_from(self._map, 0)
+            if magic != RECORD_PACK_MAGIC:
+                raise ValueError(f"{file_path}: не файл {RECORD_PACK_EXTENSION}")
+            if version != RECORD_PACK_VERSION:
+                raise ValueError(f"{file_path}: неподдерживаемая версия формата {version}")
+            
+            view = self._view(memoryview(self._map))
+            self._records = self._view(view[RECORD_PACK_HEADER.size:strings_offset])
+            section = self._view(view[strings_offset:strings_offset + stored_size])
+            if compression != PACK_COMPRESSION_NONE:
+                section = self._view(memoryview(_decompress_strings(section, compression, raw_size)))
+            offsets_size = (self.string_count + 1) * 4
+            self._offsets = self._view(section[:offsets_size].cast('I'))
+            if sys.byteorder != 'little':
+                self._offsets = array.array('I', self._offsets)
+                self._offsets.byteswap()
+            self._data = self._view(section[offsets_size:])
+        except Exception:
+            self.close()
+            raise
+
+    def _view(self, view):
+        self._views.append(view)
+        return view
+
+    def close(self):
+        # Все memoryview на mmap нужно освободить до его закрытия
+        for view in reversed(self._views):
+            if isinstance(view, memoryview):
+                view.release()
+        self._views = []
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.record_count
+
+    def string(self, index):
+        return str(self._data[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def __getitem__(self, index):
+        """Запись index в формате JSON-выгрузки."""
+        if index < 0:
+            index += self.record_count
+        if not 0 <= index < self.record_count:
+            raise IndexError(index)
+        key_id, value_id, translation_id, key_type, translation_type = RECORD_PACK_RECORD.unpack_from(
+            self._records, index * RECORD_PACK_RECORD.size)
+        return {
+            "Key": self.string(key_id),
+            "Value": self.string(value_id),
+            "Key_Type": _encoding_name(key_type),
+            "Russian_Value": self.string(translation_id),
+            "Russian_Data_Type": _DATA_TYPE_FLAG_OUTPUT.get(translation_type, translation_type),
+        }
+
+    def __iter__(self):
+        return (self[index] for index in range(self.record_count))
+
+    def to_table(self):
+        """Загружает все записи в RecordTable (каждая строка таблицы строк декодируется один раз)."""
+        data, offsets = self._data, self._offsets
+        strings = [str(data[offsets[index]:offsets[index + 1]], 'utf-8') for index in range(self.string_count)]
+        table = RecordTable()
+        keys, values, translations = table.keys, table.values, table.translations
+        key_types, translation_types = table.key_types, table.translation_types
+        for key_id, value_id, translation_id, key_type, translation_type in RECORD_PACK_RECORD.iter_unpack(self._records):
+            keys.append(sys.intern(strings[key_id]))
+            values.append(strings[value_id])
+            translations.append(strings[translation_id])
+            key_types.append(key_type)
+            translation_types.append(translation_type)
+        return table
+
+def read_record_pack(file_path):
+    """Загружает файл .aionrec в RecordTable."""
+    with RecordPack(file_path) as pack:
+        return pack.to_table()
+
+def convert_record_file(input_path, output_path, compression=None):
+    """
+    Конвертирует JSON-выгрузку в .aionrec и обратно (формат выхода - по расширению output_path).
+    """
+    try:
+        table = RecordTable.load_json(input_path)
+    except Exception as e:
+        print(f"❌ Ошибка при загрузке {input_path}: {e}")
+        return
+    if _is_record_pack_path(output_path):
+        count, file_size = write_record_pack(output_path, table, compression)
+        print(f"\n✅ Записано {count} записей в {output_path} ({file_size / 1024 / 1024:.1f} MiB)")
+    else:
+        export_to_json(table, output_path)
+
+def benchmark_record_pack(json_path, repeats=3):
+    """
+    Сравнивает JSON-выгрузку и .aionrec (без сжатия, zlib, zstd): размер файла,
+    время записи и загрузки в RecordTable, время ленивого открытия с чтением 1000 записей.
+    Возвращает список (формат, размер, запись, загрузка, ленивое чтение).
+    """
+    table = RecordTable.load_json(json_path, use_cache=False)
+    base = os.path.splitext(json_path)[0] + ".bench"
+    
+    def best(function):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+    
+    def sample(path):
+        with RecordPack(path) as pack:
+            step = max(1, len(pack) // 1000)
+            for index in range(0, len(pack), step):
+                pack[index]
+    
+    results = []
+    json_out = base + ".json"
+    
+    def save_json():
+        with open(json_out, 'w', encoding='utf-8') as f:
+            _dump_json_array(table, f)
+    
+    write_time = best(save_json)
+    load_time = best(lambda: RecordTable.load_json(json_out, use_cache=False))
+    results.append(("json (indent=4)", os.path.getsize(json_out), write_time, load_time, None))
+    os.remove(json_out)
+    
+    compressions = [None, "zlib"] + (["zstd"] if zstandard is not None else [])
+    for compression in compressions:
+        pack_out = base + f".{compression or 'none'}" + RECORD_PACK_EXTENSION
+        write_time = best(lambda: write_record_pack(pack_out, table, compression))
+        load_time = best(lambda: read_record_pack(pack_out))
+        lazy_time = best(lambda: sample(pack_out))
+        results.append((f"aionrec ({compression or 'без сжатия'})", os.path.getsize(pack_out), write_time, load_time, lazy_time))
+        os.remove(pack_out)
+    
+    print(f"⏱️ {len(table)} записей из {json_path}:")
+    print(f"   {'Формат':<22}{'Размер, MiB':>12}{'Запись, с':>11}{'Загрузка, с':>13}{'1000 записей, с':>17}")
+    for name, size, write_time, load_time, lazy_time in results:
+        lazy = f"{lazy_time:17.4f}" if lazy_time is not None else f"{'-':>17}"
+        print(f"   {name:<22}{size / 1024 / 1024:12.1f}{write_time:11.3f}{load_time:13.3f}{lazy}")
+    if zstandard is None:
+        print("   (zstd пропущен: модуль zstandard не установлен)")
+    return results
+
+# --- ИНДЕКС СМЕЩЕНИЙ (.idx) ---
+
+# Сайдкар-индекс рядом с .dat: заголовок с отпечатком исходного файла
+# (размер, mtime, SHA-1) и отсортированная по хешу Key таблица записей
+# фиксированной ширины: (хеш Key, смещение записи, поле длины Key, поле длины Value).
+# Поля длины хранятся как в .dat, поэтому по ним восстанавливаются и кодировки, и длины.
+INDEX_MAGIC = b'AIONIDX\x00'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<8sIQqQ20s')
+INDEX_ENTRY = struct.Struct('<QQii')
+
+def _key_hash(key):
+    """Стабильный 64-битный хеш Key для индекса."""
+    return struct.unpack('<Q', hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest())[0]
+
+def _file_sha1(file_path, chunk_size=1024 * 1024):
+    """Считает SHA-1 файла потоково."""
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.digest()
+
+def build_record_index(dat_path, idx_path=None):
+    """
+    Строит индекс смещений (.idx) для бинарного файла локализации.
+    Возвращает путь к индексу или None, если записи не найдены.
+    """
+    idx_path = idx_path or dat_path + '.idx'
+    
+    entries = []
+    with _open_dat_view(dat_path) as data:
+        if data is None:
+            return None
+        stat = os.stat(dat_path)
+        for span in _iter_record_spans(data):
+            record_start, key_length_signed, value_length_signed = span
+            key = _decode_string(data, record_start + LENGTH_FIELD_SIZE, key_length_signed)
+            entries.append((_key_hash(key), record_start, key_length_signed, value_length_signed))
+    
+    entries.sort()
+    header = INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, stat.st_size, stat.st_mtime_ns,
+                               len(entries), _file_sha1(dat_path))
+    
+    # Пишем во временный файл и атомарно заменяем, чтобы не оставить битый индекс
+    tmp_path = idx_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for entry in entries:
+            f.write(INDEX_ENTRY.pack(*entry))
+    os.replace(tmp_path, idx_path)
+    
+    print(f"🗂️ Индекс построен: {os.path.basename(idx_path)} ({len(entries)} записей)")
+    return idx_path
+
+def _read_index_header(idx_path):
+    try:
+        with open(idx_path, 'rb') as f:
+            raw = f.read(INDEX_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(raw) < INDEX_HEADER.size:
+        return None
+    header = INDEX_HEADER.unpack(raw)
+    if header[0] != INDEX_MAGIC or header[1] != INDEX_VERSION:
+        return None
+    return header
+
+def ensure_record_index(dat_path, idx_path=None):
+    """
+    Возвращает путь к актуальному индексу, перестраивая его при необходимости.
+    
+    Если размер и mtime совпадают с заголовком индекса, индекс считается
+    актуальным. Иначе сверяется SHA-1 содержимого: при совпадении
+    обновляется только mtime в заголовке, при расхождении индекс строится заново.
+    """
+    idx_path = idx_path or dat_path + '.idx'
+    try:
+        stat = os.stat(dat_path)
+    except FileNotFoundError:
+        print(f"Ошибка: Файл не найден по пути {dat_path}")
+        return None
+    header = _read_index_header(idx_path)
+    
+    if header is not None:
+        _, _, size, mtime_ns, count, sha1 = header
+        if size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+            return idx_path
+        if size == stat.st_size and sha1 == _file_sha1(dat_path):
+            with open(idx_path, 'r+b') as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, size, stat.st_mtime_ns, count, sha1))
+            return idx_path
+    
+    return build_record_index(dat_path, idx_path)
+
+class RecordIndex:
+    """
+    Доступ к отдельным записям .dat по Key без разбора всего файла.
+    
+    Индекс отображается в память, поиск - бинарный по хешу Key (O(log n)),
+    затем запись читается из .dat по смещению одним seek.
+    
+    Использование:
+        with RecordIndex("L10NString.dat") as index:
+            item = index.get("QuestString_...")
+    """
+
+    def __init__(self, dat_path, idx_path=None):
+        self.dat_path = dat_path
+        self.idx_path = ensure_record_index(dat_path, idx_path)
+        self._idx_file = None
+        self._idx = None
+        self._dat_file = None
+        self.count = 0
+        if self.idx_path is None:
+            return
+        self._idx_file = open(self.idx_path, 'rb')
+        self._idx = mmap.mmap(self._idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = INDEX_HEADER.unpack_from(self._idx, 0)[4]
+        self._dat_file = open(dat_path, 'rb')
+
+    def close(self):
+        for handle in (self._idx, self._idx_file, self._dat_file):
+            if handle is not None:
+                handle.close()
+        self._idx = self._idx_file = self._dat_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, position):
+        return INDEX_ENTRY.unpack_from(self._idx, INDEX_HEADER.size + position * INDEX_ENTRY.size)
+
+    def _first_position(self, key_hash):
+        # Бинарный поиск первой позиции с хешем >= key_hash
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key_hash:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def read_record(self, record_start, key_length_signed, value_length_signed):
+        """Читает и декодирует одну запись из .dat по её смещению."""
+        key_length_bytes, _ = _field_byte_length(key_length_signed)
+        value_length_bytes, _ = _field_byte_length(value_length_signed)
+        record_length = 2 * LENGTH_FIELD_SIZE + key_length_bytes + value_length_bytes
+        
+        self._dat_file.seek(record_start)
+        raw = self._dat_file.read(record_length)
+        return _decode_record(raw, (0, key_length_signed, value_length_signed))
+
+    def find(self, key):
+        """Возвращает (смещение, поле длины Key, поле длины Value) для Key или None."""
+        if self.count == 0:
+            return None
+        key_hash = _key_hash(key)
+        position = self._first_position(key_hash)
+        # Несколько записей могут иметь одинаковый хеш - сверяем сам Key
+        while position < self.count:
+            entry_hash, record_start, key_length_signed, value_length_signed = self._entry(position)
+            if entry_hash != key_hash:
+                break
+            self._dat_file.seek(record_start + LENGTH_FIELD_SIZE)
+            raw_key = self._dat_file.read(_field_byte_length(key_length_signed)[0])
+            if _decode_string(raw_key, 0, key_length_signed) == key:
+                return record_start, key_length_signed, value_length_signed
+            position += 1
+        return None
+
+    def get(self, key):
+        """Возвращает запись (в формате JSON-выгрузки) по Key или None."""
+        location = self.find(key)
+        if location is None:
+            return None
+        return self.read_record(*location)
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def iter_locations(self):
+        """Выдаёт (смещение, поле длины Key, поле длины Value) в порядке записей файла."""
+        return iter(sorted(self._entry(position)[1:] for position in range(self.count)))
+
+# --- КЕШ РАЗОБРАННЫХ ФАЙЛОВ ---
+
+# Снимки разобранных входных файлов (.dat, JSON, PO) в директории кеша.
+# Запись кеша привязана к виду разбора и пути файла, в заголовке - отпечаток
+# файла (размер, mtime, SHA-1), как у индекса .idx: при совпадении размера и
+# mtime снимок берется сразу, при другом mtime сверяется SHA-1. Полезная
+# нагрузка - pickle колонок (RecordTable или колонки записей PO), а не объектов,
+# поэтому загрузка занимает доли секунды вместо повторного разбора.
+PARSED_CACHE_DIR = "parsed_cache"
+PARSED_CACHE_SIZE = 512 * 1024 * 1024
+PARSED_CACHE_MAGIC = b'AIONPC\x00\x00'
+PARSED_CACHE_VERSION = 1
+PARSED_CACHE_HEADER = struct.Struct('<8sIQq20s')
+
+class ParsedFileCache:
+    """
+    Дисковый кеш результатов разбора файлов.
+
+    load(kind, path, parser) возвращает снимок из кеша, если файл не менялся,
+    иначе вызывает parser(path) и сохраняет результат. Использованные записи
+    "трогаются" (mtime), при превышении max_size удаляются самые давно
+    использованные (LRU). Запись атомарная, поэтому кеш можно использовать
+    из нескольких процессов одновременно.
+    """
+
+    def __init__(self, cache_dir=PARSED_CACHE_DIR, max_size=PARSED_CACHE_SIZE, enabled=True):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, kind, file_path):
+        name = hashlib.sha256(f"{kind}:{os.path.abspath(file_path)}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name[:32] + '.pkl')
+
+    def _read(self, entry_path, kind, file_path, stat):
+        try:
+            with open(entry_path, 'rb') as f:
+                raw = f.read(PARSED_CACHE_HEADER.size)
+                if len(raw) < PARSED_CACHE_HEADER.size:
+                    return None
+                magic, version, size, mtime_ns, sha1 = PARSED_CACHE_HEADER.unpack(raw)
+                if magic != PARSED_CACHE_MAGIC or version != PARSED_CACHE_VERSION or size != stat.st_size:
+                    return None
+                # Файл "тронут" (git checkout, копирование), но содержимое могло не измениться
+                if mtime_ns != stat.st_mtime_ns and sha1 != _file_sha1(file_path):
+                    return None
+                entry_kind, entry_file, value = pickle.load(f)
+            if entry_kind != kind or entry_file != os.path.abspath(file_path):
+                return None
+            if mtime_ns != stat.st_mtime_ns:
+                # Содержимое то же - обновляем mtime в заголовке, чтобы не считать SHA-1 снова
+                with open(entry_path, 'r+b') as f:
+                    f.write(PARSED_CACHE_HEADER.pack(magic, version, size, stat.st_mtime_ns, sha1))
+            os.utime(entry_path)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+            return None
+        return value
+
+    def _write(self, entry_path, kind, file_path, stat, sha1, value):
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(PARSED_CACHE_HEADER.pack(PARSED_CACHE_MAGIC, PARSED_CACHE_VERSION,
+                                                 stat.st_size, stat.st_mtime_ns, sha1))
+                pickle.dump((kind, os.path.abspath(file_path), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, entry_path)
+        except OSError:
+            # Кеш - только ускорение, ошибка записи не должна ломать работу
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        self.trim()
+
+    def load(self, kind, file_path, parser):
+        """Результат parser(file_path) из кеша или после разбора. FileNotFoundError пробрасывается."""
+        if not self.enabled:
+            return parser(file_path)
+        stat = os.stat(file_path)
+        entry_path = self._path(kind, file_path)
+        value = self._read(entry_path, kind, file_path, stat)
+        if value is not None:
+            self.hits += 1
+            return value
+        
+        # Отпечаток снимаем до разбора: если файл изменится во время разбора, снимок не совпадет
+        sha1 = _file_sha1(file_path)
+        value = parser(file_path)
+        self.misses += 1
+        self._write(entry_path, kind, file_path, stat, sha1, value)
+        return value
+
+    def trim(self):
+        """Удаляет самые давно использованные снимки, пока кеш больше max_size."""
+        files = []
+        total_size = 0
+        try:
+            items = list(os.scandir(self.cache_dir))
+        except OSError:
+            return 0
+        for item in items:
+            if not item.name.endswith('.pkl'):
+                continue
+            try:
+                stat = item.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, item.path))
+            total_size += stat.st_size
+
+        removed = 0
+        files.sort()
+        for _, size, path in files:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            removed += 1
+        return removed
+
+PARSED_CACHE = ParsedFileCache()
+
+# Поля PoEntry, которые в наших файлах почти всегда пустые: в снимке хранятся
+# только для записей, где они заданы
+_PO_EXTRA_FIELDS = ('tcomment', 'comment', 'occurrences', 'flags', 'previous_msgctxt', 'previous_msgid', 'obsolete')
+
+def _parse_po_snapshot(po_path):
+    """Разбирает PO-файл в колоночный снимок (для кеша)."""
+    msgctxts, msgids, msgstrs, extras = [], [], [], {}
+    with po_stream.PoReader(po_path) as po:
+        for index, entry in enumerate(po):
+            msgctxts.append(entry.msgctxt)
+            msgids.append(entry.msgid)
+            msgstrs.append(entry.msgstr)
+            extra = tuple(getattr(entry, name) for name in _PO_EXTRA_FIELDS)
+            if any(extra):
+                extras[index] = extra
+        return (msgctxts, msgids, msgstrs, extras), po.metadata, po.header, po.metadata_is_fuzzy
+
+def read_po_cached(po_path):
+    """
+    Читает PO-файл через кеш разбора.
+    Возвращает (список po_stream.PoEntry, metadata, header, metadata_is_fuzzy).
+    """
+    (msgctxts, msgids, msgstrs, extras), metadata, header, metadata_is_fuzzy = PARSED_CACHE.load('po', po_path, _parse_po_snapshot)
+    entries = [po_stream.PoEntry(msgctxt, msgid, msgstr) for msgctxt, msgid, msgstr in zip(msgctxts, msgids, msgstrs)]
+    for index, extra in extras.items():
+        entry = entries[index]
+        for name, value in zip(_PO_EXTRA_FIELDS, extra):
+            setattr(entry, name, value)
+    return entries, metadata, header, metadata_is_fuzzy
+
+def _parse_po_table(po_path):
+    table = RecordTable()
+    with po_stream.PoReader(po_path) as po:
+        _append_po_entries(table, po)
+    return table
+
+def load_po_file_table(po_path):
+    """RecordTable одного PO-файла (Key, Value, перевод) через кеш разбора."""
+    return PARSED_CACHE.load('po-table', po_path, _parse_po_table)
+
+# --- ЗАПИСЬ БИНАРНОГО ФАЙЛА ---
+
+# Заголовок файла (14 байт): FString "AION2" (длина 6 + данные с терминатором)
+# и 4-байтовое число записей, которое дописывается в конце упаковки.
+DAT_HEADER_PREFIX = b'\x06\x00\x00\x00' + b'AION2\x00'
+DAT_ENTRY_COUNT = struct.Struct('<I')
+
+# Размер буфера файла и частота сводных сообщений о прогрессе
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+PROGRESS_INTERVAL = 10000
+
+def _encode_string(text, data_type):
+    """
+    Кодирует строку для .dat. Возвращает (поле длины со знаком, данные с терминатором)
+    или None для неизвестного типа.
+    """
+    if data_type == 'UTF-8':
+        data_with_terminator = text.encode('utf-8') + b'\x00'
+        return len(data_with_terminator), data_with_terminator
+    if data_type == 'UTF-16':
+        data_with_terminator = text.encode('utf-16-le') + b'\x00\x00'
+        # Для UTF-16 длина - отрицательное число символов (с терминатором)
+        return -(len(data_with_terminator) // 2), data_with_terminator
+    return None
+
+def write_dat_stream(records, output_file_path, total_items=None):
+    """
+    Потоково записывает записи в бинарный файл локализации.
+    
+    records - итерируемый объект кортежей (Key, тип Key, Value, тип Value),
+    где типы - 'UTF-8' или 'UTF-16'. Записи проходят через большой буфер
+    файла по мере поступления, без накопления всего результата в памяти.
+    Прогресс выводится сводно раз в PROGRESS_INTERVAL записей. Число
+    записей в заголовке дописывается в конце через seek.
+    
+    Возвращает (число записей, размер файла в байтах).
+    """
+    pack_length = struct.Struct('<i').pack
+    written = 0
+    skipped = 0
+    
+    with open(output_file_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(DAT_HEADER_PREFIX)
+        f.write(DAT_ENTRY_COUNT.pack(0)) # Заполняется после записи всех записей
         
-        if value_length_signed >= 0:
-            value_length_bytes = value_length_signed
-            value_data_end = value_data_start + value_length_bytes
-            value_data_type = "UTF-8"
-            
-            if value_data_end > data_len or value_length_bytes > MAX_SAFE_VALUE_LENGTH:
-                print(f"!!! ОШИБКА ДЛИНЫ !!! Key '{current_key}'. Объявленная длина Value ({value_length_bytes}) нереалистична/выходит за пределы файла. Пропуск блока.")
-                is_length_error = True
+        for key_str, key_data_type, value_str, value_data_type in records:
+            encoded_key = _encode_string(key_str, key_data_type)
+            if encoded_key is None:
+                print(f"Предупреждение: Неизвестный тип Key '{key_data_type}' для Key '{key_str}'. Пропуск.")
+                skipped += 1
+                continue
+            encoded_value = _encode_string(value_str, value_data_type)
+            if encoded_value is None:
+                print(f"Предупреждение: Неизвестный тип Value '{value_data_type}' для Key '{key_str}'. Пропуск.")
+                skipped += 1
+                continue
             
-        else:
-            value_length_bytes = abs(value_length_signed) * 2 
-            value_data_end = value_data_start + value_length_bytes
-            value_data_type = "UTF-16"
+            f.write(pack_length(encoded_key[0]))
+            f.write(encoded_key[1])
+            f.write(pack_length(encoded_value[0]))
+            f.write(encoded_value[1])
+            written += 1
             
-            if value_data_end > data_len or value_length_bytes > MAX_SAFE_VALUE_LENGTH:
-                print(f"!!! ОШИБКА ДЛИНЫ !!! Key '{current_key}'. Объявленная длина Value ({value_length_bytes} байт) нереалистична/выходит за пределы файла. Пропуск блока.")
-                is_length_error = True
-        
-        # --- ЛОГИКА ПРОПУСКА ПРИ ОШИБКЕ ДЛИНЫ ---
-        if is_length_error:
-            i = value_data_start
-            print(f"--> Начат поиск следующего Key Length от позиции: {i:X}")
-            continue
-        # --- КОНЕЦ ЛОГИКИ ПРОПУСКА ---
-        
-        # 5. Извлечение Value (Если ошибки нет)
-        raw_value_data = data[value_data_start : value_data_end]
-
-        if value_data_type == "UTF-8":
-            decoded_value = raw_value_data[:-1].decode('utf-8', errors='replace')
-        else:
-            decoded_value = raw_value_data[:-2].decode('utf-16-le', errors='replace')
-        
-        # Собираем данные для JSON
-        extracted_data.append({
-            "Key": current_key,
-            "Value": decoded_value,
-            "Key_Type": key_data_type,
-            "Russian_Value": "", # Оставляем пустым для перевода
-            "Russian_Data_Type": "", 
-        })
+            if written % PROGRESS_INTERVAL == 0:
+                progress = f"{written}/{total_items}" if total_items else f"{written}"
+                print(f"   ... записано {progress} записей")
         
-        i = value_data_end
-            
-    return extracted_data
-
-def export_to_json(data, filename="output_data.json"):
-    """Экспортирует список словарей в JSON-файл."""
-    try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4) 
-        print(f"\n✅ Данные успешно экспортированы в файл: {filename}")
-        print(f"   Объектов экспортировано: {len(data)}")
-    except Exception as e:
-        print(f"\n❌ Ошибка при экспорте в JSON: {e}")
+        file_size = f.tell()
+        # --- ЧИСЛО ЗАПИСЕЙ В ЗАГОЛОВКЕ ---
+        f.seek(len(DAT_HEADER_PREFIX))
+        f.write(DAT_ENTRY_COUNT.pack(written))
+    
+    if skipped:
+        print(f"⚠️ Пропущено записей с неизвестным типом: {skipped}")
+    return written, file_size
 
-def create_binary_from_json_v7_6(json_file_path, output_file_path="repacked_l10n.dat"):
+def create_binary_from_json_v7_6(json_file_path, output_file_path="repacked_l10n.dat", encoding_policy="flag"):
     """
     Преобразует данные из JSON-файла обратно в бинарный файл.
-    Добавляет специфический заголовок, использует оптимизацию b''.join().
-    """
+    Добавляет специфический заголовок; записи пишутся потоково через write_dat_stream.
     
-    # Специфический заголовок файла (14 байт)
-    HEADER_BYTES = b'\x06\x00\x00\x00' + b'AION2\x00' + b'\x70\xEA\x01\x00'
-    
-    packed_parts = []
-    data_to_pack = []
+    encoding_policy: "flag" - кодировка Value по Russian_Data_Type (без флага - auto),
+    "auto" - для каждой строки самая компактная допустимая кодировка.
+    """
     
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            data_to_pack = json.load(f)
+        table = RecordTable.load_json(json_file_path)
     except FileNotFoundError:
         print(f"Ошибка: JSON-файл не найден по пути {json_file_path}")
         return
@@ -199,109 +1339,263 @@ def create_binary_from_json_v7_6(json_file_path, output_file_path="repacked_l10n
         print(f"Ошибка: Некорректный JSON-файл. {e}")
         return
 
-    # --- ДОБАВЛЕНИЕ ЗАГОЛОВКА В САМОЕ НАЧАЛО ---
-    packed_parts.append(HEADER_BYTES)
-    
-    total_items = len(data_to_pack)
+    total_items = len(table)
     print(f"Начато создание бинарного файла из {total_items} записей...")
-    print(f"-> Добавлен заголовок файла ({len(HEADER_BYTES)} байт).")
+    
+    stats = _new_pack_stats()
+    
+    try:
+        written, file_size = write_dat_stream(_iter_pack_items(table, stats, encoding_policy), output_file_path, total_items)
+    except Exception as e:
+        print(f"\n❌ Ошибка при записи в файл: {e}")
+        return
+    
+    print(f"\n✅ Успешно записано в бинарный файл: {output_file_path}")
+    print(f"   Записей упаковано: {written} (пропущено с пустым Russian_Value: {stats['empty']})")
+    print(f"   Общий размер файла: {file_size} байт ({file_size:X} HEX)")
+    _print_encoding_savings(stats)
 
-    for index, item in enumerate(data_to_pack):
-        
-        key_str = item.get('Key', '')
+def _new_pack_stats():
+    return {'empty': 0, 'auto': 0, 'auto_utf8': 0, 'saved_bytes': 0}
+
+def _print_encoding_savings(stats):
+    if stats['auto']:
+        print(f"📉 Auto-кодировка: {stats['auto_utf8']} из {stats['auto']} значений в UTF-8, "
+              f"экономия {stats['saved_bytes']} байт ({stats['saved_bytes'] / 1024:.1f} KiB) относительно UTF-16")
+
+def _resolve_value_encoding(text, flag, encoding_policy, stats=None):
+    """
+    Определяет кодировку Value для упаковки по флагу и политике.
+    Для автоматически выбранных кодировок копит экономию в stats.
+    """
+    if encoding_policy != "auto" and flag in ENCODING_NAMES:
+        return ENCODING_NAMES[flag]
+    
+    value_data_type = choose_value_encoding(text)
+    if stats is not None:
+        stats['auto'] += 1
+        if value_data_type == "UTF-8":
+            stats['auto_utf8'] += 1
+            stats['saved_bytes'] += _encoded_value_size(text, "UTF-16") - _encoded_value_size(text, "UTF-8")
+    return value_data_type
+
+def _iter_pack_items(table, stats, encoding_policy="flag"):
+    """
+    Выдаёт записи таблицы для упаковки: (Key, тип Key, Russian_Value, тип Value).
+    Записи с пустым переводом пропускаются и считаются в stats['empty'].
+    """
+    for index in range(len(table)):
         
         # Получаем Russian_value и проверяем его на пустоту
-        raw_value_str = str(item.get('Russian_Value', ''))
-        value_str_stripped = raw_value_str.strip()
+        raw_value_str = table.translations[index]
         
         # --- 1. ФИЛЬТРАЦИЯ ПУСТЫХ ПЕРЕВОДОВ ---
-        if not value_str_stripped:
-            print(f"[{index + 1}/{total_items}] ПРОПУСК: Key '{key_str[:60]}' имеет пустое Russian_Value.")
+        if not raw_value_str.strip():
+            stats['empty'] += 1
             continue
-        
-        value_str_to_pack = raw_value_str
         # ----------------------------------------------------
         
-        # Чтение типов из JSON-выгрузки
-        key_data_type = item.get('Key_Type', 'UTF-8').upper() 
-        # value_data_type_structural = item.get('Value_Type', 'UTF-8').upper() 
-        
-        # --- 2. ОПРЕДЕЛЕНИЕ ТИПА ПО ФЛАГУ (0/1) ---
-        russian_data_type_flag = item.get('Russian_Data_Type')
-        # value_data_type = value_data_type_structural
-
-        if russian_data_type_flag is not None:
-            try:
-                flag = int(russian_data_type_flag)
-                if flag == 1:
-                    value_data_type = 'UTF-16'
-                elif flag == 0:
-                    value_data_type = 'UTF-8'
-            except (ValueError, TypeError):
-                pass
+        # --- 2. ОПРЕДЕЛЕНИЕ ТИПА ПО ФЛАГУ (0/1) ИЛИ АВТОМАТИЧЕСКИ ---
+        value_data_type = _resolve_value_encoding(raw_value_str, table.translation_types[index], encoding_policy, stats)
         # -------------------------------------------------------
         
-        # --- ОТСЛЕЖИВАНИЕ ПРОГРЕССА ---
-        print(f"[{index + 1}/{total_items}] Пакую Key: {key_str[:60]}... (Value Type: {value_data_type})")
-        # -----------------------------
+        yield table.keys[index], _encoding_name(table.key_types[index]), raw_value_str, value_data_type
+
+# --- ИНКРЕМЕНТАЛЬНАЯ ПЕРЕУПАКОВКА ---
+
+def _copy_range(src, dst, src_view, offset, length):
+    """
+    Копирует length байт из src (начиная с offset) в текущую позицию dst.
+    
+    Где доступно, используется os.copy_file_range (копирование внутри ядра);
+    иначе - запись среза memoryview исходного файла, без промежуточных bytes.
+    """
+    if length <= 0:
+        return
+    
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while length > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), length, offset)
+                if copied == 0:
+                    break
+                offset += copied
+                length -= copied
+        except OSError:
+            # Например, файлы на разных ФС или ФС без поддержки - дописываем обычным способом
+            pass
+    
+    while length > 0:
+        written = dst.write(src_view[offset : offset + length])
+        offset += written
+        length -= written
+
+# Запись есть в предыдущем файле и не меняется (нужна только как якорь для новых Key)
+_UNCHANGED = object()
 
-        # --- 3. Key Data и Key Length ---
+def compute_changeset(previous_dat_path, table, encoding_policy="flag"):
+    """
+    Сравнивает переводы таблицы с ранее упакованным .dat.
+    
+    Возвращает словарь Key -> (Value, тип Value, тип Key, Key-якорь) для новых
+    и изменённых записей и Key -> None для записей, которые нужно удалить
+    (пустой перевод, неизвестный тип Key или Key отсутствует в таблице).
+    Якорь нужен только новым Key: это следующий по таблице Key, который
+    остаётся в файле (None - конец файла), новая запись встаёт перед ним.
+    
+    Если существующие Key идут в таблице в том же порядке, что и в
+    предыдущем файле, и в таблице нет повторов Key, repack_incremental
+    с этим результатом даёт тот же файл, что и полная переупаковка
+    create_binary_from_json_v7_6.
+    """
+    previous = {}
+    with _open_dat_view(previous_dat_path) as data:
+        if data is None:
+            return None
+        for record_start, key_length_signed, value_length_signed in _iter_record_spans(data):
+            key_data_start = record_start + LENGTH_FIELD_SIZE
+            value_data_start = key_data_start + _field_byte_length(key_length_signed)[0] + LENGTH_FIELD_SIZE
+            previous[_decode_string(data, key_data_start, key_length_signed)] = (
+                _decode_string(data, value_data_start, value_length_signed),
+                "UTF-8" if value_length_signed >= 0 else "UTF-16",
+                "UTF-8" if key_length_signed >= 0 else "UTF-16",
+            )
+    
+    changes = {}
+    kept = set() # Key предыдущего файла, которые в нём останутся
+    for index in range(len(table)):
+        key = table.keys[index]
+        translation = table.translations[index]
+        key_data_type = _encoding_name(table.key_types[index])
+        old = previous.pop(key, None)
         
-        if key_data_type == 'UTF-8':
-            key_data_with_terminator = key_str.encode('utf-8') + b'\x00'
-            key_length_signed = len(key_data_with_terminator)
-            
-        elif key_data_type == 'UTF-16':
-            encoded_data = key_str.encode('utf-16-le')
-            key_data_with_terminator = encoded_data + b'\x00\x00'
-            
-            key_byte_length = len(key_data_with_terminator)
-            symbol_count = key_byte_length // 2
-            key_length_signed = -symbol_count
-            
-        else:
-            print(f"Предупреждение: Неизвестный тип Key '{key_data_type}' для Key '{key_str}'. Пропуск.")
+        if not translation.strip() or not key_data_type:
+            if old is not None:
+                changes[key] = None
             continue
+        
+        value_data_type = _resolve_value_encoding(translation, table.translation_types[index], encoding_policy)
+        
+        if old is None:
+            changes[key] = (translation, value_data_type, key_data_type, None)
+        else:
+            kept.add(key)
+            if old != (translation, value_data_type, key_data_type):
+                changes[key] = (translation, value_data_type, key_data_type, None)
+    
+    # Якоря новых Key: ближайший следующий по таблице Key, остающийся в файле
+    anchor = None
+    for index in range(len(table) - 1, -1, -1):
+        key = table.keys[index]
+        if key in kept:
+            anchor = key
+        elif changes.get(key) is not None:
+            changes[key] = changes[key][:3] + (anchor,)
+    
+    # Записи, которых больше нет в таблице
+    for key in previous:
+        changes[key] = None
+    return changes
 
-        # Запись Key Length (4 байта, <i)
-        packed_parts.append(struct.pack('<i', key_length_signed)) 
-        # Запись Key Data
-        packed_parts.append(key_data_with_terminator) 
+def _encode_record(key, key_data_type, value_str, value_data_type):
+    """Запись .dat целиком: поля длины и данные Key и Value."""
+    key_length, key_data = _encode_string(key, key_data_type)
+    value_length, value_data = _encode_string(value_str, value_data_type)
+    return struct.pack('<i', key_length) + key_data + struct.pack('<i', value_length) + value_data
 
-        # --- 4. Value Data и Value Length (Используем Russian_value) ---
-        
-        if value_data_type == 'UTF-8':
-            value_data_with_terminator = value_str_to_pack.encode('utf-8') + b'\x00'
-            value_length_signed = len(value_data_with_terminator)
-            
-        elif value_data_type == 'UTF-16':
-            encoded_data = value_str_to_pack.encode('utf-16-le')
-            value_data_with_terminator = encoded_data + b'\x00\x00'
+def repack_incremental(previous_dat_path, changes, output_file_path):
+    """
+    Создаёт новый .dat из предыдущего, перекодируя только изменённые записи.
+    
+    changes - словарь Key -> (Value, тип Value, тип Key, Key-якорь) или
+    Key -> None (удалить), например результат compute_changeset. Положение
+    записей берётся из индекса смещений (.idx) предыдущего файла,
+    неизменённые диапазоны байт копируются как есть. Key существующей записи
+    перекодируется, только если сменился его тип. Новые Key вставляются
+    перед записью своего якоря (в порядке changes), без якоря - в конец файла.
+    
+    Возвращает (число записей, размер файла) или None при ошибке.
+    """
+    if os.path.abspath(previous_dat_path) == os.path.abspath(output_file_path):
+        print("❌ Ошибка: Выходной файл должен отличаться от исходного.")
+        return None
+    
+    pack_length = struct.Struct('<i').pack
+    # Начало записи -> [границы записи, изменение (или _UNCHANGED), новые записи перед ней]
+    edits = {}
+    tail = []
+    
+    with RecordIndex(previous_dat_path) as index:
+        if index.idx_path is None:
+            return None
+        for key, change in changes.items():
+            location = index.find(key)
+            if location is not None:
+                edits.setdefault(location[0], [location, _UNCHANGED, []])[1] = change
+            elif change is not None:
+                anchor = change[3]
+                anchor_location = index.find(anchor) if anchor is not None else None
+                if anchor_location is None:
+                    tail.append((key, change))
+                else:
+                    edits.setdefault(anchor_location[0], [anchor_location, _UNCHANGED, []])[2].append((key, change))
+        entry_count = len(index)
+    
+    updated = deleted = appended = 0
+    
+    with open(previous_dat_path, 'rb') as src, open(output_file_path, 'wb', buffering=0) as dst, \
+            mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        src_view = memoryview(mm)
+        try:
+            dst.write(DAT_HEADER_PREFIX)
+            dst.write(DAT_ENTRY_COUNT.pack(0)) # Заполняется в конце
+            cursor = HEADER_SIZE
             
-            value_byte_length = len(value_data_with_terminator)
-            symbol_count = value_byte_length // 2
-            value_length_signed = -symbol_count
+            # Изменения применяются в порядке расположения записей в файле
+            for record_start in sorted(edits):
+                (_, key_length_signed, value_length_signed), change, inserts = edits[record_start]
+                _copy_range(src, dst, src_view, cursor, record_start - cursor)
+                cursor = record_start
+                for key, (value_str, value_data_type, key_data_type, _) in inserts:
+                    dst.write(_encode_record(key, key_data_type, value_str, value_data_type))
+                    appended += 1
+                if change is _UNCHANGED:
+                    continue
+                
+                value_field_start = record_start + LENGTH_FIELD_SIZE + _field_byte_length(key_length_signed)[0]
+                record_end = value_field_start + LENGTH_FIELD_SIZE + _field_byte_length(value_length_signed)[0]
+                if change is None:
+                    deleted += 1
+                else:
+                    value_str, value_data_type, key_data_type, _ = change
+                    if key_data_type == ("UTF-8" if key_length_signed >= 0 else "UTF-16"):
+                        # Key копируется как есть, перекодируется только Value
+                        _copy_range(src, dst, src_view, record_start, value_field_start - record_start)
+                        value_length, value_data = _encode_string(value_str, value_data_type)
+                        dst.write(pack_length(value_length) + value_data)
+                    else:
+                        key = _decode_string(src_view, record_start + LENGTH_FIELD_SIZE, key_length_signed)
+                        dst.write(_encode_record(key, key_data_type, value_str, value_data_type))
+                    updated += 1
+                cursor = record_end
             
-        else:
-            print(f"Предупреждение: Неизвестный тип Value '{value_data_type}' для Key '{key_str}'. Пропуск.")
-            continue
+            _copy_range(src, dst, src_view, cursor, len(src_view) - cursor)
             
-        # Запись Value Length (4 байта, <i, так как может быть отрицательным)
-        packed_parts.append(struct.pack('<i', value_length_signed)) 
-        # Запись Value Data
-        packed_parts.append(value_data_with_terminator) 
-
-    # --- 5. Запись в файл ---
-    try:
-        final_packed_bytes = b''.join(packed_parts)
-        
-        with open(output_file_path, 'wb') as f:
-            f.write(final_packed_bytes)
+            for key, (value_str, value_data_type, key_data_type, _) in tail:
+                dst.write(_encode_record(key, key_data_type, value_str, value_data_type))
+                appended += 1
             
-        print(f"\n✅ Успешно записано в бинарный файл: {output_file_path}")
-        print(f"   Общий размер файла: {len(final_packed_bytes)} байт ({len(final_packed_bytes):X} HEX)")
-    except Exception as e:
-        print(f"\n❌ Ошибка при записи в файл: {e}")
+            file_size = dst.tell()
+            entry_count += appended - deleted
+            dst.seek(len(DAT_HEADER_PREFIX))
+            dst.write(DAT_ENTRY_COUNT.pack(entry_count))
+        finally:
+            src_view.release()
+    
+    print(f"\n✅ Инкрементальная упаковка завершена: {output_file_path}")
+    print(f"🔄 Обновлено: {updated}  ➕ Добавлено: {appended}  🗑️ Удалено: {deleted}")
+    print(f"   Общий размер файла: {file_size} байт ({file_size:X} HEX)")
+    return entry_count, file_size
 
 # def unescape_po_string(text):
 #     """
@@ -325,37 +1619,18 @@ def create_binary_from_json_v7_6(json_file_path, output_file_path="repacked_l10n
     
 #     return text
 
-def convert_po_to_json_polib(po_input_path, json_output_path):
+def _append_po_entries(table, po):
     """
-    Загружает данные из PO-файла с помощью polib, извлекает msgctxt (Key), 
-    msgid (Value) и msgstr (Russian_Value), и экспортирует их в JSON-файл.
-    
-    :param po_input_path: Путь к входному PO-файлу.
-    :param json_output_path: Путь к выходному JSON-файлу.
+    Переносит записи PO-файла в таблицу: msgctxt (Key), msgid (Value),
+    msgstr (Russian_Value, UTF-16). Заголовок, устаревшие записи и записи
+    без msgctxt пропускаются.
     """
-    
-    print(f"📖 Загрузка PO-файла: {po_input_path}...")
-    
-    # 1. Загрузка данных из PO-файла с помощью polib
-    try:
-        # polib автоматически обрабатывает экранирование и многострочность
-        po = polib.pofile(po_input_path)
-    except FileNotFoundError:
-        print(f"❌ Ошибка: Файл не найден по пути {po_input_path}")
-        return
-    except Exception as e:
-        print(f"❌ Ошибка при чтении или парсинге PO-файла: {e}")
-        return
-
-    json_data = []
-    
-    # 2. Парсинг записей
     for entry in po:
         # Пропускаем заголовок файла (первую запись)
         if entry.msgid == '' or entry.msgctxt is None:
             continue
             
-        # Убираем записи, помеченные как устаревшие (обязательно в polib)
+        # Убираем записи, помеченные как устаревшие (#~)
         if entry.obsolete:
             continue
 
@@ -371,25 +1646,122 @@ def convert_po_to_json_polib(po_input_path, json_output_path):
         original_value = entry.msgid          # msgid (Value)
         russian_value = entry.msgstr        # msgstr (Russian_Value)
 
-        # Добавляем запись в формат JSON
-        json_data.append({
-            "Key": key,
-            # polib гарантирует, что эти значения уже разэкранированы 
-            # и готовы для прямого использования в JSON
-            "Value": original_value,
-            "Key_Type": "UTF-8",      
-            "Russian_Value": russian_value,
-            "Russian_Data_Type": 1     
-        })
-
-    # 3. Сохранение JSON-файла
+        # Читатель PO уже разэкранировал эти значения,
+        # они готовы для прямого использования в JSON
+        table.append(key, original_value, ENCODING_UTF8, russian_value, ENCODING_UTF16)
+
+def _collect_po_files(po_paths):
+    """
+    Разворачивает путь к PO-файлу, директории (например, po_categories)
+    или список таких путей в отсортированный список .po файлов.
+    """
+    if isinstance(po_paths, str):
+        po_paths = [po_paths]
+    
+    po_files = []
+    for path in po_paths:
+        if os.path.isdir(path):
+            po_files.extend(sorted(glob.glob(os.path.join(path, '**', '*.po'), recursive=True)))
+        else:
+            po_files.append(path)
+    return po_files
+
+def load_po_table(po_paths):
+    """Загружает один или несколько PO-файлов (или директорий с ними) в RecordTable."""
+    table = RecordTable()
+    for po_file in _collect_po_files(po_paths):
+        try:
+            # Записи читаются потоково (или берутся из кеша разбора), без промежуточного списка POEntry
+            table.extend(load_po_file_table(po_file))
+        except FileNotFoundError:
+            print(f"❌ Ошибка: Файл не найден по пути {po_file}")
+            continue
+        except Exception as e:
+            print(f"❌ Ошибка при чтении или парсинге PO-файла {po_file}: {e}")
+            continue
+    return table
+
+def _iter_dat_keys(dat_path):
+    """Выдаёт Key записей .dat в порядке файла, не декодируя Value."""
+    with _open_dat_view(dat_path) as data:
+        if data is None:
+            return
+        for record_start, key_length_signed, _ in _iter_record_spans(data):
+            yield _decode_string(data, record_start + LENGTH_FIELD_SIZE, key_length_signed)
+
+def create_binary_from_po(po_paths, output_file_path="repacked_l10n.dat", reference_dat_path=None, encoding_policy="flag"):
+    """
+    Собирает бинарный файл напрямую из PO-файлов, без промежуточного JSON.
+    
+    po_paths - PO-файл, директория (например, po_categories из Create Dictionary.py)
+    или список путей. Если задан reference_dat_path (оригинальный L10NString.dat),
+    записи упорядочиваются как в нём; Key, которых там нет, идут в конце в
+    порядке PO-файлов. Повторяющиеся Key берутся из первого файла.
+    encoding_policy - как в create_binary_from_json_v7_6 (PO-записи помечены UTF-16).
+    """
+    table = load_po_table(po_paths)
+    print(f"📖 Загружено записей из PO: {len(table)}")
+    
+    # Первое вхождение каждого Key
+    first_rows = {}
+    for index, key in enumerate(table.keys):
+        first_rows.setdefault(key, index)
+    
+    order = []
+    if reference_dat_path:
+        for key in _iter_dat_keys(reference_dat_path):
+            index = first_rows.pop(key, None)
+            if index is not None:
+                order.append(index)
+    order.extend(sorted(first_rows.values()))
+    
+    ordered = table.select(order)
+    stats = _new_pack_stats()
+    
+    try:
+        written, file_size = write_dat_stream(_iter_pack_items(ordered, stats, encoding_policy), output_file_path, len(ordered))
+    except Exception as e:
+        print(f"\n❌ Ошибка при записи в файл: {e}")
+        return
+    
+    print(f"\n✅ Успешно записано в бинарный файл: {output_file_path}")
+    print(f"   Записей упаковано: {written} (пропущено с пустым переводом: {stats['empty']})")
+    print(f"   Общий размер файла: {file_size} байт ({file_size:X} HEX)")
+    _print_encoding_savings(stats)
+
+def convert_po_to_json_polib(po_input_path, json_output_path):
+    """
+    Загружает данные из PO-файла (потоковый читатель po_stream), извлекает msgctxt (Key), 
+    msgid (Value) и msgstr (Russian_Value), и экспортирует их в JSON-файл.
+    
+    :param po_input_path: Путь к входному PO-файлу.
+    :param json_output_path: Путь к выходному JSON-файлу.
+    """
+    
+    print(f"📖 Загрузка PO-файла: {po_input_path}...")
+    
+    # 1-2. Потоковое чтение PO-файла и парсинг записей (повторно - из кеша разбора)
+    try:
+        # po_stream обрабатывает экранирование и многострочность так же, как polib
+        table = load_po_file_table(po_input_path)
+    except FileNotFoundError:
+        print(f"❌ Ошибка: Файл не найден по пути {po_input_path}")
+        return
+    except Exception as e:
+        print(f"❌ Ошибка при чтении или парсинге PO-файла: {e}")
+        return
+
+    # 3. Сохранение JSON-файла (или .aionrec, если выбрано такое расширение)
     try:
-        with open(json_output_path, 'w', encoding='utf-8') as f:
-            # ensure_ascii=False важен для сохранения русских символов как есть
-            json.dump(json_data, f, ensure_ascii=False, indent=4)
+        if _is_record_pack_path(json_output_path):
+            write_record_pack(json_output_path, table)
+        else:
+            with open(json_output_path, 'w', encoding='utf-8') as f:
+                # ensure_ascii=False важен для сохранения русских символов как есть
+                _dump_json_array(table, f)
             
-        print(f"\n🎉 Успех! Создан JSON-файл: {os.path.basename(json_output_path)}")
-        print(f"📊 Импортировано записей: {len(json_data)}")
+        print(f"\n🎉 Успех! Создан файл: {os.path.basename(json_output_path)}")
+        print(f"📊 Импортировано записей: {len(table)}")
         
     except Exception as e:
         print(f"❌ Ошибка при записи JSON-файла: {e}")
@@ -400,56 +1772,58 @@ def format_po_string(text):
     return str(text).strip()
 
 def get_po_file(po_path):
-    """Загружает или создает PO-файл с помощью polib."""
+    """Загружает записи PO-файла (список po_stream.PoEntry) или пустой список, если файла нет."""
     try:
-        po = polib.pofile(po_path)
+        po = read_po_cached(po_path)[0]
     except FileNotFoundError:
-        # Если файл не найден, создаем новый
-        po = polib.POFile()
+        # Если файл не найден, начинаем с пустого
+        po = []
     except Exception as e:
-        print(f"❌ Критическая ошибка при загрузке PO-файла: {e}. Создается пустой POFile.")
-        po = polib.POFile()
+        print(f"❌ Критическая ошибка при загрузке PO-файла: {e}. Создается пустой PO-файл.")
+        po = []
     return po
 
-def update_po_from_json(json_input_path, po_target_path):
-    """
-    Загружает JSON, сравнивает его с существующим PO-файлом, и перезаписывает файл, 
-    удаляя старые записи, если Value отличается.
-    
-    ДОБАВЛЕНО: Сохранение старого перевода (msgstr) в виде комментария.
+def _prefill_from_memory(entry, memory, stats):
+    """Если перевода нет, подставляет подсказку памяти переводов как fuzzy msgstr."""
+    if memory is None or entry.msgstr:
+        return
+    suggestion = memory.suggest(entry.msgid)
+    if suggestion is None:
+        return
+    score, source, translation = suggestion
+    entry.msgstr = translation
+    if 'fuzzy' not in entry.flags:
+        entry.flags.append('fuzzy')
+    # Переводчик видит, с какой строкой совпало и насколько
+    note = f"(TM {score:.0%}: {source})"
+    entry.comment = entry.comment + "\n" + note if entry.comment else note
+    stats['suggested'] += 1
+
+def merge_po_entries(existing_entries, records, memory=None):
     """
+    Сливает записи PO-файла с новыми данными. records - последовательность
+    (Key, Value, Russian_Value) в нужном порядке (источник истины).
     
-    # 1. Загрузка данных из JSON
-    try:
-        with open(json_input_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-    except Exception as e:
-        print(f"❌ Ошибка при загрузке JSON: {e}")
-        return
+    - Key есть, Value тот же: запись PO остается как есть (SKIP, перевод сохраняется)
+    - Key есть, Value другой: новая запись с флагом fuzzy, старый перевод уходит
+      в комментарий "(OLD TRANSLATION: ...)" (UPDATE)
+    - Key нет в PO: новая запись (INSERT)
+    - Записи PO, которых нет в records, удаляются (DELETE)
     
-    # 2. Загрузка PO-файла и создание словаря-источника (Key -> POEntry)
-    po = get_po_file(po_target_path)
+    Если передана память переводов (translation_memory.TranslationMemory),
+    новые и измененные записи без перевода получают ее подсказку как fuzzy msgstr.
     
+    Возвращает (новый список записей, статистика). Для пропущенных записей
+    в список попадают те же объекты, что и в existing_entries.
+    """
     # Индексируем существующие записи в PO для быстрого доступа
-    # {msgctxt: POEntry}
-    po_entry_map = {entry.msgctxt.strip(): entry for entry in po if entry.msgctxt}
+    # {msgctxt: PoEntry}
+    po_entry_map = {entry.msgctxt.strip(): entry for entry in existing_entries if entry.msgctxt}
 
-    # 3. Создание нового, чистого списка записей
+    new_entries = []
+    stats = {'updated': 0, 'inserted': 0, 'skipped': 0, 'deleted': 0, 'suggested': 0}
     
-    new_po = polib.POFile()
-    keys_processed = set()
-    
-    records_to_insert = 0
-    records_to_update = 0
-    records_to_skip = 0
-    
-    # 4. Проход по JSON (источнику истины)
-    
-    for item in json_data:
-        key = item.get('Key', '')
-        original_value = item.get('Value', '')
-        russian_value = item.get('Russian_value', '') 
-        
+    for key, original_value, russian_value in records:
         if not key or not original_value:
             continue
             
@@ -462,7 +1836,7 @@ def update_po_from_json(json_input_path, po_target_path):
             value_from_po = existing_entry.msgid.strip()
             
             if value_from_json != value_from_po:
-                # 4a. Value отличается: UPDATE
+                # Value отличается: UPDATE
                 
                 # --- ЛОГИКА СОХРАНЕНИЯ СТАРОГО ПЕРЕВОДА ---
                 old_msgstr = existing_entry.msgstr.strip()
@@ -475,82 +1849,326 @@ def update_po_from_json(json_input_path, po_target_path):
                         old_comment = existing_entry.comment + "\n" + old_comment
                 
                 # Создаем новую запись, используя данные из JSON (новый Value)
-                new_entry = polib.POEntry(
-                    msgctxt=item.get('Key', ''),
-                    msgid=item.get('Value', ''),
-                    msgstr=item.get('Russian_value', ''), # Оставляем перевод из JSON (или пустой)
+                new_entry = po_stream.PoEntry(
+                    msgctxt=key,
+                    msgid=original_value,
+                    msgstr=russian_value, # Оставляем перевод из JSON (или пустой)
                     comment=old_comment,
-                    # tcomment=f"Original Value Type: {item.get('Value_Type', 'N/A')}",
                     flags=['fuzzy'] # Отмечаем как fuzzy, так как msgid изменился
                 )
-                new_po.append(new_entry)
-                records_to_update += 1
+                _prefill_from_memory(new_entry, memory, stats)
+                new_entries.append(new_entry)
+                stats['updated'] += 1
                 
             else:
-                # 4b. Key и Value совпадают: SKIP (сохраняем старую запись PO)
-                # Копируем старую запись (сохраняя существующий перевод)
-                new_po.append(existing_entry)
-                records_to_skip += 1
+                # Key и Value совпадают: SKIP (сохраняем старую запись PO)
+                new_entries.append(existing_entry)
+                stats['skipped'] += 1
                 
         else:
-            # 4c. Key не существует: INSERT
-            new_entry = polib.POEntry(
-                msgctxt=item.get('Key', ''),
-                msgid=item.get('Value', ''),
-                msgstr=item.get('Russian_value', ''),
+            # Key не существует: INSERT
+            new_entry = po_stream.PoEntry(
+                msgctxt=key,
+                msgid=original_value,
+                msgstr=russian_value,
             )
-            new_po.append(new_entry)
-            records_to_insert += 1
+            _prefill_from_memory(new_entry, memory, stats)
+            new_entries.append(new_entry)
+            stats['inserted'] += 1
+
+    stats['deleted'] = len(po_entry_map)
+    return new_entries, stats
+
+def po_entries_changed(existing_entries, new_entries):
+    """True, если после слияния файл нужно перезаписывать (записи или их порядок изменились)."""
+    if len(existing_entries) != len(new_entries):
+        return True
+    return any(old is not new for old, new in zip(existing_entries, new_entries))
+
+def update_po_from_json(json_input_path, po_target_path, memory=None):
+    """
+    Загружает JSON, сравнивает его с существующим PO-файлом, и перезаписывает файл, 
+    удаляя старые записи, если Value отличается.
+    
+    ДОБАВЛЕНО: Сохранение старого перевода (msgstr) в виде комментария.
+    Если ни одна запись не изменилась, файл не перезаписывается.
+    memory - память переводов для fuzzy-подсказок (см. merge_po_entries).
+    """
+    
+    # 1. Загрузка данных из JSON
+    try:
+        table = RecordTable.load_json(json_input_path)
+    except Exception as e:
+        print(f"❌ Ошибка при загрузке JSON: {e}")
+        return
+    
+    # 2. Загрузка PO-файла
+    po = get_po_file(po_target_path)
+    
+    # 3-4. Проход по JSON (источнику истины) и слияние с записями PO.
+    #      Новые и измененные записи получают пустой msgstr (перевод из JSON не берется)
+    records = ((key, value, '') for key, value in zip(table.keys, table.values))
+    new_po, stats = merge_po_entries(po, records, memory)
 
     # 5. Сохранение обновленного PO-файла (Перезапись)
     
+    if os.path.exists(po_target_path) and not po_entries_changed(po, new_po):
+        print(f"\n⏭️ Файл {os.path.basename(po_target_path)} не изменился, перезапись не требуется.")
+        return
+    
     try:
-        new_po.save(po_target_path)
+        po_stream.write_po(po_target_path, new_po)
         
         print("\n--- Результат Полной Пересборки PO ---")
         print(f"🎉 Файл {os.path.basename(po_target_path)} успешно обновлен (перезаписан).")
-        print(f"🔄 Обновлено записей (Value отличался): {records_to_update}")
-        print(f"➕ Добавлено новых записей (INSERT): {records_to_insert}")
-        print(f"🗑️ Удалено старых/лишних записей: {len(po_entry_map)}")
-        print(f"⏭️ Пропущено (Key и Value совпали): {records_to_skip}")
+        print(f"🔄 Обновлено записей (Value отличался): {stats['updated']}")
+        print(f"➕ Добавлено новых записей (INSERT): {stats['inserted']}")
+        print(f"🗑️ Удалено старых/лишних записей: {stats['deleted']}")
+        print(f"⏭️ Пропущено (Key и Value совпали): {stats['skipped']}")
+        print(f"💡 Подсказок из памяти переводов (fuzzy): {stats['suggested']}")
         
     except Exception as e:
         print(f"❌ Ошибка при записи PO-файла: {e}")
 
-        
+# --- ДУБЛИКАТЫ ИСХОДНЫХ СТРОК ---
+
+# Многие Key имеют одинаковый Value (названия предметов, повторяющиеся реплики
+# NpcTalk, подписи UI в String_UI/Message). Value нормализуется (пробелы по краям
+# и внутри), хешируется, и Key с одинаковым хешем образуют класс эквивалентности.
+# Непереведенные члены класса получают перевод переведенного "соседа";
+# если переведенные соседи расходятся, класс попадает в отчет о конфликтах.
+DUPLICATE_REPORT_FILE = "duplicate_conflicts.json"
+
+def _value_hash(value):
+    """128-битный хеш нормализованного Value."""
+    normalized = ' '.join(value.split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+def find_duplicate_translations(records):
+    """
+    Один проход O(n) по records - последовательности (Key, Value, перевод), где
+    перевод: непустая строка - готовый перевод, '' - нет перевода (можно заполнить),
+    None - запись не участвует как источник и не заполняется (например, fuzzy).
+    
+    Возвращает (fills, conflicts):
+      fills - [(номер записи, перевод, Key-источник)] для непереведенных записей;
+      conflicts - [{'Value', 'Translations': [{'Key', 'Russian_Value'}]}] для классов,
+      где переведенные записи расходятся (такие классы не заполняются).
+    """
+    classes = {}
+    for index, (key, value, translation) in enumerate(records):
+        if not value:
+            continue
+        # [номера непереведенных записей, {перевод: первый Key с ним}, [(Key, перевод)], Value]
+        group = classes.setdefault(_value_hash(value), [[], {}, [], value])
+        if translation is None:
+            continue
+        if translation:
+            group[1].setdefault(translation, key)
+            group[2].append((key, translation))
+        else:
+            group[0].append(index)
+    
+    fills = []
+    conflicts = []
+    for untranslated, translations, translated, value in classes.values():
+        if len(translations) > 1:
+            conflicts.append({
+                'Value': value,
+                'Translations': [{'Key': key, 'Russian_Value': translation} for key, translation in translated],
+            })
+        elif translations and untranslated:
+            (translation, source_key), = translations.items()
+            fills.extend((index, translation, source_key) for index in untranslated)
+    return fills, conflicts
+
+def _write_duplicate_report(conflicts, report_path):
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(conflicts, f, ensure_ascii=False, indent=2)
+    print(f"⚠️ Конфликтов (соседи переведены по-разному): {len(conflicts)}. Отчет: {report_path}")
+
+def propagate_duplicates_json(json_input_path, json_output_path, report_path=DUPLICATE_REPORT_FILE):
+    """Заполняет пустые Russian_Value в JSON-выгрузке переводами записей с тем же Value."""
+    try:
+        table = RecordTable.load_json(json_input_path)
+    except Exception as e:
+        print(f"❌ Ошибка при загрузке JSON: {e}")
+        return
+    
+    fills, conflicts = find_duplicate_translations(zip(table.keys, table.values, table.translations))
+    key_index = table.key_index()
+    for index, translation, source_key in fills:
+        table.translations[index] = translation
+        table.translation_types[index] = table.translation_types[key_index[source_key]]
+    
+    table.save_json(json_output_path)
+    print(f"📋 Заполнено переводов из дубликатов: {len(fills)}")
+    _write_duplicate_report(conflicts, report_path)
+
+def propagate_duplicates_po(po_paths, report_path=DUPLICATE_REPORT_FILE):
+    """
+    То же для PO-файлов (файл, директория po_categories или список): пустые msgstr
+    заполняются переводом записи с тем же msgid (источник - только не-fuzzy переводы),
+    в комментарий пишется "(COPIED FROM: Key)". Перезаписываются только измененные файлы.
+    """
+    files = []
+    records = []
+    locations = []
+    for po_file in _collect_po_files(po_paths):
+        try:
+            entries, metadata, header, metadata_is_fuzzy = read_po_cached(po_file)
+            files.append((po_file, entries, metadata, header, metadata_is_fuzzy))
+        except Exception as e:
+            print(f"❌ Ошибка при чтении или парсинге PO-файла {po_file}: {e}")
+            continue
+        for entry in entries:
+            if entry.obsolete or not entry.msgctxt:
+                continue
+            translation = None if entry.fuzzy else entry.msgstr
+            records.append((entry.msgctxt, entry.msgid, translation))
+            locations.append((len(files) - 1, entry))
+    
+    fills, conflicts = find_duplicate_translations(records)
+    changed_files = set()
+    for index, translation, source_key in fills:
+        file_index, entry = locations[index]
+        entry.msgstr = translation
+        note = f"(COPIED FROM: {source_key})"
+        entry.comment = entry.comment + "\n" + note if entry.comment else note
+        changed_files.add(file_index)
+    
+    for file_index in sorted(changed_files):
+        po_file, entries, metadata, header, metadata_is_fuzzy = files[file_index]
+        try:
+            po_stream.write_po(po_file, entries, metadata, header, metadata_is_fuzzy)
+        except Exception as e:
+            print(f"❌ Ошибка при записи PO-файла {po_file}: {e}")
+    
+    print(f"📋 Заполнено переводов из дубликатов: {len(fills)} (изменено файлов: {len(changed_files)} из {len(files)})")
+    _write_duplicate_report(conflicts, report_path)
+
 # --- РЕЖИМЫ РАБОТЫ ---
 
+def ask_encoding_policy():
+    answer = input("Кодировка Value (Enter - по флагу Russian_Data_Type, a - auto): ").strip().lower()
+    return "auto" if answer in ("a", "auto") else "flag"
+
+def ask_output_extension():
+    answer = input(f"Формат выгрузки (Enter - JSON, b - бинарный {RECORD_PACK_EXTENSION}): ").strip().lower()
+    return RECORD_PACK_EXTENSION if answer in ("b", "bin", RECORD_PACK_EXTENSION.lstrip('.')) else ".json"
+
 def jsontohex():
     # Ввод файла от пользователя
     INPUT_JSON_PATH = input("Введите путь или имя JSON файла для упаковки: ")
     OUTPUT_BIN_PATH = "repacked_L10NString_RU.dat" 
+    ENCODING_POLICY = ask_encoding_policy()
     
     # 1. Запуск упаковщика
-    create_binary_from_json_v7_6(INPUT_JSON_PATH, OUTPUT_BIN_PATH)
+    create_binary_from_json_v7_6(INPUT_JSON_PATH, OUTPUT_BIN_PATH, ENCODING_POLICY)
 
 def hextojson():
     # ⚠️ ЗАМЕНИТЕ ЭТОТ ПУТЬ НА ПУТЬ К ВАШЕМУ ФАЙЛУ
     YOUR_FILE_PATH = input("Введите имя бинарного файла для извлечения: ")
-    OUTPUT_FILE_PATH = "extracted_localization_" + os.path.basename(YOUR_FILE_PATH).replace('.', '_') + ".json"
+    OUTPUT_FILE_PATH = "extracted_localization_" + os.path.basename(YOUR_FILE_PATH).replace('.', '_') + ask_output_extension()
     
-    results = extract_key_value_filtered_v6_4(YOUR_FILE_PATH) 
+    # Таблица берется из кеша разбора, если файл не менялся с прошлого запуска
+    records = iter(RecordTable.from_dat(YOUR_FILE_PATH))
+    # Первые 5 записей нужны для предпросмотра, остальные пишутся потоком
+    results = list(itertools.islice(records, 5))
 
     if results:
         print("\n✨ Результаты извлечения данных (Первые 5):")
-        for idx, result in enumerate(results[:5]):
+        for idx, result in enumerate(results):
             print("=" * 70)
             print(f"🔑 Key: **{result['Key']}** (Type: {result['Key_Type']})")
             print(f"  > Value: '{result['Value']}' (Type: {result['Russian_Data_Type']})")
-            if idx == 4:
-                break
-        export_to_json(results, OUTPUT_FILE_PATH)
+        export_to_json(itertools.chain(results, records), OUTPUT_FILE_PATH)
     else:
         print("Данные Key-Value не найдены или произошла критическая ошибка.")
+def keylookup():
+    DAT_PATH = input("Введите имя бинарного файла: ")
+    KEY = input("Введите Key для поиска: ").strip()
+    
+    with RecordIndex(DAT_PATH) as index:
+        item = index.get(KEY)
+    
+    if item:
+        print(f"🔑 Key: **{item['Key']}** (Type: {item['Key_Type']})")
+        print(f"  > Value: '{item['Value']}'")
+    else:
+        print(f"❌ Key '{KEY}' не найден.")
+
+def incrementalpack():
+    PREVIOUS_BIN_PATH = input("Введите путь к предыдущему упакованному бинарному файлу: ")
+    INPUT_JSON_PATH = input("Введите путь или имя JSON файла с переводами: ")
+    OUTPUT_BIN_PATH = "repacked_L10NString_RU.incremental.dat"
+    ENCODING_POLICY = ask_encoding_policy()
+    
+    try:
+        table = RecordTable.load_json(INPUT_JSON_PATH)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"❌ Ошибка при загрузке JSON: {e}")
+        return
+    
+    changes = compute_changeset(PREVIOUS_BIN_PATH, table, ENCODING_POLICY)
+    if changes is None:
+        return
+    print(f"📊 Изменённых записей: {len(changes)}")
+    repack_incremental(PREVIOUS_BIN_PATH, changes, OUTPUT_BIN_PATH)
+
+def potohex():
+    INPUT_PO_PATH = input("Введите путь к PO-файлу или директории с PO-файлами: ").strip().strip('"')
+    REFERENCE_BIN_PATH = input("Оригинальный бинарный файл для порядка записей (Enter - порядок PO): ").strip().strip('"')
+    OUTPUT_BIN_PATH = "repacked_L10NString_RU.dat"
+    ENCODING_POLICY = ask_encoding_policy()
+    
+    create_binary_from_po(INPUT_PO_PATH, OUTPUT_BIN_PATH, REFERENCE_BIN_PATH or None, ENCODING_POLICY)
+
+def benchdecode():
+    YOUR_FILE_PATH = input("Введите имя бинарного файла для бенчмарка: ")
+    benchmark_parallel_decode(YOUR_FILE_PATH)
+
+def benchpo():
+    BENCH_PO_PATH = "benchmark_125k.po"
+    print(f"⏱️ Сравнение polib и po_stream на сгенерированном файле {BENCH_PO_PATH} (125 000 записей)...")
+    results = po_stream.benchmark_po(BENCH_PO_PATH)
+    print(f"   Чтение: polib {results['polib_read']:.2f} с, po_stream {results['stream_read']:.2f} с")
+    print(f"   Запись: polib {results['polib_write']:.2f} с, po_stream {results['stream_write']:.2f} с")
+    if results['identical']:
+        print("✅ Файлы, записанные polib и po_stream, совпадают побайтно.")
+    else:
+        print("❌ Файлы, записанные polib и po_stream, различаются!")
+
+def propagateduplicates():
+    INPUT_PATH = input("Введите путь к JSON, PO-файлу или директории с PO (po_categories): ").strip().strip('"')
+    
+    if INPUT_PATH.lower().endswith(('.json', RECORD_PACK_EXTENSION)):
+        OUTPUT_JSON_PATH = "deduplicated_localization" + os.path.splitext(INPUT_PATH)[1].lower()
+        propagate_duplicates_json(INPUT_PATH, OUTPUT_JSON_PATH)
+    else:
+        # PO-файлы обновляются на месте
+        propagate_duplicates_po(INPUT_PATH)
+
+def convertpack():
+    INPUT_PATH = input(f"Введите путь к JSON или {RECORD_PACK_EXTENSION} файлу для конвертации: ").strip().strip('"')
+    base = os.path.splitext(INPUT_PATH)[0]
+    
+    if is_record_pack(INPUT_PATH):
+        convert_record_file(INPUT_PATH, base + ".json")
+    else:
+        answer = input("Сжатие таблицы строк (Enter - без сжатия, z - zlib, s - zstd): ").strip().lower()
+        compression = {"z": "zlib", "zlib": "zlib", "s": "zstd", "zstd": "zstd"}.get(answer)
+        convert_record_file(INPUT_PATH, base + RECORD_PACK_EXTENSION, compression)
+
+def benchpack():
+    INPUT_JSON_PATH = input("Введите путь к JSON-выгрузке для бенчмарка: ").strip().strip('"')
+    benchmark_record_pack(INPUT_JSON_PATH)
+
 def potojson():
     INPUT_PO_FILE = input("Введите путь к PO-файлу для конвертации в JSON: ")
     
     # Имя выходного JSON-файла
-    OUTPUT_JSON_FILE = "translations_from_po.json"
+    OUTPUT_JSON_FILE = "translations_from_po" + ask_output_extension()
     
     convert_po_to_json_polib(INPUT_PO_FILE, OUTPUT_JSON_FILE)
 
@@ -560,7 +2178,10 @@ def poupdate():
     # Целевой PO-файл (который будет обновлен)
     OUTPUT_PO_PATH = "localization_template.po"
     
-    update_po_from_json(INPUT_JSON_PATH, OUTPUT_PO_PATH)
+    # Память переводов из готовых переводов целевого PO (индекс обновляется инкрементально)
+    memory = translation_memory.load_translation_memory([OUTPUT_PO_PATH], OUTPUT_PO_PATH + ".tm")
+    
+    update_po_from_json(INPUT_JSON_PATH, OUTPUT_PO_PATH, memory)
 # def jsontocsv():
 #     # Имя исходного JSON файла
 #     INPUT_JSON_FILE = input("Введите имя JSON файла для конвертации в CSV: ")
@@ -625,7 +2246,7 @@ def poupdate():
 
 if __name__ == '__main__':
     print("--- ИНСТРУМЕНТ ЛОКАЛИЗАЦИИ AION2 ---")
-    mode = input("Выберите режим (1-HexToJson, 2-JsonToHex, 3-PoToJson, 4-PoUpdate, 5-MergeJson): ")
+    mode = input("Выберите режим (1-HexToJson, 2-JsonToHex, 3-PoToJson, 4-PoUpdate, 5-MergeJson, 6-KeyLookup, 7-BenchDecode, 8-IncrementalPack, 9-PoToHex, 10-BenchPo, 11-Duplicates, 12-ConvertPack, 13-BenchPack): ")
     
     if mode == "1":
         hextojson()
@@ -637,5 +2258,21 @@ if __name__ == '__main__':
         poupdate()
     # elif mode =="5":
     #     mergejson()        
+    elif mode =="6":
+        keylookup()
+    elif mode =="7":
+        benchdecode()
+    elif mode =="8":
+        incrementalpack()
+    elif mode =="9":
+        potohex()
+    elif mode =="10":
+        benchpo()
+    elif mode =="11":
+        propagateduplicates()
+    elif mode =="12":
+        convertpack()
+    elif mode =="13":
+        benchpack()
     else:
-        print("Неверный режим. Пожалуйста, введите 1, 2, 3, 4 или 5.")
\ No newline at end of file
+        print("Неверный режим. Пожалуйста, введите число от 1 до 13.")
\ No newline at end of file
@@ -0,0 +1,1000 @@
+import struct
+import os
+import json
+import urllib.parse
+import zlib
+import hashlib
+import concurrent.futures
+import threading
+
+# --- ФОРМАТ UNREAL ENGINE .PAK ---
+
+# Футер находится в конце файла:
+# [GUID ключа шифрования 16][флаг шифрования индекса 1][Magic 4][Version 4]
+# [смещение индекса 8][размер индекса 8][SHA-1 индекса 20][v9: frozen 1][имена методов сжатия 32 * N]
+PAK_MAGIC = 0x5A6F12E1
+COMPRESSION_METHOD_NAME_SIZE = 32
+
+PAK_VERSION_COMPRESSION_ENCRYPTION = 3
+PAK_VERSION_RELATIVE_CHUNK_OFFSETS = 5
+PAK_VERSION_FNAME_BASED_COMPRESSION = 8
+PAK_VERSION_FROZEN_INDEX = 9
+PAK_VERSION_PATH_HASH_INDEX = 10
+
+# Кандидаты размера футера: (размер, версия с полем frozen, число имён методов сжатия)
+_FOOTER_LAYOUTS = [
+    (16 + 1 + 44 + 5 * COMPRESSION_METHOD_NAME_SIZE, False, 5),  # v8B, v10, v11
+    (16 + 1 + 44 + 1 + 5 * COMPRESSION_METHOD_NAME_SIZE, True, 5),  # v9
+    (16 + 1 + 44 + 4 * COMPRESSION_METHOD_NAME_SIZE, False, 4),  # v8A
+    (16 + 1 + 44, False, 0),  # v7
+    (44, False, 0),  # v1-v6 (без GUID и флага шифрования)
+]
+
+# Биты флагов закодированной записи (v10+)
+ENCODED_OFFSET_32BIT = 1 << 31
+ENCODED_UNCOMPRESSED_SIZE_32BIT = 1 << 30
+ENCODED_SIZE_32BIT = 1 << 29
+ENCODED_ENCRYPTED = 1 << 22
+
+SHA1_SIZE = 20
+
+# Параметры сборки, совпадающие с pakchunk502000-Windows_9999_P.pak
+PAK_WRITE_VERSION = 11
+DEFAULT_MOUNT_POINT = "../../../AION2/Content/L10N/Text/en-US/"
+DEFAULT_BLOCK_SIZE = 64 * 1024
+DEFAULT_COMPRESSION_LEVEL = 6
+
+DEFAULT_BLOCK_CACHE_DIR = "pak_block_cache"
+DEFAULT_BLOCK_CACHE_SIZE = 256 * 1024 * 1024
+
+# Манифест дельта-обновлений (читается aion2_updater.py)
+DELTA_MANIFEST_VERSION = 2
+DELTA_MANIFEST_SUFFIX = ".manifest.json"
+# Хеши кусков и блоков усечены до 64 бит, чтобы манифест был компактным;
+# собранные .dat и .pak всё равно проверяются полным SHA-256
+DELTA_HASH_LENGTH = 16
+# Разбиение .dat на куски по содержимому: граница ставится после записи,
+# у которой crc32(Key) & DAT_CHUNK_MASK == 0 (в среднем раз в 128 записей),
+# но не раньше DAT_CHUNK_MIN_SIZE и не позже DAT_CHUNK_MAX_SIZE байт
+DAT_HEADER_SIZE = 14
+DAT_CHUNK_MIN_SIZE = 4 * 1024
+DAT_CHUNK_MAX_SIZE = 64 * 1024
+DAT_CHUNK_MASK = 0x7F
+
+# Манифест релиза (все файлы локализации для aion2_updater.py)
+RELEASE_MANIFEST_NAME = "release.json"
+RELEASE_MANIFEST_VERSION = 1
+DEFAULT_RELEASE_TARGET_DIR = "Aion2/Content/Paks/L10N/Text/en-US"
+# Папка публикуемых файлов в репозитории
+DEFAULT_RELEASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Localization pak file")
+
+class PakEntry:
+    """Запись (файл) внутри .pak."""
+
+    __slots__ = ('path', 'offset', 'size', 'uncompressed_size', 'compression_method',
+                 'blocks', 'block_size', 'encrypted', 'sha1')
+
+    def __init__(self, path, offset, size, uncompressed_size, compression_method,
+                 blocks, block_size, encrypted, sha1):
+        self.path = path
+        self.offset = offset
+        self.size = size
+        self.uncompressed_size = uncompressed_size
+        # None - без сжатия, иначе имя метода ("Zlib", "Gzip", "Oodle", ...)
+        self.compression_method = compression_method
+        # Абсолютные (start, end) сжатых блоков в файле .pak
+        self.blocks = blocks
+        self.block_size = block_size
+        self.encrypted = encrypted
+        self.sha1 = sha1
+
+    def __repr__(self):
+        return (f"PakEntry({self.path!r}, offset={self.offset}, size={self.size}, "
+                f"uncompressed_size={self.uncompressed_size}, method={self.compression_method}, "
+                f"blocks={len(self.blocks)})")
+
+class _Cursor:
+    """Последовательное чтение полей из буфера индекса."""
+
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values if len(values) > 1 else values[0]
+
+    def read(self, size):
+        raw = self.data[self.pos : self.pos + size]
+        self.pos += size
+        return raw
+
+    def fstring(self):
+        # FString: int32 длина с терминатором; отрицательная - UTF-16
+        length = self.unpack('<i')
+        if length == 0:
+            return ''
+        if length > 0:
+            return self.read(length)[:-1].decode('utf-8', errors='replace')
+        return self.read(-length * 2)[:-2].decode('utf-16-le', errors='replace')
+
+class PakReader:
+    """
+    Читатель Unreal Engine .pak (версии 1-11, без шифрования).
+
+    При открытии читаются только футер и индекс. Данные отдельной записи
+    распаковываются блок за блоком (iter_entry_blocks), без распаковки
+    всего архива на диск.
+
+    Использование:
+        with PakReader("pakchunk502000-Windows_9999_P.pak") as pak:
+            entry = pak.find("L10NString.dat")
+            data = pak.read_entry(entry)
+    """
+
+    def __init__(self, pak_path):
+        self.pak_path = pak_path
+        self._file = open(pak_path, 'rb')
+        try:
+            self._read_footer()
+            self._read_index()
+        except Exception:
+            self._file.close()
+            raise
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    # --- ФУТЕР И ИНДЕКС ---
+
+    def _read_footer(self):
+        file_size = os.fstat(self._file.fileno()).st_size
+
+        for footer_size, has_frozen_flag, method_count in _FOOTER_LAYOUTS:
+            if footer_size > file_size:
+                continue
+            self._file.seek(file_size - footer_size)
+            footer = self._file.read(footer_size)
+
+            magic_pos = 0 if footer_size == 44 else 17
+            magic, version, index_offset, index_size = struct.unpack_from('<IiQQ', footer, magic_pos)
+            if magic != PAK_MAGIC:
+                continue
+            if has_frozen_flag != (version == PAK_VERSION_FROZEN_INDEX):
+                continue
+
+            pos = magic_pos + 24
+            self.index_sha1 = footer[pos : pos + SHA1_SIZE]
+            pos += SHA1_SIZE + (1 if has_frozen_flag else 0)
+
+            self.version = version
+            self.encrypted_index = footer_size != 44 and footer[16] != 0
+            self.encryption_key_guid = footer[:16] if footer_size != 44 else b'\x00' * 16
+            self.index_offset = index_offset
+            self.index_size = index_size
+            self.footer_size = footer_size
+            self.compression_methods = []
+            for _ in range(method_count):
+                name = footer[pos : pos + COMPRESSION_METHOD_NAME_SIZE].split(b'\x00', 1)[0]
+                if name:
+                    self.compression_methods.append(name.decode('ascii'))
+                pos += COMPRESSION_METHOD_NAME_SIZE
+            if version < PAK_VERSION_FNAME_BASED_COMPRESSION:
+                # До v8 метод сжатия задавался флагом записи (1 - zlib)
+                self.compression_methods = ['Zlib', 'Gzip']
+            return
+
+        raise ValueError(f"{self.pak_path}: футер .pak не найден (не Unreal pak или неподдерживаемая версия)")
+
+    def _read_index(self):
+        if self.encrypted_index:
+            raise ValueError(f"{self.pak_path}: индекс .pak зашифрован, чтение не поддерживается")
+
+        self._file.seek(self.index_offset)
+        index = self._file.read(self.index_size)
+        cursor = _Cursor(index)
+
+        self.mount_point = cursor.fstring()
+        entry_count = cursor.unpack('<i')
+
+        if self.version >= PAK_VERSION_PATH_HASH_INDEX:
+            self.entries = self._read_path_hash_index(cursor, entry_count)
+        else:
+            self.entries = [self._read_entry(cursor, cursor.fstring()) for _ in range(entry_count)]
+        self._by_path = {entry.path: entry for entry in self.entries}
+
+    def _read_path_hash_index(self, cursor, entry_count):
+        # Индекс v10+: закодированные записи + полный индекс директорий
+        self.path_hash_seed = cursor.unpack('<Q')
+        self.path_hash_index = None
+        if cursor.unpack('<I'):
+            offset, size = cursor.unpack('<qq')
+            cursor.read(SHA1_SIZE)
+            self.path_hash_index = (offset, size)
+
+        if not cursor.unpack('<I'):
+            raise ValueError(f"{self.pak_path}: в .pak нет полного индекса директорий, список файлов недоступен")
+        directory_index_offset, directory_index_size = cursor.unpack('<qq')
+        cursor.read(SHA1_SIZE)
+        self.full_directory_index = (directory_index_offset, directory_index_size)
+
+        encoded_entries = cursor.read(cursor.unpack('<i'))
+        plain_entries = [self._read_entry(cursor, None) for _ in range(cursor.unpack('<i'))]
+
+        self._file.seek(directory_index_offset)
+        directories = _Cursor(self._file.read(directory_index_size))
+        entries = []
+        for _ in range(directories.unpack('<i')):
+            directory = directories.fstring()
+            for _ in range(directories.unpack('<i')):
+                filename = directories.fstring()
+                encoded_offset = directories.unpack('<i')
+                path = filename if directory in ('', '/') else directory.lstrip('/') + filename
+                if encoded_offset >= 0:
+                    entry = self._decode_entry(encoded_entries, encoded_offset, path)
+                else:
+                    entry = plain_entries[-encoded_offset - 1]
+                    entry.path = path
+                entries.append(entry)
+
+        if len(entries) != entry_count:
+            print(f"Предупреждение: в индексе {entry_count} записей, в директориях найдено {len(entries)}.")
+        entries.sort(key=lambda entry: entry.offset)
+        return entries
+
+    def _method_name(self, method_index):
+        if method_index == 0:
+            return None
+        if method_index - 1 < len(self.compression_methods):
+            return self.compression_methods[method_index - 1]
+        return f"Unknown#{method_index}"
+
+    def _entry_header_size(self, compressed, block_count):
+        """Размер заголовка FPakEntry, который лежит перед данными записи."""
+        size = 8 + 8 + 8 + 4 + SHA1_SIZE
+        if self.version == 1:
+            size += 8 # Timestamp
+        if self.version >= PAK_VERSION_COMPRESSION_ENCRYPTION:
+            if compressed:
+                size += 4 + block_count * 16
+            size += 1 + 4 # Флаги и размер блока
+        return size
+
+    def _read_entry(self, cursor, path):
+        # Полная (незакодированная) форма FPakEntry
+        offset, size, uncompressed_size, method_index = cursor.unpack('<QQQI')
+        if self.version == 1:
+            cursor.read(8) # Timestamp
+        sha1 = cursor.read(SHA1_SIZE)
+        blocks = []
+        encrypted = False
+        block_size = 0
+        if self.version >= PAK_VERSION_COMPRESSION_ENCRYPTION:
+            if method_index != 0:
+                block_count = cursor.unpack('<i')
+                base = offset if self.version >= PAK_VERSION_RELATIVE_CHUNK_OFFSETS else 0
+                blocks = [tuple(base + value for value in cursor.unpack('<qq')) for _ in range(block_count)]
+            encrypted = cursor.unpack('<B') & 0x01 != 0
+            block_size = cursor.unpack('<I')
+
+        if not blocks:
+            data_start = offset + self._entry_header_size(False, 0)
+            blocks = [(data_start, data_start + size)]
+        return PakEntry(path, offset, size, uncompressed_size, self._method_name(method_index),
+                        blocks, block_size, encrypted, sha1)
+
+    def _decode_entry(self, encoded, pos, path):
+        # Компактная форма записи из индекса v10+ (FPakFile::DecodePakEntry)
+        cursor = _Cursor(encoded, pos)
+        flags = cursor.unpack('<I')
+
+        if flags & 0x3f == 0x3f:
+            block_size = cursor.unpack('<I')
+        else:
+            block_size = (flags & 0x3f) << 11
+        method_index = (flags >> 23) & 0x3f
+
+        offset = cursor.unpack('<I' if flags & ENCODED_OFFSET_32BIT else '<Q')
+        uncompressed_size = cursor.unpack('<I' if flags & ENCODED_UNCOMPRESSED_SIZE_32BIT else '<Q')
+        if method_index != 0:
+            size = cursor.unpack('<I' if flags & ENCODED_SIZE_32BIT else '<Q')
+        else:
+            size = uncompressed_size
+
+        encrypted = flags & ENCODED_ENCRYPTED != 0
+        block_count = (flags >> 6) & 0xffff
+        if block_count and uncompressed_size < block_size:
+            block_size = uncompressed_size
+
+        data_start = offset + self._entry_header_size(method_index != 0, block_count)
+        blocks = []
+        if block_count == 1 and not encrypted:
+            blocks.append((data_start, data_start + size))
+        elif block_count > 0:
+            alignment = 16 if encrypted else 1
+            block_start = data_start
+            for _ in range(block_count):
+                compressed_size = cursor.unpack('<I')
+                blocks.append((block_start, block_start + compressed_size))
+                block_start += (compressed_size + alignment - 1) // alignment * alignment
+        else:
+            blocks.append((data_start, data_start + size))
+
+        # SHA-1 хранится в заголовке записи перед данными, а не в индексе
+        self._file.seek(offset + 8 + 8 + 8 + 4)
+        sha1 = self._file.read(SHA1_SIZE)
+        return PakEntry(path, offset, size, uncompressed_size, self._method_name(method_index),
+                        blocks, block_size, encrypted, sha1)
+
+    # --- ДОСТУП К ЗАПИСЯМ ---
+
+    def find(self, name):
+        """
+        Ищет запись по пути относительно точки монтирования или по имени файла
+        (без учёта регистра). Возвращает PakEntry или None.
+        """
+        entry = self._by_path.get(name)
+        if entry is not None:
+            return entry
+        name = name.replace('\\', '/').lower()
+        for entry in self.entries:
+            path = entry.path.lower()
+            if path == name or path.rsplit('/', 1)[-1] == name:
+                return entry
+        return None
+
+    def iter_entry_blocks(self, entry, verify=True):
+        """
+        Выдаёт распакованные данные записи блок за блоком.
+        При verify=True по окончании сверяется SHA-1 сжатых данных.
+        """
+        if entry.encrypted:
+            raise ValueError(f"{entry.path}: запись зашифрована, чтение не поддерживается")
+
+        if entry.compression_method is None:
+            decompress = None
+        elif entry.compression_method.lower() == 'zlib':
+            decompress = zlib.decompress
+        elif entry.compression_method.lower() == 'gzip':
+            decompress = lambda raw: zlib.decompress(raw, 31)
+        else:
+            raise ValueError(f"{entry.path}: метод сжатия {entry.compression_method} не поддерживается")
+
+        sha1 = hashlib.sha1() if verify else None
+        for block_start, block_end in entry.blocks:
+            self._file.seek(block_start)
+            raw = self._file.read(block_end - block_start)
+            if sha1 is not None:
+                sha1.update(raw)
+            yield decompress(raw) if decompress else raw
+
+        if sha1 is not None and sha1.digest() != entry.sha1:
+            raise ValueError(f"{entry.path}: SHA-1 данных записи не совпадает с индексом .pak")
+
+    def read_entry(self, entry, verify=True):
+        """Возвращает распакованное содержимое записи (bytearray)."""
+        data = bytearray()
+        for chunk in self.iter_entry_blocks(entry, verify):
+            data += chunk
+        return data
+
+    def extract_entry(self, entry, output_path, verify=True):
+        """Потоково распаковывает запись в файл. Возвращает число записанных байт."""
+        written = 0
+        with open(output_path, 'wb') as f:
+            for chunk in self.iter_entry_blocks(entry, verify):
+                f.write(chunk)
+                written += len(chunk)
+        return written
+
+def read_dat_from_pak(pak_path, entry_name="L10NString.dat"):
+    """
+    Распаковывает из .pak в память файл локализации (по умолчанию L10NString.dat;
+    если его нет - первый .dat). Возвращает bytearray или None.
+    """
+    with PakReader(pak_path) as pak:
+        entry = pak.find(entry_name)
+        if entry is None:
+            entry = next((item for item in pak if item.path.lower().endswith('.dat')), None)
+        if entry is None:
+            print(f"Ошибка: В {os.path.basename(pak_path)} не найден файл {entry_name}")
+            return None
+        return pak.read_entry(entry)
+
+# --- ЗАПИСЬ .PAK ---
+
+def _fnv64_path(path, seed):
+    """Хеш пути для индекса v10+ (FNV-64 от пути в нижнем регистре в UTF-16LE)."""
+    value = (0xcbf29ce484222325 + seed) & 0xFFFFFFFFFFFFFFFF
+    for byte in path.lower().encode('utf-16-le'):
+        value ^= byte
+        value = (value * 0x100000001b3) & 0xFFFFFFFFFFFFFFFF
+    return value
+
+def default_path_hash_seed(pak_path):
+    """Seed хешей путей по имени .pak (CRC32 имени в нижнем регистре)."""
+    return zlib.crc32(os.path.basename(pak_path).lower().encode('utf-32-le'))
+
+def _pack_fstring(text):
+    if not text:
+        return struct.pack('<i', 0)
+    if text.isascii():
+        raw = text.encode('ascii') + b'\x00'
+        return struct.pack('<i', len(raw)) + raw
+    raw = text.encode('utf-16-le') + b'\x00\x00'
+    return struct.pack('<i', -(len(raw) // 2)) + raw
+
+def _iter_source_blocks(source, block_size):
+    """Делит содержимое (bytes-подобный объект или путь к файлу) на блоки."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), block_size):
+            yield bytes(view[start : start + block_size])
+        return
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            yield block
+
+def _source_size(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    return os.path.getsize(source)
+
+def _encode_entry(offset, size, uncompressed_size, method_slot, block_sizes, block_size):
+    """Компактная форма записи для индекса v10+ (FPakFile::EncodePakEntry)."""
+    block_size_bits = (block_size >> 11) & 0x3f
+    if block_size_bits << 11 != block_size:
+        block_size_bits = 0x3f
+
+    flags = block_size_bits | (len(block_sizes) << 6) | (method_slot << 23)
+    if size <= 0xFFFFFFFF:
+        flags |= ENCODED_SIZE_32BIT
+    if uncompressed_size <= 0xFFFFFFFF:
+        flags |= ENCODED_UNCOMPRESSED_SIZE_32BIT
+    if offset <= 0xFFFFFFFF:
+        flags |= ENCODED_OFFSET_32BIT
+
+    parts = [struct.pack('<I', flags)]
+    if block_size_bits == 0x3f:
+        parts.append(struct.pack('<I', block_size))
+    parts.append(struct.pack('<I' if offset <= 0xFFFFFFFF else '<Q', offset))
+    parts.append(struct.pack('<I' if uncompressed_size <= 0xFFFFFFFF else '<Q', uncompressed_size))
+    if method_slot:
+        parts.append(struct.pack('<I' if size <= 0xFFFFFFFF else '<Q', size))
+    if len(block_sizes) > 1:
+        parts.append(struct.pack(f'<{len(block_sizes)}I', *block_sizes))
+    return b''.join(parts)
+
+def _compress_block(block, level):
+    return zlib.compress(block, level)
+
+class BlockCache:
+    """
+    Кеш сжатых блоков на диске, адресуемый по содержимому.
+
+    Ключ - SHA-256 от параметров сжатия и несжатого блока, значение - готовый
+    zlib-поток. При пересборке .pak неизменённые блоки L10NString.dat берутся
+    из кеша, сжимаются только новые. Использованные файлы "трогаются" (mtime),
+    при превышении max_size удаляются самые давно использованные (LRU).
+
+    Безопасен для вызова из потоков пула сжатия.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_BLOCK_CACHE_DIR, max_size=DEFAULT_BLOCK_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    @staticmethod
+    def make_key(block, level):
+        digest = hashlib.sha256(f"zlib:{level}:".encode('ascii'))
+        digest.update(block)
+        return digest.hexdigest()
+
+    def get(self, key, block):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                compressed = f.read()
+        except OSError:
+            return None
+        # zlib-поток заканчивается Adler-32 несжатых данных - дешёвая проверка целостности
+        if len(compressed) < 6 or compressed[-4:] != zlib.adler32(block).to_bytes(4, 'big'):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return compressed
+
+    def put(self, key, compressed):
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(compressed)
+            os.replace(temp_path, path)
+        except OSError:
+            # Кеш - только ускорение, ошибка записи не должна ломать сборку
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def compress(self, block, level):
+        key = self.make_key(block, level)
+        compressed = self.get(key, block)
+        if compressed is not None:
+            with self._lock:
+                self.hits += 1
+            return compressed
+
+        compressed = zlib.compress(block, level)
+        self.put(key, compressed)
+        with self._lock:
+            self.misses += 1
+        return compressed
+
+    def trim(self):
+        """Удаляет самые давно использованные блоки, пока кеш больше max_size."""
+        files = []
+        total_size = 0
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for item in os.scandir(bucket.path):
+                stat = item.stat()
+                files.append((stat.st_mtime, stat.st_size, item.path))
+                total_size += stat.st_size
+
+        removed = 0
+        files.sort()
+        for _, size, path in files:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            removed += 1
+        return removed
+
+def write_pak(output_path, files, mount_point=DEFAULT_MOUNT_POINT, path_hash_seed=None,
+              block_size=DEFAULT_BLOCK_SIZE, compression_level=DEFAULT_COMPRESSION_LEVEL, workers=None,
+              block_cache=None):
+    """
+    Собирает .pak версии 11 с zlib-сжатием, в раскладке игровых паков:
+    [заголовок записи + сжатые блоки]..., основной индекс, индекс хешей путей,
+    полный индекс директорий, футер. Для каждой записи считается SHA-1.
+
+    files - список (путь внутри .pak относительно mount_point, содержимое),
+    где содержимое - bytes или путь к файлу на диске. Блоки по block_size
+    сжимаются параллельно в пуле потоков (zlib отпускает GIL); порядок блоков
+    фиксирован, поэтому результат побайтно одинаков при любом числе workers.
+    С block_cache (BlockCache) уже сжатые ранее блоки берутся из кеша.
+
+    Возвращает размер созданного файла.
+    """
+    if path_hash_seed is None:
+        path_hash_seed = default_path_hash_seed(output_path)
+    workers = workers or os.cpu_count() or 1
+    compress_block = block_cache.compress if block_cache is not None else _compress_block
+
+    encoded_entries = bytearray()
+    entry_locations = [] # (путь, смещение в encoded_entries)
+
+    with open(output_path, 'wb') as f, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, source in files:
+            path = path.replace('\\', '/').lstrip('/')
+            entry_offset = f.tell()
+            uncompressed_size = _source_size(source)
+            block_count = -(-uncompressed_size // block_size)
+            # Пустой файл хранится без сжатия (как в UnrealPak)
+            method_slot = 1 if block_count else 0
+
+            # Заголовок записи: Offset, Size, UncompressedSize, слот метода, SHA-1,
+            # таблица блоков, флаги, размер блока. Пишется после данных.
+            header_size = 8 + 8 + 8 + 4 + SHA1_SIZE + (4 + block_count * 16 if method_slot else 0) + 1 + 4
+            f.seek(entry_offset + header_size)
+
+            sha1 = hashlib.sha1()
+            block_sizes = []
+            blocks = []
+            block_start = header_size
+            compressed = executor.map(compress_block, _iter_source_blocks(source, block_size),
+                                      (compression_level for _ in range(block_count)))
+            for compressed_block in compressed:
+                f.write(compressed_block)
+                sha1.update(compressed_block)
+                block_sizes.append(len(compressed_block))
+                blocks.append((block_start, block_start + len(compressed_block)))
+                block_start += len(compressed_block)
+
+            size = block_start - header_size
+            entry_end = f.tell()
+            header = [struct.pack('<QQQI', 0, size, uncompressed_size, method_slot), sha1.digest()]
+            if method_slot:
+                header.append(struct.pack('<i', block_count))
+                header.extend(struct.pack('<qq', start, end) for start, end in blocks)
+            header.append(struct.pack('<BI', 0, block_size if method_slot else 0))
+            f.seek(entry_offset)
+            f.write(b''.join(header))
+            f.seek(entry_end)
+
+            entry_locations.append((path, len(encoded_entries)))
+            encoded_entries += _encode_entry(entry_offset, size, uncompressed_size, method_slot,
+                                             block_sizes, block_size if method_slot else 0)
+
+        # Индекс хешей путей: число записей, (хеш, смещение), пустой усечённый индекс директорий
+        path_hash_index = [struct.pack('<i', len(entry_locations))]
+        for path, location in entry_locations:
+            path_hash_index.append(struct.pack('<Qi', _fnv64_path(path, path_hash_seed), location))
+        path_hash_index.append(struct.pack('<i', 0))
+        path_hash_index = b''.join(path_hash_index)
+
+        # Полный индекс директорий: корень "/" и поддиректории "a/", "a/b/"
+        directories = {'/': []}
+        for path, location in entry_locations:
+            directory, _, filename = path.rpartition('/')
+            parts = directory.split('/') if directory else []
+            for depth in range(1, len(parts) + 1):
+                directories.setdefault('/'.join(parts[:depth]) + '/', [])
+            directories[directory + '/' if directory else '/'].append((filename, location))
+        full_directory_index = [struct.pack('<i', len(directories))]
+        for directory, directory_files in directories.items():
+            full_directory_index.append(_pack_fstring(directory))
+            full_directory_index.append(struct.pack('<i', len(directory_files)))
+            for filename, location in directory_files:
+                full_directory_index.append(_pack_fstring(filename) + struct.pack('<i', location))
+        full_directory_index = b''.join(full_directory_index)
+
+        # Основной индекс
+        index_offset = f.tell()
+        path_hash_index_offset = index_offset # Уточняется ниже, когда известен размер индекса
+        primary_tail = [struct.pack('<i', len(encoded_entries)), bytes(encoded_entries), struct.pack('<i', 0)]
+        primary_head = _pack_fstring(mount_point) + struct.pack('<iQ', len(entry_locations), path_hash_seed)
+        primary_size = (len(primary_head) + 4 + 16 + SHA1_SIZE + 4 + 16 + SHA1_SIZE
+                        + sum(len(part) for part in primary_tail))
+        path_hash_index_offset = index_offset + primary_size
+        full_directory_index_offset = path_hash_index_offset + len(path_hash_index)
+
+        primary_index = b''.join([
+            primary_head,
+            struct.pack('<Iqq', 1, path_hash_index_offset, len(path_hash_index)),
+            hashlib.sha1(path_hash_index).digest(),
+            struct.pack('<Iqq', 1, full_directory_index_offset, len(full_directory_index)),
+            hashlib.sha1(full_directory_index).digest(),
+        ] + primary_tail)
+
+        f.write(primary_index)
+        f.write(path_hash_index)
+        f.write(full_directory_index)
+
+        # Футер
+        method_names = b'Zlib'.ljust(COMPRESSION_METHOD_NAME_SIZE, b'\x00') + \
+            b'\x00' * (4 * COMPRESSION_METHOD_NAME_SIZE)
+        f.write(b'\x00' * 16 + b'\x00')
+        f.write(struct.pack('<IiQQ', PAK_MAGIC, PAK_WRITE_VERSION, index_offset, len(primary_index)))
+        f.write(hashlib.sha1(primary_index).digest())
+        f.write(method_names)
+        pak_size = f.tell()
+
+    if block_cache is not None:
+        block_cache.trim()
+    return pak_size
+
+def build_pak_from_dat(dat_path, output_path, reference_pak_path=None, workers=None, block_cache=None,
+                       compression_level=DEFAULT_COMPRESSION_LEVEL):
+    """
+    Упаковывает L10NString.dat в .pak. Если задан reference_pak_path
+    (например, оригинальный pakchunk502000-Windows_9999_P.pak), из него
+    берутся точка монтирования и seed хешей путей.
+    """
+    mount_point = DEFAULT_MOUNT_POINT
+    path_hash_seed = None
+    if reference_pak_path:
+        with PakReader(reference_pak_path) as reference:
+            mount_point = reference.mount_point
+            path_hash_seed = getattr(reference, 'path_hash_seed', None)
+
+    return write_pak(output_path, [("L10NString.dat", dat_path)], mount_point, path_hash_seed,
+                     compression_level=compression_level, workers=workers, block_cache=block_cache)
+
+# --- МАНИФЕСТ ДЕЛЬТА-ОБНОВЛЕНИЙ ---
+
+# Сжатые блоки .pak покрывают фиксированные окна по 64 КБ исходного .dat:
+# правка, меняющая длину строки, сдвигает все следующие окна, и блоки после
+# неё уже не совпадают. Поэтому дельта считается по несжатому .dat, разбитому
+# на куски по содержимому (границы привязаны к Key записей и после правки
+# сразу восстанавливаются). Updater распаковывает установленный .pak, берёт
+# с диска совпавшие куски, докачивает только сжатые блоки .pak, покрывающие
+# недостающие, и собирает .pak заново: блоки сжимает сам, заголовок записи и
+# индекс берёт с сервера. Результат проверяется по SHA-256 манифеста.
+
+def _dat_field_size(length_signed):
+    """Размер строки .dat в байтах (с терминатором) по полю длины."""
+    return length_signed if length_signed >= 0 else -length_signed * 2
+
+def dat_chunks(data, min_size=DAT_CHUNK_MIN_SIZE, max_size=DAT_CHUNK_MAX_SIZE, mask=DAT_CHUNK_MASK):
+    """
+    Делит содержимое .dat на куски по содержимому: (смещение, длина) подряд от начала.
+    Заголовок входит в первый кусок; если записи перестают разбираться,
+    остаток режется на куски по max_size. Копия этой функции есть в
+    aion2_updater.py - правила разбиения должны совпадать.
+    """
+    view = memoryview(data)
+    size = len(view)
+    chunks = []
+    start = 0
+    pos = min(DAT_HEADER_SIZE, size)
+    while pos + 4 <= size:
+        key_size = _dat_field_size(struct.unpack_from('<i', view, pos)[0])
+        key_end = pos + 4 + key_size
+        if key_size <= 0 or key_end + 4 > size:
+            break
+        record_end = key_end + 4 + _dat_field_size(struct.unpack_from('<i', view, key_end)[0])
+        if record_end > size or record_end <= key_end:
+            break
+        key = view[pos + 4 : key_end]
+        pos = record_end
+        length = pos - start
+        if length >= max_size or (length >= min_size and zlib.crc32(key) & mask == 0):
+            chunks.append((start, length))
+            start = pos
+    while start < size:
+        length = min(max_size, size - start)
+        chunks.append((start, length))
+        start += length
+    return chunks
+
+def _short_hash(data):
+    return hashlib.sha256(data).hexdigest()[:DELTA_HASH_LENGTH]
+
+def _detect_compression_level(dat, compressed_blocks, block_size, preferred_level=None):
+    """
+    Уровень zlib, которым сжаты блоки: первый уровень (начиная с preferred_level
+    и DEFAULT_COMPRESSION_LEVEL), воспроизводящий все блоки байт в байт.
+    None, если ни один не подходит (блоки сжаты другой реализацией zlib) -
+    тогда updater не сможет сжать блоки сам и скачает файл целиком.
+    """
+    view = memoryview(dat)
+    raw_blocks = [view[index * block_size : (index + 1) * block_size] for index in range(len(compressed_blocks))]
+    candidates = [preferred_level, DEFAULT_COMPRESSION_LEVEL, *range(10)]
+    for level in dict.fromkeys(level for level in candidates if level is not None):
+        # Сначала дешёвая проверка по первому блоку, затем все блоки
+        if zlib.compress(raw_blocks[0], level) != compressed_blocks[0]:
+            continue
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            recompressed = executor.map(lambda block: zlib.compress(block, level), raw_blocks)
+            if all(block == expected for block, expected in zip(recompressed, compressed_blocks)):
+                return level
+    return None
+
+def build_delta_manifest(pak_path, compression_level=None):
+    """
+    Манифест для дельта-обновления .pak из одного сжатого zlib файла (как у build_pak_from_dat):
+        sha256, size       - итоговый .pak;
+        head               - байты до первого сжатого блока (заголовок записи);
+        blocks             - [длина, хеш] сжатых блоков подряд после head, за ними индекс и футер;
+        block_size, compression_level - параметры сжатия блоков (уровень проверяется
+                             пересжатием всех блоков, compression_level - первый кандидат);
+        dat                - size, sha256, параметры разбиения и [длина, хеш] кусков несжатого .dat.
+    Старые версии .pak и их манифесты не нужны: updater разбивает свой .dat сам.
+    """
+    with PakReader(pak_path) as pak:
+        entries = list(pak)
+        if len(entries) != 1:
+            raise ValueError(f"дельта-манифест поддерживает .pak из одного файла, а в нём {len(entries)}")
+        entry = entries[0]
+        if entry.encrypted or (entry.compression_method or '').lower() != 'zlib':
+            raise ValueError(f"{entry.path}: для дельта-манифеста нужна запись со сжатием zlib без шифрования")
+        dat = pak.read_entry(entry)
+
+    blocks = entry.blocks
+    for (_, previous_end), (start, _) in zip(blocks, blocks[1:]):
+        if start != previous_end:
+            raise ValueError(f"{entry.path}: сжатые блоки записи идут не подряд")
+
+    with open(pak_path, 'rb') as f:
+        pak_data = f.read()
+    compressed_blocks = [pak_data[start:end] for start, end in blocks]
+    block_hashes = [[len(block), _short_hash(block)] for block in compressed_blocks]
+
+    view = memoryview(dat)
+    return {
+        "version": DELTA_MANIFEST_VERSION,
+        "file": os.path.basename(pak_path),
+        "entry": entry.path,
+        "size": len(pak_data),
+        "sha256": hashlib.sha256(pak_data).hexdigest(),
+        "head": blocks[0][0],
+        "block_size": entry.block_size,
+        "compression_level": _detect_compression_level(dat, compressed_blocks, entry.block_size, compression_level),
+        "blocks": block_hashes,
+        "dat": {
+            "size": len(dat),
+            "sha256": hashlib.sha256(dat).hexdigest(),
+            "chunking": {"min_size": DAT_CHUNK_MIN_SIZE, "max_size": DAT_CHUNK_MAX_SIZE, "mask": DAT_CHUNK_MASK},
+            "chunks": [[length, _short_hash(view[offset : offset + length])] for offset, length in dat_chunks(dat)],
+        },
+    }
+
+def write_delta_manifest(pak_path, manifest_path=None, compression_level=None):
+    """Пишет манифест рядом с .pak (<имя>.pak.manifest.json)."""
+    manifest_path = manifest_path or pak_path + DELTA_MANIFEST_SUFFIX
+    manifest = build_delta_manifest(pak_path, compression_level)
+
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(temp_path, manifest_path)
+    return manifest
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_release_manifest(release_dir, release_name=""):
+    """
+    Пишет release.json для папки с публикуемыми файлами: для каждого файла
+    (кроме манифестов) - размер, SHA-256, url относительно release.json и путь
+    установки внутри папки игры. Пути установки уже перечисленных файлов
+    сохраняются из прежнего release.json (их можно править вручную, например
+    для шрифтов), новые файлы по умолчанию ставятся в DEFAULT_RELEASE_TARGET_DIR.
+    Если рядом лежит <файл>.manifest.json, он указывается для дельта-обновления.
+    """
+    manifest_path = os.path.join(release_dir, RELEASE_MANIFEST_NAME)
+    previous_targets = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        previous_targets = {artifact["name"]: artifact["target"] for artifact in previous.get("artifacts", [])}
+        release_name = release_name or previous.get("release", "")
+
+    artifacts = []
+    for name in sorted(os.listdir(release_dir)):
+        path = os.path.join(release_dir, name)
+        if not os.path.isfile(path) or name.endswith(".json") or name.endswith(".tmp"):
+            continue
+        artifact = {
+            "name": name,
+            "url": urllib.parse.quote(name),
+            "size": os.path.getsize(path),
+            "sha256": _sha256_file(path),
+            "target": previous_targets.get(name, f"{DEFAULT_RELEASE_TARGET_DIR}/{name}"),
+        }
+        if os.path.exists(path + DELTA_MANIFEST_SUFFIX):
+            artifact["delta_manifest"] = urllib.parse.quote(name + DELTA_MANIFEST_SUFFIX)
+        artifacts.append(artifact)
+
+    release = {"version": RELEASE_MANIFEST_VERSION, "release": release_name, "artifacts": artifacts}
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(release, f, indent=4, ensure_ascii=False)
+    os.replace(temp_path, manifest_path)
+    return release
+
+# --- РЕЖИМЫ РАБОТЫ ---
+
+def paklist():
+    PAK_PATH = input("Введите путь к .pak файлу: ").strip().strip('"')
+
+    try:
+        with PakReader(PAK_PATH) as pak:
+            print(f"📦 {os.path.basename(PAK_PATH)}: версия {pak.version}, точка монтирования '{pak.mount_point}'")
+            for entry in pak:
+                method = entry.compression_method or "без сжатия"
+                print(f"   {entry.path}  {entry.uncompressed_size} байт ({method}, блоков: {len(entry.blocks)})")
+    except (OSError, ValueError) as e:
+        print(f"❌ Ошибка при чтении .pak: {e}")
+
+def pakextract():
+    PAK_PATH = input("Введите путь к .pak файлу: ").strip().strip('"')
+    ENTRY_NAME = input("Имя файла внутри .pak (Enter - L10NString.dat): ").strip() or "L10NString.dat"
+
+    try:
+        with PakReader(PAK_PATH) as pak:
+            entry = pak.find(ENTRY_NAME)
+            if entry is None:
+                print(f"❌ Файл {ENTRY_NAME} не найден в .pak")
+                return
+            output_path = os.path.basename(entry.path)
+            written = pak.extract_entry(entry, output_path)
+        print(f"✅ Извлечено {written} байт в {output_path}")
+    except (OSError, ValueError) as e:
+        print(f"❌ Ошибка при чтении .pak: {e}")
+
+def pakbuild():
+    DAT_PATH = input("Введите путь к L10NString.dat для упаковки: ").strip().strip('"')
+    REFERENCE_PAK_PATH = input("Оригинальный .pak для точки монтирования (Enter - по умолчанию): ").strip().strip('"')
+    OUTPUT_DIR = input("Папка для .pak (Enter - Localization pak file): ").strip().strip('"') or DEFAULT_RELEASE_DIR
+    OUTPUT_PAK_PATH = os.path.join(OUTPUT_DIR, "pakchunk502000-Windows_9999_P.pak")
+
+    try:
+        block_cache = BlockCache(DEFAULT_BLOCK_CACHE_DIR)
+        size = build_pak_from_dat(DAT_PATH, OUTPUT_PAK_PATH, REFERENCE_PAK_PATH or None, block_cache=block_cache,
+                                  compression_level=DEFAULT_COMPRESSION_LEVEL)
+        print(f"✅ Создан {OUTPUT_PAK_PATH}: {size} байт")
+        print(f"   Блоков из кеша: {block_cache.hits}, сжато заново: {block_cache.misses}")
+    except (OSError, ValueError) as e:
+        print(f"❌ Ошибка при создании .pak: {e}")
+        return
+
+    # Манифесты хранят размер и SHA-256 .pak: без пересборки updater сочтёт
+    # старую версию актуальной, а новую отклонит по контрольной сумме
+    try:
+        manifest = write_delta_manifest(OUTPUT_PAK_PATH, compression_level=DEFAULT_COMPRESSION_LEVEL)
+        print(f"✅ Обновлён манифест дельта-обновления: кусков .dat {len(manifest['dat']['chunks'])}")
+        if os.path.exists(os.path.join(OUTPUT_DIR, RELEASE_MANIFEST_NAME)):
+            release = write_release_manifest(OUTPUT_DIR)
+            print(f"✅ Обновлён {RELEASE_MANIFEST_NAME}: файлов в релизе {len(release['artifacts'])}")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Ошибка при обновлении манифестов: {e}")
+        print("   Не публикуйте .pak, пока манифесты не обновлены (режимы 4 и 5).")
+
+def pakmanifest():
+    PAK_PATH = input("Введите путь к опубликованному .pak файлу: ").strip().strip('"')
+
+    try:
+        manifest = write_delta_manifest(PAK_PATH)
+        print(f"✅ Манифест {PAK_PATH + DELTA_MANIFEST_SUFFIX}: блоков .pak {len(manifest['blocks'])}, "
+              f"кусков .dat {len(manifest['dat']['chunks'])}")
+        if manifest["compression_level"] is None:
+            print("⚠️ Уровень сжатия блоков не определён: updater будет скачивать этот .pak целиком.")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Ошибка при создании манифеста: {e}")
+
+def releasemanifest():
+    RELEASE_DIR = input("Папка с публикуемыми файлами (Enter - Localization pak file): ").strip().strip('"') \
+        or DEFAULT_RELEASE_DIR
+    RELEASE_NAME = input("Название релиза (Enter - без изменений): ").strip()
+
+    try:
+        release = write_release_manifest(RELEASE_DIR, RELEASE_NAME)
+        print(f"✅ {RELEASE_MANIFEST_NAME}: файлов в релизе {len(release['artifacts'])}")
+        for artifact in release["artifacts"]:
+            print(f"   {artifact['name']} -> {artifact['target']}")
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Ошибка при создании манифеста релиза: {e}")
+
+if __name__ == '__main__':
+    print("--- ИНСТРУМЕНТ .PAK AION2 ---")
+    mode = input("Выберите режим (1-PakList, 2-PakExtract, 3-PakBuild, 4-PakManifest, 5-ReleaseManifest): ")
+
+    if mode == "1":
+        paklist()
+    elif mode == "2":
+        pakextract()
+    elif mode == "3":
+        pakbuild()
+    elif mode == "4":
+        pakmanifest()
+    elif mode == "5":
+        releasemanifest()
+    else:
+        print("Неверный режим. Пожалуйста, введите число от 1 до 5.")
@@ -0,0 +1,558 @@
+import io
+import re
+import textwrap
+
+# --- ПОТОКОВОЕ ЧТЕНИЕ И ЗАПИСЬ PO ---
+#
+# Подмножество формата, которое используют наши инструменты: msgctxt, msgid,
+# msgstr, комментарии (#, #.), ссылки (#:), флаги (#, fuzzy), предыдущие
+# значения (#|) и устаревшие записи (#~). Чтение построчное, без построения
+# всего файла в памяти; запись даёт побайтно тот же текст, что POFile.save()
+# из polib (включая перенос строк длиннее 78 символов).
+
+DEFAULT_WRAP_WIDTH = 78
+READ_BUFFER_SIZE = 1024 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Порядок полей заголовка, как в polib.POFile.ordered_metadata()
+METADATA_ORDER = [
+    'Project-Id-Version',
+    'Report-Msgid-Bugs-To',
+    'POT-Creation-Date',
+    'PO-Revision-Date',
+    'Last-Translator',
+    'Language-Team',
+    'Language',
+    'MIME-Version',
+    'Content-Type',
+    'Content-Transfer-Encoding',
+    'Plural-Forms',
+]
+
+_UNESCAPE_RE = re.compile(r'\\(\\|n|t|r|v|b|f|")')
+_UNESCAPE_MAP = {'n': '\n', 't': '\t', 'r': '\r', 'v': '\v', 'b': '\b', 'f': '\f', '\\': '\\', '"': '"'}
+_UNESCAPED_QUOTE_RE = re.compile(r'([^\\]|^)"')
+_NATURAL_SORT_RE = re.compile('([0-9]+)')
+_SPECIAL_CHARS_RE = re.compile('[\\\\\t\r\n\v\b\f"]')
+# Символы, по которым str.splitlines() делит строку
+_LINE_BREAK_RE = re.compile('[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]')
+
+def escape(text):
+    if _SPECIAL_CHARS_RE.search(text) is None:
+        return text
+    return text.replace('\\', r'\\') \
+               .replace('\t', r'\t') \
+               .replace('\r', r'\r') \
+               .replace('\n', r'\n') \
+               .replace('\v', r'\v') \
+               .replace('\b', r'\b') \
+               .replace('\f', r'\f') \
+               .replace('"', r'\"')
+
+def unescape(text):
+    if '\\' not in text:
+        return text
+    return _UNESCAPE_RE.sub(lambda match: _UNESCAPE_MAP[match.group(1)], text)
+
+class PoEntry:
+    """
+    Компактная запись PO. Имена полей совпадают с polib.POEntry, поэтому
+    код, работающий с записями polib, работает и с ними.
+    """
+
+    __slots__ = ('msgctxt', 'msgid', 'msgstr', 'tcomment', 'comment', 'occurrences', 'flags',
+                 'previous_msgctxt', 'previous_msgid', 'obsolete')
+
+    def __init__(self, msgctxt=None, msgid='', msgstr='', tcomment='', comment='', occurrences=None,
+                 flags=None, previous_msgctxt=None, previous_msgid=None, obsolete=False):
+        self.msgctxt = msgctxt
+        self.msgid = msgid
+        self.msgstr = msgstr
+        self.tcomment = tcomment
+        self.comment = comment
+        self.occurrences = occurrences if occurrences is not None else []
+        self.flags = flags if flags is not None else []
+        self.previous_msgctxt = previous_msgctxt
+        self.previous_msgid = previous_msgid
+        self.obsolete = obsolete
+
+    @property
+    def fuzzy(self):
+        return 'fuzzy' in self.flags
+
+    @fuzzy.setter
+    def fuzzy(self, value):
+        if value and not self.fuzzy:
+            self.flags.insert(0, 'fuzzy')
+        elif not value and self.fuzzy:
+            self.flags.remove('fuzzy')
+
+    def __repr__(self):
+        return f"PoEntry(msgctxt={self.msgctxt!r}, msgid={self.msgid!r}, msgstr={self.msgstr!r})"
+
+# --- ЧТЕНИЕ ---
+
+# Допустимые переходы конечного автомата (как в polib._POFileParser)
+_ALL_STATES = ('st', 'he', 'gc', 'oc', 'fl', 'ct', 'pc', 'pm', 'pp', 'tc', 'ms', 'mp', 'mx', 'mi')
+_TRANSITIONS = {}
+
+def _add_transition(symbol, states, next_state):
+    for state in states:
+        _TRANSITIONS[(symbol, state)] = next_state
+
+_add_transition('tc', ['st', 'he'], 'he')
+_add_transition('tc', ['gc', 'oc', 'fl', 'tc', 'pc', 'pm', 'pp', 'ms', 'mp', 'mx', 'mi'], 'tc')
+for _symbol in ('gc', 'oc', 'fl', 'pc', 'pm', 'pp'):
+    _add_transition(_symbol, _ALL_STATES, _symbol)
+_add_transition('ct', ['st', 'he', 'gc', 'oc', 'fl', 'tc', 'pc', 'pm', 'pp', 'ms', 'mx'], 'ct')
+_add_transition('mi', ['st', 'he', 'gc', 'oc', 'fl', 'ct', 'tc', 'pc', 'pm', 'pp', 'ms', 'mx'], 'mi')
+_add_transition('mp', ['tc', 'gc', 'pc', 'pm', 'pp', 'mi'], 'mp')
+_add_transition('ms', ['mi', 'mp', 'tc'], 'ms')
+_add_transition('mx', ['mi', 'mx', 'mp', 'tc'], 'mx')
+_add_transition('mc', ['ct', 'mi', 'mp', 'ms', 'mx', 'pm', 'pp', 'pc'], 'mc')
+
+# Символы, после которых текущая запись завершена и начинается новая
+_STARTS_NEW_ENTRY = frozenset(('tc', 'gc', 'oc', 'fl', 'pp', 'pm', 'pc', 'ct', 'mi'))
+_KEYWORDS = {'msgctxt': 'ct', 'msgid': 'mi', 'msgstr': 'ms', 'msgid_plural': 'mp'}
+_PREVIOUS_KEYWORDS = {'msgid': 'pm', 'msgctxt': 'pc'}
+_CONTINUATION_FIELDS = {'ct': 'msgctxt', 'mi': 'msgid', 'ms': 'msgstr',
+                        'pm': 'previous_msgid', 'pc': 'previous_msgctxt'}
+
+def _parse_metadata(msgstr):
+    metadata = {}
+    key = None
+    for line in msgstr.splitlines():
+        try:
+            key, value = line.split(':', 1)
+            metadata[key] = value.strip()
+        except ValueError:
+            if key is not None:
+                metadata[key] += '\n' + line.strip()
+    return metadata
+
+class PoReader:
+    """
+    Построчный читатель PO-файла. Итерация выдаёт PoEntry по мере чтения.
+    Комментарии в начале файла попадают в header, запись с пустыми msgid и
+    msgctxt (заголовок) - в metadata, как у polib.pofile().
+
+    Использование:
+        with PoReader("String_UI.po") as po:
+            for entry in po:
+                print(entry.msgctxt, entry.msgstr)
+    """
+
+    def __init__(self, po_path, encoding='utf-8'):
+        self.po_path = po_path
+        self.header = ''
+        self.metadata = {}
+        self.metadata_is_fuzzy = []
+        self._metadata_found = False
+        self._file = open(po_path, 'r', encoding=encoding, buffering=READ_BUFFER_SIZE)
+        self._entries = self._parse()
+        # Заголовок файла стоит первым - читаем его сразу, чтобы metadata была доступна до итерации
+        self._pending = next(self._entries, None)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        if self._pending is not None:
+            entry, self._pending = self._pending, None
+            yield entry
+        yield from self._entries
+
+    def _syntax_error(self, line_number, detail=''):
+        return IOError(f"Syntax error in po file {self.po_path} (line {line_number}){detail}")
+
+    def _emit(self, entry):
+        # Первая неустаревшая запись с пустыми msgid и msgctxt - заголовок
+        if not self._metadata_found and not entry.obsolete and entry.msgid == '' and entry.msgctxt is None:
+            self._metadata_found = True
+            self.metadata = _parse_metadata(entry.msgstr)
+            self.metadata_is_fuzzy = entry.flags
+            return None
+        return entry
+
+    def _parse(self):
+        entry = PoEntry()
+        state = 'st'
+        last_is_comment = True
+        transitions = _TRANSITIONS
+        unescaped_quote = _UNESCAPED_QUOTE_RE.search
+
+        for line_number, line in enumerate(self._file, 1):
+            if line_number == 1 and line.startswith('\ufeff'):
+                line = line[1:]
+            line = line.strip()
+            if not line:
+                continue
+
+            obsolete = False
+            # Быстрый путь для самых частых строк: продолжение "..." и msgctxt/msgid/msgstr
+            first, _, rest = line.partition(' ')
+            if line[0] == '"' or (first in _KEYWORDS and rest):
+                if line[0] == '"':
+                    symbol = 'mc'
+                else:
+                    symbol = _KEYWORDS[first]
+                    line = rest.lstrip()
+                last_is_comment = False
+                body = line[1:-1]
+                if '"' in body and unescaped_quote(body):
+                    raise self._syntax_error(line_number, ": unescaped double quote found")
+            else:
+                classified = self._classify_line(line, line_number)
+                last_is_comment = self._last_token_is_comment
+                if classified is None:
+                    continue
+                symbol, line, obsolete = classified
+
+            next_state = transitions.get((symbol, state))
+            if next_state is None:
+                raise self._syntax_error(line_number)
+            if symbol in ('mp', 'mx', 'pp'):
+                raise IOError(f"{self.po_path} (line {line_number}): формы множественного числа не поддерживаются")
+
+            if symbol == 'mc':
+                # Продолжение не меняет состояние
+                text = unescape(line[1:-1])
+                if state == 'ms':
+                    entry.msgstr += text
+                elif state == 'mi':
+                    entry.msgid += text
+                else:
+                    field = _CONTINUATION_FIELDS.get(state)
+                    if field is not None:
+                        setattr(entry, field, getattr(entry, field) + text)
+                continue
+
+            if symbol in _STARTS_NEW_ENTRY and state in ('ms', 'mx'):
+                finished = self._emit(entry)
+                if finished is not None:
+                    yield finished
+                entry = PoEntry()
+
+            if symbol == 'ms':
+                entry.msgstr = unescape(line[1:-1])
+            elif symbol == 'mi':
+                entry.obsolete = obsolete
+                entry.msgid = unescape(line[1:-1])
+            elif symbol == 'ct':
+                entry.msgctxt = unescape(line[1:-1])
+            elif symbol == 'tc':
+                if next_state == 'he':
+                    if self.header != '':
+                        self.header += '\n'
+                    self.header += line[2:]
+                else:
+                    if entry.tcomment != '':
+                        entry.tcomment += '\n'
+                    tcomment = line.lstrip('#')
+                    entry.tcomment += tcomment[1:] if tcomment.startswith(' ') else tcomment
+            elif symbol == 'gc':
+                if entry.comment != '':
+                    entry.comment += '\n'
+                entry.comment += line[3:]
+            elif symbol == 'oc':
+                for occurrence in line[3:].split():
+                    path, separator, line_ref = occurrence.rpartition(':')
+                    if not separator or not line_ref.isdigit():
+                        path, line_ref = occurrence, ''
+                    entry.occurrences.append((path, line_ref))
+            elif symbol == 'fl':
+                entry.flags += [flag.strip() for flag in line[3:].split(',')]
+            elif symbol == 'pm':
+                entry.previous_msgid = unescape(line[1:-1])
+            elif symbol == 'pc':
+                entry.previous_msgctxt = unescape(line[1:-1])
+            state = next_state
+
+        # Последняя запись добавляется, если файл не закончился комментарием
+        if not last_is_comment:
+            finished = self._emit(entry)
+            if finished is not None:
+                yield finished
+
+    def _classify_line(self, line, line_number):
+        """
+        Разбор остальных строк (комментарии, #~, #|) по правилам polib.
+        Возвращает (символ, строка без маркера, устаревшая ли) или None, если строку
+        нужно пропустить. В _last_token_is_comment - начинается ли первый токен с '#'.
+        """
+        tokens = line.split(None, 2)
+        first = tokens[0]
+        self._last_token_is_comment = first.startswith('#')
+        if first == '#~|':
+            return None
+        obsolete = False
+        if first == '#~' and len(tokens) > 1:
+            line = line[3:].strip()
+            tokens = tokens[1:]
+            first = tokens[0]
+            obsolete = True
+        self._last_token_is_comment = first.startswith('#')
+
+        symbol = None
+        if first in _KEYWORDS and len(tokens) > 1:
+            symbol = _KEYWORDS[first]
+            line = line[len(first):].lstrip()
+        elif line[:1] == '"':
+            symbol = 'mc'
+        if symbol is not None:
+            if _UNESCAPED_QUOTE_RE.search(line[1:-1]):
+                raise self._syntax_error(line_number, ": unescaped double quote found")
+            return symbol, line, obsolete
+        if first == '#:':
+            return ('oc', line, obsolete) if len(tokens) > 1 else None
+        if line[:7] == 'msgstr[':
+            return 'mx', line, obsolete
+        if first == '#,':
+            return ('fl', line, obsolete) if len(tokens) > 1 else None
+        if first == '#' or first.startswith('##'):
+            return 'tc', line + ' ' if line == '#' else line, obsolete
+        if first == '#.':
+            return ('gc', line, obsolete) if len(tokens) > 1 else None
+        if first == '#|':
+            if len(tokens) <= 1:
+                raise self._syntax_error(line_number)
+            line = line[2:].lstrip()
+            if tokens[1].startswith('"'):
+                return 'mc', line, obsolete
+            if len(tokens) == 2:
+                raise self._syntax_error(line_number, ": invalid continuation line")
+            if tokens[1] in _PREVIOUS_KEYWORDS:
+                return _PREVIOUS_KEYWORDS[tokens[1]], line[len(tokens[1]):].lstrip(), obsolete
+            raise self._syntax_error(line_number, f": unknown keyword {tokens[1]}")
+        raise self._syntax_error(line_number)
+
+def read_po(po_path):
+    """Читает PO-файл целиком: (список PoEntry, metadata)."""
+    with PoReader(po_path) as po:
+        entries = list(po)
+        return entries, po.metadata
+
+# --- ЗАПИСЬ ---
+
+def _wrap_escaped(text, width):
+    """
+    То же, что textwrap.wrap(text, width, drop_whitespace=False, break_long_words=False)
+    для экранированной строки (в ней нет табуляций и переводов строк, поэтому
+    подготовка пробелов textwrap ничего не меняет): жадно набираем куски до width,
+    слишком длинный кусок занимает строку целиком.
+    """
+    lines = []
+    current = []
+    current_length = 0
+    for chunk in textwrap.TextWrapper.wordsep_re.split(text):
+        if not chunk:
+            continue
+        length = len(chunk)
+        if current_length + length <= width:
+            current.append(chunk)
+            current_length += length
+            continue
+        if current:
+            lines.append(''.join(current))
+        if length > width:
+            lines.append(chunk)
+            current, current_length = [], 0
+        else:
+            current, current_length = [chunk], length
+    if current:
+        lines.append(''.join(current))
+    return lines
+
+def _format_field(fieldname, prefix, value, wrapwidth, length_name=None):
+    # Повторяет polib._BaseEntry._str_field; для #| polib считает ширину по
+    # полному имени поля (previous_msgid), поэтому оно передаётся в length_name
+    escaped = escape(value)
+    lines = value.splitlines(True) if _LINE_BREAK_RE.search(value) else None
+    if lines is not None and len(lines) > 1:
+        lines = [''] + lines
+    elif wrapwidth > 0 and 2 * len(value) - len(escaped) > wrapwidth - len(length_name or fieldname) - 3:
+        # Каждый спецсимвол экранируется двумя символами, поэтому
+        # len(escaped) - len(value) - это число спецсимволов
+        lines = [''] + [unescape(item) for item in _wrap_escaped(escaped, wrapwidth - 2)]
+    else:
+        return [f'{prefix}{fieldname} "{escaped}"']
+
+    result = [f'{prefix}{fieldname} "{escape(lines[0])}"']
+    result.extend(f'{prefix}"{escape(line)}"' for line in lines[1:])
+    return result
+
+def _format_comment(text, prefix, wrapwidth, result):
+    for comment in text.split('\n'):
+        if wrapwidth > 0 and len(comment) + len(prefix) > wrapwidth:
+            result += textwrap.wrap(comment, wrapwidth, initial_indent=prefix,
+                                    subsequent_indent=prefix, break_long_words=False)
+        else:
+            result.append(prefix + comment)
+
+def format_entry(entry, wrapwidth=DEFAULT_WRAP_WIDTH):
+    """
+    Текст записи в формате polib.POEntry.__unicode__ (с завершающим переводом строки).
+    entry - PoEntry, polib.POEntry или кортеж (msgctxt, msgid, msgstr).
+    """
+    if isinstance(entry, tuple):
+        msgctxt, msgid, msgstr = entry
+        result = []
+        if msgctxt is not None:
+            result += _format_field('msgctxt', '', msgctxt, wrapwidth)
+        result += _format_field('msgid', '', msgid, wrapwidth)
+        result += _format_field('msgstr', '', msgstr, wrapwidth)
+        result.append('')
+        return '\n'.join(result)
+
+    obsolete = entry.obsolete
+    result = []
+    if entry.tcomment:
+        _format_comment(entry.tcomment, '# ', wrapwidth, result)
+    if not obsolete and entry.comment:
+        _format_comment(entry.comment, '#. ', wrapwidth, result)
+
+    if not obsolete and entry.occurrences:
+        filestr = ' '.join(f'{path}:{line}' if line else path for path, line in entry.occurrences)
+        if wrapwidth > 0 and len(filestr) + 3 > wrapwidth:
+            # Как в polib: дефисы временно заменяются, чтобы textwrap не рвал по ним пути
+            result += [line.replace('*', '-') for line in textwrap.wrap(
+                filestr.replace('-', '*'), wrapwidth, initial_indent='#: ',
+                subsequent_indent='#: ', break_long_words=False)]
+        else:
+            result.append('#: ' + filestr)
+
+    if entry.flags:
+        result.append('#, ' + ', '.join(entry.flags))
+
+    previous_prefix = '#~| ' if obsolete else '#| '
+    if entry.previous_msgctxt is not None:
+        result += _format_field('msgctxt', previous_prefix, entry.previous_msgctxt, wrapwidth,
+                                'previous_msgctxt')
+    if entry.previous_msgid is not None:
+        result += _format_field('msgid', previous_prefix, entry.previous_msgid, wrapwidth,
+                                'previous_msgid')
+
+    prefix = '#~ ' if obsolete else ''
+    if entry.msgctxt is not None:
+        result += _format_field('msgctxt', prefix, entry.msgctxt, wrapwidth)
+    result += _format_field('msgid', prefix, entry.msgid, wrapwidth)
+    result += _format_field('msgstr', prefix, entry.msgstr, wrapwidth)
+    result.append('')
+    return '\n'.join(result)
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part.lower() for part in _NATURAL_SORT_RE.split(name)]
+
+def ordered_metadata(metadata):
+    """Поля заголовка в порядке polib: известные поля по порядку, остальные - по алфавиту."""
+    metadata = dict(metadata)
+    ordered = [(name, metadata.pop(name)) for name in METADATA_ORDER if name in metadata]
+    ordered.extend((name, metadata[name]) for name in sorted(metadata, key=_natural_key))
+    return ordered
+
+def format_header(header='', metadata=None, metadata_is_fuzzy=False, wrapwidth=DEFAULT_WRAP_WIDTH):
+    """Комментарии файла и запись-заголовок (metadata) в формате polib."""
+    lines = []
+    for line in header.split('\n'):
+        if not line:
+            lines.append('#\n')
+        elif line[:1] in (',', ':'):
+            lines.append(f'#{line}\n')
+        else:
+            lines.append(f'# {line}\n')
+
+    msgstr = ''
+    if metadata:
+        msgstr = '\n'.join(f'{name}: {value}' for name, value in ordered_metadata(metadata)) + '\n'
+    header_entry = PoEntry(msgid='', msgstr=msgstr, flags=['fuzzy'] if metadata_is_fuzzy else [])
+    return ''.join(lines) + format_entry(header_entry, wrapwidth)
+
+def write_po(po_path, entries, metadata=None, header='', metadata_is_fuzzy=False, wrapwidth=DEFAULT_WRAP_WIDTH):
+    """
+    Потоково пишет PO-файл, побайтно совпадающий с результатом POFile.save() из polib
+    для тех же записей. entries - любой итерируемый источник PoEntry, polib.POEntry
+    или кортежей (msgctxt, msgid, msgstr); устаревшие записи, как в polib, идут в конце.
+    Возвращает число записанных записей.
+    """
+    obsolete_entries = []
+    written = 0
+    with io.open(po_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(format_header(header, metadata, metadata_is_fuzzy, wrapwidth))
+        for entry in entries:
+            if not isinstance(entry, tuple) and entry.obsolete:
+                obsolete_entries.append(entry)
+                continue
+            f.write('\n')
+            f.write(format_entry(entry, wrapwidth))
+            written += 1
+        for entry in obsolete_entries:
+            f.write('\n')
+            f.write(format_entry(entry, wrapwidth))
+            written += 1
+    return written
+
+# --- БЕНЧМАРК ---
+
+def generate_benchmark_po(po_path, entry_count=125000):
+    """Создаёт PO-файл, похожий на наши категории: длинные и многострочные строки, кириллица, fuzzy."""
+    entries = []
+    for index in range(entry_count):
+        value = f"Item description {index}: deals {index % 977} damage to \"target\" within {index % 13} m."
+        translation = f"Описание предмета {index}: наносит {index % 977} ед. урона цели \"{index}\"."
+        if index % 7 == 0:
+            value += " Lasts for a long time and can be stacked up to five times with other effects."
+            translation += " Действует долго и суммируется до пяти раз с другими эффектами."
+        if index % 11 == 0:
+            value += "\nSecond line\twith tab"
+            translation += "\nВторая строка"
+        entry = PoEntry(msgctxt=f"String_UI_Item_{index:06d}", msgid=value, msgstr=translation)
+        if index % 17 == 0:
+            entry.flags.append('fuzzy')
+            entry.comment = f"(OLD TRANSLATION: Старый перевод {index})"
+        entries.append(entry)
+
+    metadata = {'Project-Id-Version': 'Aion2 Localization', 'Language': 'ru',
+                'Content-Type': 'text/plain; charset=UTF-8', 'Content-Transfer-Encoding': '8bit'}
+    write_po(po_path, entries, metadata)
+    return entry_count
+
+def benchmark_po(po_path="benchmark_125k.po", entry_count=125000):
+    """
+    Сравнивает polib и po_stream на сгенерированном файле: чтение, запись,
+    а также проверяет, что записанные файлы побайтно совпадают.
+    """
+    import time
+    import polib
+
+    generate_benchmark_po(po_path, entry_count)
+    results = {}
+
+    start = time.perf_counter()
+    polib_file = polib.pofile(po_path)
+    results['polib_read'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stream_entries, metadata = read_po(po_path)
+    results['stream_read'] = time.perf_counter() - start
+
+    polib_out = po_path + ".polib.po"
+    stream_out = po_path + ".stream.po"
+
+    start = time.perf_counter()
+    polib_file.save(polib_out)
+    results['polib_write'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    write_po(stream_out, stream_entries, metadata)
+    results['stream_write'] = time.perf_counter() - start
+
+    with open(polib_out, 'rb') as a, open(stream_out, 'rb') as b:
+        results['identical'] = a.read() == b.read()
+    results['entries'] = len(stream_entries)
+    return results
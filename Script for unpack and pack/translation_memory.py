@@ -0,0 +1,272 @@
+import os
+import re
+import math
+import array
+import pickle
+import struct
+import collections
+import po_stream
+
+# --- ПАМЯТЬ ПЕРЕВОДОВ (TM) ---
+#
+# Нечеткий поиск переводов по всем парам (Value -> Russian) из PO-файлов.
+# Каждая уникальная исходная строка разбивается на символьные триграммы,
+# триграммы нумеруются, инвертированный индекс хранит для номера триграммы
+# список строк, где она есть, а для строки - номера ее триграмм.
+# Сходство - коэффициент Дайса по множествам триграмм:
+#     2 * |A ∩ B| / (|A| + |B|)
+# Запрос не перебирает все 125k строк: кандидаты берутся только из списков
+# самых редких триграмм запроса (prefix filtering) и отсекаются по длине и
+# по числу совпадений в этих списках, точное сходство считается лишь для оставшихся.
+
+TM_MAGIC = b'AIONTM\x00\x00'
+TM_VERSION = 1
+TM_HEADER = struct.Struct('<8sI')
+DEFAULT_THRESHOLD = 0.75
+DEFAULT_SUGGESTION_LIMIT = 3
+# Когда удаленных строк становится больше этой доли, индекс пересобирается
+COMPACT_DEAD_RATIO = 0.25
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_source(text):
+    """Нормализация для сравнения: регистр и пробелы не важны."""
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+def trigrams(text):
+    """Множество символьных триграмм нормализованной строки (с пробелами по краям)."""
+    padded = f" {normalize_source(text)} "
+    if len(padded) < 3:
+        return {padded}
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _po_file_signature(po_path):
+    stat = os.stat(po_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def iter_translated_pairs(po_path):
+    """(msgid, msgstr) готовых переводов PO-файла: без fuzzy, устаревших и пустых msgstr."""
+    with po_stream.PoReader(po_path) as po:
+        for entry in po:
+            if entry.obsolete or entry.fuzzy or not entry.msgid or not entry.msgstr:
+                continue
+            yield entry.msgid, entry.msgstr
+
+class TranslationMemory:
+    """
+    Память переводов с триграммным инвертированным индексом.
+
+    Индекс сохраняется на диск и обновляется инкрементально: для каждого PO-файла
+    хранятся его размер/mtime и внесенные пары, при изменении файла убираются
+    только его старые пары и добавляются новые.
+
+    Использование:
+        memory = TranslationMemory.load("po_categories/.translation_memory.tm")
+        memory.update_from_po_files(["po_categories"])
+        memory.save()
+        for score, source, translation in memory.search("Deals damage to the target"):
+            ...
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path
+        self.sources = []                   # id -> исходная строка (None - удалена)
+        self.source_ids = {}                # исходная строка -> id
+        self.translations = []              # id -> Counter {перевод: число вхождений}
+        self.source_grams = []              # id -> array('I') с номерами триграмм строки
+        self.gram_ids = {}                  # триграмма -> номер
+        self.postings = []                  # номер триграммы -> array('I') с id строк
+        self.files = {}                     # путь PO -> {'signature': [...], 'pairs': [[msgid, msgstr], ...]}
+        self.dead_count = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.source_ids)
+
+    # --- ЗАГРУЗКА И СОХРАНЕНИЕ ---
+
+    @classmethod
+    def load(cls, index_path):
+        """Загружает индекс с диска; при отсутствии или несовместимой версии возвращает пустую память."""
+        memory = cls(index_path)
+        try:
+            with open(index_path, 'rb') as f:
+                magic, version = TM_HEADER.unpack(f.read(TM_HEADER.size))
+                if magic != TM_MAGIC or version != TM_VERSION:
+                    print(f"⚠️ Индекс памяти переводов {os.path.basename(index_path)} устарел, будет построен заново.")
+                    return memory
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return memory
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать индекс памяти переводов ({e}), будет построен заново.")
+            return memory
+        memory.__dict__.update(state)
+        memory.index_path = index_path
+        memory.dirty = False
+        return memory
+
+    def save(self, index_path=None):
+        """Атомарно сохраняет индекс (временный файл + os.replace)."""
+        index_path = index_path or self.index_path
+        state = {name: value for name, value in self.__dict__.items() if name not in ('index_path', 'dirty')}
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(TM_HEADER.pack(TM_MAGIC, TM_VERSION))
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, index_path)
+        self.index_path = index_path
+        self.dirty = False
+
+    # --- НАПОЛНЕНИЕ ---
+
+    def add(self, source, translation):
+        """Добавляет пару (исходная строка, перевод)."""
+        source_id = self.source_ids.get(source)
+        if source_id is None:
+            source_id = len(self.sources)
+            grams = array.array('I')
+            for gram in trigrams(source):
+                gram_id = self.gram_ids.get(gram)
+                if gram_id is None:
+                    gram_id = self.gram_ids[gram] = len(self.postings)
+                    self.postings.append(array.array('I'))
+                self.postings[gram_id].append(source_id)
+                grams.append(gram_id)
+            self.sources.append(source)
+            self.source_ids[source] = source_id
+            self.translations.append(collections.Counter())
+            self.source_grams.append(grams)
+        self.translations[source_id][translation] += 1
+        self.dirty = True
+
+    def remove(self, source, translation):
+        """Убирает одно вхождение пары; строка без переводов помечается удаленной."""
+        source_id = self.source_ids.get(source)
+        if source_id is None:
+            return
+        counter = self.translations[source_id]
+        counter[translation] -= 1
+        if counter[translation] <= 0:
+            del counter[translation]
+        if not counter:
+            # Из списков триграмм id не вычищаем - его отсеет проверка sources[id] is None
+            self.sources[source_id] = None
+            self.source_grams[source_id] = array.array('I')
+            del self.source_ids[source]
+            self.dead_count += 1
+        self.dirty = True
+
+    def compact(self):
+        """Пересобирает индекс без удаленных строк."""
+        live = [(source, self.translations[source_id]) for source_id, source in enumerate(self.sources) if source is not None]
+        self.sources, self.source_ids, self.translations = [], {}, []
+        self.source_grams, self.gram_ids, self.postings, self.dead_count = [], {}, [], 0
+        for source, counter in live:
+            for translation, count in counter.items():
+                for _ in range(count):
+                    self.add(source, translation)
+
+    def update_from_po_files(self, po_paths):
+        """
+        Синхронизирует память с набором PO-файлов (пути к файлам или директориям).
+        Перечитываются только новые и измененные файлы; пары удаленных файлов убираются.
+        Возвращает число перечитанных файлов.
+        """
+        if isinstance(po_paths, str):
+            po_paths = [po_paths]
+        current = []
+        for path in po_paths:
+            if os.path.isdir(path):
+                current.extend(os.path.join(root, name) for root, _, names in os.walk(path) for name in names if name.endswith('.po'))
+            elif os.path.exists(path):
+                current.append(path)
+        current = {os.path.abspath(path) for path in current}
+
+        for po_path in [path for path in self.files if path not in current]:
+            for source, translation in self.files.pop(po_path)['pairs']:
+                self.remove(source, translation)
+            self.dirty = True
+
+        reread = 0
+        for po_path in sorted(current):
+            signature = _po_file_signature(po_path)
+            known = self.files.get(po_path)
+            if known is not None and known['signature'] == signature:
+                continue
+            try:
+                pairs = [[source, translation] for source, translation in iter_translated_pairs(po_path)]
+            except Exception as e:
+                print(f"❌ Ошибка при чтении PO-файла {po_path} для памяти переводов: {e}")
+                continue
+            if known is not None:
+                for source, translation in known['pairs']:
+                    self.remove(source, translation)
+            for source, translation in pairs:
+                self.add(source, translation)
+            self.files[po_path] = {'signature': signature, 'pairs': pairs}
+            self.dirty = True
+            reread += 1
+
+        if self.dead_count > COMPACT_DEAD_RATIO * max(len(self.sources), 1):
+            self.compact()
+        return reread
+
+    # --- ПОИСК ---
+
+    def search(self, text, threshold=DEFAULT_THRESHOLD, limit=DEFAULT_SUGGESTION_LIMIT):
+        """
+        Ищет похожие исходные строки. Возвращает до limit кортежей
+        (сходство, исходная строка, самый частый перевод), по убыванию сходства.
+        """
+        grams = trigrams(text)
+        query_size = len(grams)
+        query = {self.gram_ids[gram] for gram in grams if gram in self.gram_ids}
+        # Для сходства >= threshold у строки должно быть от min_size до max_size триграмм,
+        # а общих триграмм - не меньше min_overlap (при самой короткой допустимой строке)
+        min_size = query_size * threshold / (2 - threshold)
+        max_size = query_size * (2 - threshold) / threshold
+        min_overlap = max(1, math.ceil(min_size))
+
+        # Prefix filtering: строка с min_overlap общими триграммами обязательно содержит
+        # хотя бы одну из (query_size - min_overlap + 1) самых редких триграмм запроса.
+        # Неизвестные индексу триграммы самые "редкие", но кандидатов не дают.
+        prefix_size = query_size - min_overlap + 1
+        ordered = sorted(query, key=lambda gram_id: len(self.postings[gram_id]))
+        hits = collections.Counter()
+        for gram_id in ordered[:max(0, prefix_size - (query_size - len(query)))]:
+            hits.update(self.postings[gram_id])
+        # Вне префикса осталось min_overlap - 1 триграмм: больше совпадений там не набрать
+        rest = query_size - prefix_size
+
+        results = []
+        for source_id, prefix_hits in hits.items():
+            size = len(self.source_grams[source_id])
+            if size < min_size or size > max_size or self.sources[source_id] is None:
+                continue
+            if prefix_hits + rest < threshold * (query_size + size) / 2:
+                continue
+            score = 2 * len(query.intersection(self.source_grams[source_id])) / (query_size + size)
+            if score >= threshold:
+                results.append((score, source_id))
+
+        results.sort(key=lambda item: (-item[0], item[1]))
+        return [(score, self.sources[source_id], self.translations[source_id].most_common(1)[0][0])
+                for score, source_id in results[:limit]]
+
+    def suggest(self, text, threshold=DEFAULT_THRESHOLD):
+        """Лучшая подсказка (сходство, исходная строка, перевод) или None."""
+        results = self.search(text, threshold, 1)
+        return results[0] if results else None
+
+def load_translation_memory(po_paths, index_path):
+    """
+    Загружает память переводов, досинхронизирует ее с PO-файлами
+    и сохраняет индекс, если что-то изменилось.
+    """
+    memory = TranslationMemory.load(index_path)
+    reread = memory.update_from_po_files(po_paths)
+    if memory.dirty:
+        memory.save()
+    print(f"🧠 Память переводов: {len(memory)} исходных строк (перечитано PO-файлов: {reread})")
+    return memory
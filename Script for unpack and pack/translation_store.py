@@ -0,0 +1,519 @@
+import os
+import sqlite3
+import time
+import contextlib
+import itertools
+import localization_tool
+import po_stream
+import key_categories
+
+# --- ХРАНИЛИЩЕ ПЕРЕВОДОВ (SQLite) ---
+#
+# Вместо JSON-выгрузок и десятков PO-файлов все записи лежат в одной базе:
+# Key, категория, исходный Value (с хешем), перевод и служебные поля.
+# Индексы:
+#   - Key (PRIMARY KEY)                      - поиск и upsert по Key
+#   - (category, position)                   - выгрузка категории в порядке .dat
+#   - (category, position) WHERE translation = '' - "непереведенное в QuestString"
+#   - value_hash                             - записи с тем же Value (см. _value_hash)
+#   - changed_patch                          - "изменилось начиная с патча X"
+#   - FTS5 с триграммным токенизатором       - поиск подстроки в Value и переводе
+# Полнотекстовый индекс обновляется триггерами, поэтому любые изменения
+# таблицы records (импорт, upsert переводов) сразу видны поиску.
+
+DEFAULT_STORE_PATH = "aion2_translations.db"
+STORE_SCHEMA_VERSION = 1
+# Подстроки короче триграммы ищутся через LIKE (полнотекстовый индекс их не находит)
+FTS_MIN_QUERY_LENGTH = 3
+DEFAULT_SEARCH_LIMIT = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    source_path TEXT NOT NULL,
+    imported_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS records (
+    key TEXT PRIMARY KEY,
+    position INTEGER,
+    category TEXT NOT NULL,
+    value TEXT NOT NULL,
+    value_hash BLOB NOT NULL,
+    key_type INTEGER NOT NULL DEFAULT 0,
+    translation TEXT NOT NULL DEFAULT '',
+    translation_type INTEGER NOT NULL DEFAULT -1,
+    fuzzy INTEGER NOT NULL DEFAULT 0,
+    comment TEXT NOT NULL DEFAULT '',
+    previous_value TEXT,
+    changed_patch INTEGER,
+    seen_patch INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS records_category ON records(category, position);
+CREATE INDEX IF NOT EXISTS records_untranslated ON records(category, position) WHERE translation = '';
+CREATE INDEX IF NOT EXISTS records_value_hash ON records(value_hash);
+CREATE INDEX IF NOT EXISTS records_changed_patch ON records(changed_patch);
+CREATE INDEX IF NOT EXISTS records_position ON records(position);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+    value, translation, content='records', content_rowid='rowid', tokenize='trigram'
+);
+"""
+
+# Триггеры синхронизации полнотекстового индекса с records. На время массового
+# импорта они снимаются, а индекс перестраивается один раз ('rebuild'):
+# построчное обновление триграмм в разы медленнее.
+_FTS_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS records_fts_insert AFTER INSERT ON records BEGIN
+    INSERT INTO records_fts(rowid, value, translation) VALUES (new.rowid, new.value, new.translation);
+END""",
+    """CREATE TRIGGER IF NOT EXISTS records_fts_delete AFTER DELETE ON records BEGIN
+    INSERT INTO records_fts(records_fts, rowid, value, translation) VALUES ('delete', old.rowid, old.value, old.translation);
+END""",
+    """CREATE TRIGGER IF NOT EXISTS records_fts_update AFTER UPDATE OF value, translation ON records
+WHEN old.value IS NOT new.value OR old.translation IS NOT new.translation BEGIN
+    INSERT INTO records_fts(records_fts, rowid, value, translation) VALUES ('delete', old.rowid, old.value, old.translation);
+    INSERT INTO records_fts(rowid, value, translation) VALUES (new.rowid, new.value, new.translation);
+END""",
+)
+_FTS_TRIGGER_NAMES = ('records_fts_insert', 'records_fts_delete', 'records_fts_update')
+
+# Импорт .dat: новый Key вставляется, у известного обновляются позиция и Value.
+# Если Value изменился - запоминается патч и прежний Value, перевод становится fuzzy.
+# В SET выражения records.* - значения строки до обновления.
+_UPSERT_DAT_RECORD = """
+INSERT INTO records (key, position, category, value, value_hash, key_type, changed_patch, seen_patch)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    position = excluded.position,
+    category = excluded.category,
+    key_type = excluded.key_type,
+    seen_patch = excluded.seen_patch,
+    fuzzy = CASE WHEN records.value != excluded.value AND records.translation != '' THEN 1 ELSE records.fuzzy END,
+    previous_value = CASE WHEN records.value != excluded.value THEN records.value ELSE records.previous_value END,
+    changed_patch = CASE WHEN records.value != excluded.value THEN excluded.changed_patch ELSE records.changed_patch END,
+    value = excluded.value,
+    value_hash = excluded.value_hash
+"""
+
+# Импорт PO: перевод, fuzzy и комментарий берутся из PO; Key, которых в базе
+# еще нет, добавляются без позиции (в выгрузках идут после записей .dat)
+_UPSERT_PO_RECORD = """
+INSERT INTO records (key, category, value, value_hash, translation, translation_type, fuzzy, comment)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    translation = excluded.translation,
+    translation_type = excluded.translation_type,
+    fuzzy = excluded.fuzzy,
+    comment = excluded.comment
+"""
+
+_RECORD_ORDER = "ORDER BY position IS NULL, position, key"
+
+def _fts_phrase(text):
+    """Подстрока как фраза FTS5 (кавычки внутри удваиваются)."""
+    return '"' + text.replace('"', '""') + '"'
+
+def _like_pattern(text):
+    """Подстрока как шаблон LIKE с экранированием % и _."""
+    return '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+class TranslationStore:
+    """
+    Хранилище переводов на SQLite (режим WAL: чтение не блокируется записью).
+
+    Использование:
+        with TranslationStore("aion2_translations.db") as store:
+            store.import_dat("L10NString.dat", "patch-2025-01")
+            store.import_po("po_categories")
+            for key, value in store.untranslated("QuestString"):
+                ...
+            store.export_dat("repacked_L10NString_RU.dat")
+
+    Массовые операции выполняются одной транзакцией через executemany,
+    запросы отбора обслуживаются индексами (см. схему выше).
+    """
+
+    def __init__(self, db_path=DEFAULT_STORE_PATH, rules_path=key_categories.CATEGORY_RULES_FILE, separator='_'):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # В режиме WAL NORMAL не теряет целостность базы, но не ждет fsync на каждую транзакцию
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA temp_store=MEMORY")
+        self.connection.execute("PRAGMA cache_size=-65536")
+        self.connection.executescript(_SCHEMA)
+        for trigger in _FTS_TRIGGERS:
+            self.connection.execute(trigger)
+        self.connection.execute(f"PRAGMA user_version={STORE_SCHEMA_VERSION}")
+        self.classify = key_categories.CategoryClassifier.from_rules(rules_path, separator).classify
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    # --- ИМПОРТ ---
+
+    @contextlib.contextmanager
+    def _bulk_transaction(self):
+        """Транзакция массового импорта: без триггеров FTS, индекс перестраивается в конце."""
+        with self.connection:
+            self.connection.execute("BEGIN")
+            for name in _FTS_TRIGGER_NAMES:
+                self.connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+            yield
+            self.connection.execute("INSERT INTO records_fts(records_fts) VALUES ('rebuild')")
+            for trigger in _FTS_TRIGGERS:
+                self.connection.execute(trigger)
+
+    def import_dat(self, dat_path, patch_name=None):
+        """
+        Импортирует записи .dat (оригинал очередного патча) как патч patch_name.
+
+        Позиции записей - порядок в файле; у повторяющихся Key берется первое вхождение.
+        Key, которых нет в новом .dat, удаляются. Возвращает статистику
+        {'patch', 'total', 'inserted', 'changed', 'deleted'} или None при ошибке.
+        """
+        try:
+            table = localization_tool.RecordTable.from_dat(dat_path)
+        except Exception as e:
+            print(f"❌ Ошибка при чтении бинарного файла {dat_path}: {e}")
+            return None
+        if not len(table):
+            print(f"❌ В файле {dat_path} не найдено записей.")
+            return None
+        patch_name = patch_name or f"{os.path.basename(dat_path)} {time.strftime('%Y-%m-%d %H:%M:%S')}"
+
+        if self.connection.execute("SELECT 1 FROM patches WHERE name = ?", (patch_name,)).fetchone():
+            print(f"❌ Патч с именем '{patch_name}' уже импортирован.")
+            return None
+
+        with self._bulk_transaction():
+            # Key, уже известные базе (в том числе добавленные только из PO, без позиции)
+            known = {key for (key,) in self.connection.execute("SELECT key FROM records")}
+            patch_id = self.connection.execute(
+                "INSERT INTO patches (name, source_path, imported_at) VALUES (?, ?, ?)",
+                (patch_name, os.path.abspath(dat_path), time.strftime('%Y-%m-%d %H:%M:%S')),
+            ).lastrowid
+
+            seen = set()
+            classify = self.classify
+            value_hash = localization_tool._value_hash
+
+            def rows():
+                for position, (key, value, key_type) in enumerate(zip(table.keys, table.values, table.key_types)):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    yield key, position, classify(key), value, value_hash(value), key_type, patch_id, patch_id
+
+            self.connection.executemany(_UPSERT_DAT_RECORD, rows())
+            deleted = self.connection.execute(
+                "DELETE FROM records WHERE seen_patch IS NOT ? AND position IS NOT NULL", (patch_id,)
+            ).rowcount
+            touched = self.connection.execute("SELECT COUNT(*) FROM records WHERE changed_patch = ?", (patch_id,)).fetchone()[0]
+
+        # Новые записи тоже получают changed_patch этого патча, их вычитаем из touched
+        inserted = len(seen - known)
+        stats = {'patch': patch_name, 'total': len(seen), 'inserted': inserted, 'changed': touched - inserted, 'deleted': deleted}
+        print(f"📥 Импортирован патч '{patch_name}': {stats['total']} записей "
+              f"(новых: {stats['inserted']}, изменен Value: {stats['changed']}, удалено: {stats['deleted']})")
+        return stats
+
+    def import_po(self, po_paths):
+        """
+        Импортирует переводы из PO-файлов (файл, директория или список путей).
+        msgctxt - Key, msgstr - перевод (UTF-16), флаг fuzzy и комментарий сохраняются.
+        Возвращает число импортированных записей.
+        """
+        classify = self.classify
+        value_hash = localization_tool._value_hash
+        utf16 = localization_tool.ENCODING_UTF16
+        imported = 0
+
+        def rows(entries):
+            nonlocal imported
+            for entry in entries:
+                if entry.obsolete or not entry.msgid or not entry.msgctxt or not entry.msgctxt.strip():
+                    continue
+                key = entry.msgctxt.strip()
+                imported += 1
+                yield key, classify(key), entry.msgid, value_hash(entry.msgid), entry.msgstr, utf16, int('fuzzy' in entry.flags), entry.comment
+
+        with self._bulk_transaction():
+            for po_file in localization_tool._collect_po_files(po_paths):
+                try:
+                    # Записи PO берутся из кеша разбора, если файл не менялся
+                    entries = localization_tool.read_po_cached(po_file)[0]
+                except FileNotFoundError:
+                    print(f"❌ Ошибка: Файл не найден по пути {po_file}")
+                    continue
+                except Exception as e:
+                    print(f"❌ Ошибка при чтении или парсинге PO-файла {po_file}: {e}")
+                    continue
+                self.connection.executemany(_UPSERT_PO_RECORD, rows(entries))
+        print(f"📥 Импортировано записей из PO: {imported}")
+        return imported
+
+    def upsert_translations(self, rows):
+        """
+        Массово записывает переводы. rows - последовательность (Key, перевод)
+        или (Key, перевод, fuzzy). Записи с неизвестным Key пропускаются.
+        Возвращает число обновленных записей.
+        """
+        def normalized():
+            for row in rows:
+                key, translation = row[0], row[1]
+                fuzzy = int(bool(row[2])) if len(row) > 2 else 0
+                yield translation, fuzzy, key
+
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany("UPDATE records SET translation = ?, fuzzy = ? WHERE key = ?", normalized())
+            return self.connection.total_changes - before
+
+    # --- ЗАПРОСЫ ---
+
+    def get(self, key):
+        """Запись по Key: словарь с полями таблицы или None."""
+        cursor = self.connection.execute("SELECT * FROM records WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def categories(self):
+        """Список (категория, всего записей, без перевода)."""
+        return self.connection.execute(
+            "SELECT category, COUNT(*), SUM(translation = '') FROM records GROUP BY category ORDER BY category"
+        ).fetchall()
+
+    def untranslated(self, category=None, limit=None):
+        """(Key, Value) записей без перевода в порядке .dat (частичный индекс records_untranslated)."""
+        sql = "SELECT key, value FROM records WHERE translation = ''"
+        params = []
+        if category:
+            sql += " AND category = ?"
+            params.append(category)
+        sql += " " + _RECORD_ORDER
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self.connection.execute(sql, params).fetchall()
+
+    def patches(self):
+        """Список импортированных патчей (id, имя, время импорта)."""
+        return self.connection.execute("SELECT id, name, imported_at FROM patches ORDER BY id").fetchall()
+
+    def changed_since(self, patch_name):
+        """
+        (Key, прежний Value, новый Value) записей, у которых Value появился или
+        изменился в патчах после patch_name. None, если такого патча нет.
+        """
+        row = self.connection.execute("SELECT id FROM patches WHERE name = ?", (patch_name,)).fetchone()
+        if row is None:
+            return None
+        return self.connection.execute(
+            "SELECT key, previous_value, value FROM records WHERE changed_patch > ? ORDER BY changed_patch, position",
+            (row[0],),
+        ).fetchall()
+
+    def find_substring(self, text, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        (Key, Value, перевод) записей, где text встречается в Value или переводе
+        (без учета регистра). Поиск идет по триграммному индексу FTS5.
+        """
+        if len(text) >= FTS_MIN_QUERY_LENGTH:
+            return self.connection.execute(
+                "SELECT r.key, r.value, r.translation FROM records_fts "
+                "JOIN records AS r ON r.rowid = records_fts.rowid "
+                "WHERE records_fts MATCH ? ORDER BY r.position IS NULL, r.position LIMIT ?",
+                (_fts_phrase(text), limit),
+            ).fetchall()
+        pattern = _like_pattern(text)
+        return self.connection.execute(
+            "SELECT key, value, translation FROM records WHERE value LIKE ? ESCAPE '\\' OR translation LIKE ? ESCAPE '\\' "
+            + _RECORD_ORDER + " LIMIT ?",
+            (pattern, pattern, limit),
+        ).fetchall()
+
+    def find_by_value(self, value):
+        """(Key, Value, перевод) записей с тем же нормализованным Value (индекс value_hash)."""
+        return self.connection.execute(
+            "SELECT key, value, translation FROM records WHERE value_hash = ? " + _RECORD_ORDER,
+            (localization_tool._value_hash(value),),
+        ).fetchall()
+
+    # --- ЭКСПОРТ ---
+
+    def _iter_po_entries(self, rows):
+        for key, value, translation, fuzzy, comment, previous_value in rows:
+            yield po_stream.PoEntry(
+                msgctxt=key,
+                msgid=value,
+                msgstr=translation,
+                comment=comment,
+                flags=['fuzzy'] if fuzzy else [],
+                previous_msgid=previous_value if fuzzy else None,
+            )
+
+    def export_po(self, po_path, category=None, metadata=None):
+        """Выгружает записи (всю базу или одну категорию) в PO-файл в порядке .dat. Возвращает число записей."""
+        sql = "SELECT key, value, translation, fuzzy, comment, previous_value FROM records"
+        params = ()
+        if category:
+            sql += " WHERE category = ?"
+            params = (category,)
+        sql += " " + _RECORD_ORDER
+        written = po_stream.write_po(po_path, self._iter_po_entries(self.connection.execute(sql, params)), metadata)
+        print(f"💾 Записано {written} записей в {po_path}")
+        return written
+
+    def export_po_categories(self, output_dir="po_categories", metadata=None):
+        """
+        Выгружает базу в PO-файлы по категориям (как Create Dictionary.py) одним
+        проходом по индексу (category, position). Возвращает число файлов.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        rows = self.connection.execute(
+            "SELECT category, key, value, translation, fuzzy, comment, previous_value FROM records "
+            "ORDER BY category, position IS NULL, position"
+        )
+        exported = 0
+        for category, group in itertools.groupby(rows, key=lambda row: row[0]):
+            po_path = os.path.join(output_dir, f"{category}.po")
+            po_stream.write_po(po_path, self._iter_po_entries(row[1:] for row in group), metadata)
+            exported += 1
+        print(f"💾 Выгружено категорий: {exported} в {output_dir}")
+        return exported
+
+    def export_dat(self, output_file_path="repacked_L10NString_RU.dat", encoding_policy="flag"):
+        """
+        Собирает бинарный файл из переводов базы в порядке .dat
+        (записи без перевода пропускаются, как в create_binary_from_po).
+        """
+        table = localization_tool.RecordTable()
+        rows = self.connection.execute(
+            "SELECT key, value, key_type, translation, translation_type FROM records " + _RECORD_ORDER
+        )
+        for key, value, key_type, translation, translation_type in rows:
+            table.append(key, value, key_type, translation, translation_type)
+
+        stats = localization_tool._new_pack_stats()
+        try:
+            written, file_size = localization_tool.write_dat_stream(
+                localization_tool._iter_pack_items(table, stats, encoding_policy), output_file_path, len(table)
+            )
+        except Exception as e:
+            print(f"\n❌ Ошибка при записи в файл: {e}")
+            return None
+
+        print(f"\n✅ Успешно записано в бинарный файл: {output_file_path}")
+        print(f"   Записей упаковано: {written} (пропущено с пустым переводом: {stats['empty']})")
+        print(f"   Общий размер файла: {file_size} байт ({file_size:X} HEX)")
+        localization_tool._print_encoding_savings(stats)
+        return written
+
+# --- РЕЖИМЫ РАБОТЫ ---
+
+def _ask_store_path():
+    path = input(f"Путь к базе переводов (Enter - {DEFAULT_STORE_PATH}): ").strip().strip('"')
+    return path or DEFAULT_STORE_PATH
+
+def storeimportdat():
+    STORE_PATH = _ask_store_path()
+    DAT_PATH = input("Введите путь к оригинальному бинарному файлу (L10NString.dat): ").strip().strip('"')
+    PATCH_NAME = input("Название патча (Enter - имя файла и дата): ").strip()
+
+    with TranslationStore(STORE_PATH) as store:
+        store.import_dat(DAT_PATH, PATCH_NAME or None)
+
+def storeimportpo():
+    STORE_PATH = _ask_store_path()
+    PO_PATH = input("Введите путь к PO-файлу или директории с PO-файлами: ").strip().strip('"')
+
+    with TranslationStore(STORE_PATH) as store:
+        store.import_po(PO_PATH)
+
+def storeexportpo():
+    STORE_PATH = _ask_store_path()
+    OUTPUT_DIR = input("Директория для PO-файлов категорий (Enter - po_categories): ").strip().strip('"') or "po_categories"
+
+    with TranslationStore(STORE_PATH) as store:
+        store.export_po_categories(OUTPUT_DIR)
+
+def storeexportdat():
+    STORE_PATH = _ask_store_path()
+    OUTPUT_BIN_PATH = "repacked_L10NString_RU.dat"
+    ENCODING_POLICY = localization_tool.ask_encoding_policy()
+
+    with TranslationStore(STORE_PATH) as store:
+        store.export_dat(OUTPUT_BIN_PATH, ENCODING_POLICY)
+
+def storeuntranslated():
+    STORE_PATH = _ask_store_path()
+    CATEGORY = input("Категория (например, QuestString; Enter - все): ").strip()
+
+    with TranslationStore(STORE_PATH) as store:
+        rows = store.untranslated(CATEGORY or None)
+    print(f"📝 Без перевода: {len(rows)}")
+    for key, value in rows[:20]:
+        print(f"🔑 {key}: '{value}'")
+
+def storechanged():
+    STORE_PATH = _ask_store_path()
+
+    with TranslationStore(STORE_PATH) as store:
+        for patch_id, name, imported_at in store.patches():
+            print(f"  {patch_id}. {name} ({imported_at})")
+        PATCH_NAME = input("Название патча, после которого искать изменения: ").strip()
+        rows = store.changed_since(PATCH_NAME)
+    if rows is None:
+        print(f"❌ Патч '{PATCH_NAME}' не найден.")
+        return
+    print(f"🔄 Изменено записей: {len(rows)}")
+    for key, previous_value, value in rows[:20]:
+        print(f"🔑 {key}: '{previous_value}' -> '{value}'" if previous_value is not None else f"🔑 {key} (новая): '{value}'")
+
+def storesearch():
+    STORE_PATH = _ask_store_path()
+    TEXT = input("Подстрока для поиска в Value и переводах: ").strip()
+
+    with TranslationStore(STORE_PATH) as store:
+        rows = store.find_substring(TEXT)
+    print(f"🔍 Найдено (не более {DEFAULT_SEARCH_LIMIT}): {len(rows)}")
+    for key, value, translation in rows:
+        print(f"🔑 {key}: '{value}' -> '{translation}'")
+
+if __name__ == '__main__':
+    print("--- ХРАНИЛИЩЕ ПЕРЕВОДОВ AION2 ---")
+    mode = input("Выберите режим (1-ImportDat, 2-ImportPo, 3-ExportPo, 4-ExportDat, 5-Untranslated, 6-ChangedSince, 7-Search): ")
+
+    if mode == "1":
+        storeimportdat()
+    elif mode == "2":
+        storeimportpo()
+    elif mode == "3":
+        storeexportpo()
+    elif mode == "4":
+        storeexportdat()
+    elif mode == "5":
+        storeuntranslated()
+    elif mode == "6":
+        storechanged()
+    elif mode == "7":
+        storesearch()
+    else:
+        print("Неверный режим. Пожалуйста, введите число от 1 до 7.")
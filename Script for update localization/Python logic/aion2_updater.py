@@ -1,15 +1,41 @@
 import os
 import json
+import zlib
+import struct
+import hashlib
+import threading
+import concurrent.futures
+import asyncio
+import urllib.parse
 import requests
 
 # ----------------------------------------------------
 # 1. КОНФИГУРАЦИЯ
 # ----------------------------------------------------
 CONFIG_FILE = "aion2_path.json"
+# ETag/Last-Modified и SHA-256 установленного файла для условных запросов
+STATE_FILE = "aion2_update_state.json"
 DOWNLOAD_URL = "https://github.com/Holastor/AION-2-Localization/raw/refs/heads/main/Localization%20pak%20file/pakchunk502000-Windows_9999_P.pak"
 TARGET_FILENAME = "pakchunk502000-Windows_9999_P.pak"
 # Относительный путь, куда должен быть помещен файл внутри папки игры
 TARGET_SUBPATH = os.path.join("Aion2", "Content", "Paks", "L10N", "Text", "en-US")
+# Манифест хешей блоков для дельта-обновления (создаётся pak_tool.py, режим PakManifest)
+MANIFEST_URL = DOWNLOAD_URL + ".manifest.json"
+MANIFEST_VERSION = 2
+# Соседние недостающие блоки с разрывом меньше этого скачиваются одним запросом
+RANGE_MERGE_GAP = 16 * 1024
+# Заголовок L10NString.dat перед записями (как в pak_tool.py)
+DAT_HEADER_SIZE = 14
+REQUEST_TIMEOUT = 60
+# Параллельная докачка по частям: размер части, число соединений, повторы части
+DOWNLOAD_SEGMENT_SIZE = 256 * 1024
+DOWNLOAD_WORKERS = 4
+SEGMENT_RETRIES = 3
+# Манифест релиза: список всех файлов локализации (паки, шрифты, другие языки)
+RELEASE_MANIFEST_URL = "https://github.com/Holastor/AION-2-Localization/raw/refs/heads/main/Localization%20pak%20file/release.json"
+RELEASE_MANIFEST_VERSION = 1
+# Сколько файлов релиза скачивается одновременно
+MAX_PARALLEL_ARTIFACTS = 3
 
 def load_game_path():
     """Загружает сохраненный путь к игре из JSON-файла."""
@@ -54,6 +80,689 @@ def get_game_path(saved_path):
         else:
             print("⛔️ Ошибка: Путь не может быть пустым. Попробуйте еще раз.")
 
+def load_update_state():
+    """Загружает сведения о последнем установленном файле (ETag, Last-Modified, SHA-256)."""
+    if os.path.exists(STATE_FILE):
+        try:
+            with open(STATE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError):
+            pass
+    return {}
+
+def save_update_state(state):
+    """Сохраняет сведения об установленном файле (через временный файл)."""
+    temp_path = STATE_FILE + ".tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=4, ensure_ascii=False)
+        os.replace(temp_path, STATE_FILE)
+    except OSError as e:
+        print(f"⚠️ Не удалось сохранить {STATE_FILE}: {e}")
+
+def conditional_headers(state, target_file):
+    """
+    Заголовки If-None-Match/If-Modified-Since - только если установленный файл
+    совпадает с тем, что был скачан (его не заменил патч игры или пользователь).
+    """
+    if not state.get("sha256") or not os.path.exists(target_file):
+        return {}
+    if sha256_file(target_file) != state["sha256"]:
+        return {}
+
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+def make_update_state(response, target_file, sha256):
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": sha256,
+        "target_file": target_file,
+    }
+
+def stream_to_file(response, target_file, progress=None):
+    """
+    Пишет тело ответа во временный файл рядом с целевым, считая SHA-256 на лету,
+    и только после полного скачивания атомарно заменяет целевой файл.
+    progress(число байт) вызывается после каждого записанного куска.
+    Возвращает SHA-256 записанного файла.
+    """
+    temp_file = target_file + ".part"
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(temp_file, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    written += len(chunk)
+                    if progress:
+                        progress(len(chunk))
+
+        expected_size = response.headers.get("Content-Length")
+        if expected_size is not None and response.headers.get("Content-Encoding") is None \
+                and int(expected_size) != written:
+            raise IOError(f"скачано {written} байт из {expected_size}, передача прервана")
+        os.replace(temp_file, target_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return digest.hexdigest()
+
+def supports_ranges(response):
+    """Можно ли качать файл частями: известен размер, сервер принимает Range, тело не сжато."""
+    return (response.headers.get("Accept-Ranges", "").lower() == "bytes"
+            and response.headers.get("Content-Length") is not None
+            and response.headers.get("Content-Encoding") is None)
+
+class _PartFile:
+    """
+    Запись частей в заранее выделенный .part-файл по смещениям.
+    os.pwrite (Linux/macOS) пишет через один дескриптор без общей позиции;
+    на Windows, где его нет, у каждого потока свой дескриптор и seek+write.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        mode = 'r+b' if os.path.exists(path) and os.path.getsize(path) == size else 'wb'
+        with open(path, mode) as f:
+            f.truncate(size)
+        self._use_pwrite = hasattr(os, 'pwrite')
+        self._fd = os.open(path, os.O_RDWR | getattr(os, 'O_BINARY', 0)) if self._use_pwrite else None
+        self._local = threading.local()
+        self._handles = []
+        self._lock = threading.Lock()
+
+    def write(self, offset, data):
+        if self._use_pwrite:
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(self._fd, view, offset)
+                view = view[written:]
+                offset += written
+            return
+
+        handle = getattr(self._local, 'handle', None)
+        if handle is None:
+            handle = open(self.path, 'r+b')
+            self._local.handle = handle
+            with self._lock:
+                self._handles.append(handle)
+        handle.seek(offset)
+        handle.write(data)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        for handle in self._handles:
+            handle.close()
+        self._handles = []
+
+def _load_segment_map(map_file, url, size, etag):
+    """Номера уже скачанных частей, если .part.json относится к той же версии файла."""
+    try:
+        with open(map_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return set()
+    if (saved.get("url"), saved.get("size"), saved.get("etag"), saved.get("segment_size")) != \
+            (url, size, etag, DOWNLOAD_SEGMENT_SIZE):
+        return set()
+    return set(saved.get("done", []))
+
+def _save_segment_map(map_file, url, size, etag, done):
+    temp_path = map_file + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"url": url, "size": size, "etag": etag, "segment_size": DOWNLOAD_SEGMENT_SIZE,
+                   "done": sorted(done)}, f)
+    os.replace(temp_path, map_file)
+
+def ranged_download(url, target_file, size, etag=None, expected_sha256=None, workers=DOWNLOAD_WORKERS,
+                    progress=None):
+    """
+    Скачивает файл частями по DOWNLOAD_SEGMENT_SIZE через HTTP Range в несколько
+    соединений (пул потоков, у каждого потока своя requests.Session с keep-alive).
+    Части пишутся по своим смещениям в заранее выделенный <файл>.part, список
+    готовых частей хранится в <файл>.part.json. Если передача прервалась,
+    следующий запуск докачивает только недостающие части (при том же ETag).
+
+    После проверки SHA-256 (если передан expected_sha256) .part атомарно
+    заменяет целевой файл. progress(число байт) вызывается после каждой части,
+    без него прогресс печатается по частям. Возвращает SHA-256 файла.
+    """
+    part_file = target_file + ".part"
+    map_file = part_file + ".json"
+    segment_count = max(1, -(-size // DOWNLOAD_SEGMENT_SIZE))
+
+    done = _load_segment_map(map_file, url, size, etag) if os.path.exists(part_file) else set()
+    pending = [index for index in range(segment_count) if index not in done]
+    if done and progress:
+        progress(min(size, len(done) * DOWNLOAD_SEGMENT_SIZE))
+    if done:
+        print(f"⏯️ Продолжение прерванной загрузки: готово {len(done)} из {segment_count} частей")
+
+    sessions = threading.local()
+    opened_sessions = []
+    lock = threading.Lock()
+
+    def fetch_segment(index):
+        start = index * DOWNLOAD_SEGMENT_SIZE
+        end = min(size, start + DOWNLOAD_SEGMENT_SIZE)
+        headers = {"Range": f"bytes={start}-{end - 1}"}
+        if etag and not etag.startswith("W/"):
+            # Если файл на сервере сменился, вместо части придёт 200 - не смешиваем версии
+            headers["If-Range"] = etag
+
+        session = getattr(sessions, 'session', None)
+        if session is None:
+            session = sessions.session = requests.Session()
+            with lock:
+                opened_sessions.append(session)
+
+        for attempt in range(1, SEGMENT_RETRIES + 1):
+            try:
+                response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise IOError("сервер вернул файл целиком вместо части (файл изменился или Range не поддерживается)")
+                if len(response.content) != end - start:
+                    raise requests.exceptions.ContentDecodingError(
+                        f"часть {index}: получено {len(response.content)} байт из {end - start}")
+                part.write(start, response.content)
+                break
+            except requests.exceptions.RequestException:
+                if attempt == SEGMENT_RETRIES:
+                    raise
+
+        with lock:
+            done.add(index)
+            _save_segment_map(map_file, url, size, etag, done)
+            if progress:
+                progress(end - start)
+            else:
+                print(f"\r   Скачано частей: {len(done)}/{segment_count}", end="", flush=True)
+
+    part = _PartFile(part_file, size)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(fetch_segment, index) for index in pending]
+        # Ждём с таймаутом, чтобы Ctrl+C срабатывал сразу; первая ошибка пробрасывается
+        while futures:
+            finished, futures = concurrent.futures.wait(futures, timeout=1,
+                                                        return_when=concurrent.futures.FIRST_EXCEPTION)
+            for future in finished:
+                future.result()
+    finally:
+        # При ошибке или Ctrl+C ещё не начатые части отменяются, дожидаемся только
+        # уже идущих; готовые части сохранены в карте и будут докачаны в следующий раз
+        executor.shutdown(wait=True, cancel_futures=True)
+        for session in opened_sessions:
+            session.close()
+        part.close()
+    if not progress:
+        print()
+
+    sha256 = sha256_file(part_file)
+    if expected_sha256 and sha256 != expected_sha256:
+        for path in (part_file, map_file):
+            if os.path.exists(path):
+                os.remove(path)
+        raise IOError("контрольная сумма скачанного файла не совпала, загрузка будет начата заново")
+    os.replace(part_file, target_file)
+    if os.path.exists(map_file):
+        os.remove(map_file)
+    return sha256
+
+def sha256_file(path):
+    """SHA-256 файла, читаемого по частям."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def manifest_matches_response(manifest, response):
+    """
+    Описывает ли манифест тот файл, что сервер отдаёт сейчас. Манифест и .pak
+    публикуются отдельными файлами, и кэш сервера может отдать старый манифест
+    вместе с новым .pak - такой манифест нельзя использовать ни для дельты,
+    ни для проверки контрольной суммы.
+    """
+    size = response.headers.get("Content-Length")
+    if size is None or response.headers.get("Content-Encoding") is not None:
+        return False
+    return int(size) == manifest["size"]
+
+def fetch_delta_manifest(manifest_url=MANIFEST_URL):
+    """Скачивает манифест дельта-обновления. None, если его нет или он не читается."""
+    try:
+        response = requests.get(manifest_url, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        manifest = response.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def _dat_field_size(length_signed):
+    return length_signed if length_signed >= 0 else -length_signed * 2
+
+def dat_chunks(data, min_size, max_size, mask):
+    """
+    Делит содержимое .dat на куски по содержимому: (смещение, длина) подряд от начала.
+    Копия pak_tool.dat_chunks - правила разбиения должны совпадать.
+    """
+    view = memoryview(data)
+    size = len(view)
+    chunks = []
+    start = 0
+    pos = min(DAT_HEADER_SIZE, size)
+    while pos + 4 <= size:
+        key_size = _dat_field_size(struct.unpack_from('<i', view, pos)[0])
+        key_end = pos + 4 + key_size
+        if key_size <= 0 or key_end + 4 > size:
+            break
+        record_end = key_end + 4 + _dat_field_size(struct.unpack_from('<i', view, key_end)[0])
+        if record_end > size or record_end <= key_end:
+            break
+        key = view[pos + 4 : key_end]
+        pos = record_end
+        length = pos - start
+        if length >= max_size or (length >= min_size and zlib.crc32(key) & mask == 0):
+            chunks.append((start, length))
+            start = pos
+    while start < size:
+        length = min(max_size, size - start)
+        chunks.append((start, length))
+        start += length
+    return chunks
+
+def _short_hash(data, length):
+    return hashlib.sha256(data).hexdigest()[:length]
+
+def read_local_dat(pak_file):
+    """
+    Распаковывает .dat из установленного .pak, собранного pak_tool.py
+    (заголовок записи в начале файла, блоки zlib подряд). None, если
+    .pak устроен иначе - тогда он скачивается целиком.
+    """
+    try:
+        with open(pak_file, 'rb') as f:
+            header = f.read(8 + 8 + 8 + 4 + 20 + 4)
+            _, _, uncompressed_size, method_slot = struct.unpack_from('<QQQI', header)
+            block_count = struct.unpack_from('<i', header, 48)[0]
+            if method_slot == 0 or not 0 < block_count <= uncompressed_size:
+                return None
+            blocks = struct.unpack(f'<{block_count * 2}q', f.read(block_count * 16))
+            dat = bytearray()
+            for start, end in zip(blocks[::2], blocks[1::2]):
+                f.seek(start)
+                dat += zlib.decompress(f.read(end - start))
+    except (OSError, struct.error, zlib.error, ValueError, MemoryError):
+        return None
+    return dat if len(dat) == uncompressed_size else None
+
+def _merge_ranges(ranges):
+    """Сливает отсортированные диапазоны [начало, конец) с разрывом меньше RANGE_MERGE_GAP."""
+    merged = []
+    for start, end in ranges:
+        if merged and start - merged[-1][1] <= RANGE_MERGE_GAP:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def _fetch_range(url, start, end):
+    """Скачивает байты [start, end) новой версии через HTTP Range."""
+    response = requests.get(url, headers={"Range": f"bytes={start}-{end - 1}"},
+                            timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    if response.status_code != 206 or len(response.content) != end - start:
+        raise IOError("сервер не поддерживает докачку частей файла (HTTP Range)")
+    return response.content
+
+def _fetch_pieces(url, pieces):
+    """
+    Скачивает куски новой версии {ключ: (начало, конец)}, объединяя соседние
+    в общие Range-запросы. Возвращает {ключ: байты} и число скачанных байт.
+    """
+    ranges = _merge_ranges(sorted(pieces.values()))
+    fetched = [(start, _fetch_range(url, start, end)) for start, end in ranges]
+    result = {}
+    for name, (start, end) in pieces.items():
+        for range_start, data in fetched:
+            if range_start <= start and end <= range_start + len(data):
+                result[name] = data[start - range_start : end - range_start]
+                break
+    return result, sum(end - start for start, end in ranges)
+
+def delta_update(target_file, manifest, url=None, output_file=None):
+    """
+    Обновляет установленный .pak по манифесту. Дельта считается по несжатому
+    .dat: он распаковывается из установленного .pak и делится на куски по
+    содержимому, совпадающие с новой версией куски берутся с диска, а по
+    HTTP Range с url (по умолчанию DOWNLOAD_URL) докачиваются только сжатые
+    блоки, покрывающие недостающие, плюс заголовок записи и индекс .pak.
+    Остальные блоки сжимаются заново на месте. Результат собирается во
+    временном файле, проверяется по SHA-256 и только потом заменяет
+    output_file (по умолчанию - сам target_file).
+
+    Возвращает True, если файл обновлён (или уже актуален), False - если дельта
+    невозможна и нужно скачать файл целиком.
+    """
+    if not os.path.exists(target_file):
+        return False
+
+    if sha256_file(target_file) == manifest["sha256"]:
+        print("✅ Установлена актуальная версия, скачивание не требуется.")
+        return True
+
+    if manifest["compression_level"] is None:
+        print("ℹ️ Уровень сжатия нового файла неизвестен, будет скачан весь файл.")
+        return False
+
+    local_dat = read_local_dat(target_file)
+    if local_dat is None:
+        print("ℹ️ Установленный файл не удалось распаковать, будет скачан весь файл.")
+        return False
+
+    url = url or DOWNLOAD_URL
+    dat_info = manifest["dat"]
+    chunking = dat_info["chunking"]
+    block_size = manifest["block_size"]
+    hash_length = len(dat_info["chunks"][0][1]) if dat_info["chunks"] else 0
+
+    local_chunks = {}
+    for offset, length in dat_chunks(local_dat, chunking["min_size"], chunking["max_size"], chunking["mask"]):
+        chunk_hash = _short_hash(memoryview(local_dat)[offset : offset + length], hash_length)
+        local_chunks.setdefault((length, chunk_hash), offset)
+
+    # Куски новой версии: совпавшие копируются, для остальных нужны покрывающие их блоки
+    new_dat = bytearray(dat_info["size"])
+    missing_blocks = set()
+    offset = 0
+    for length, chunk_hash in dat_info["chunks"]:
+        local_offset = local_chunks.get((length, chunk_hash))
+        if local_offset is not None:
+            new_dat[offset : offset + length] = local_dat[local_offset : local_offset + length]
+        else:
+            missing_blocks.update(range(offset // block_size, (offset + length - 1) // block_size + 1))
+        offset += length
+    del local_dat
+
+    block_ranges = []
+    position = manifest["head"]
+    for length, _ in manifest["blocks"]:
+        block_ranges.append((position, position + length))
+        position += length
+    tail = (position, manifest["size"])
+
+    pieces = {"head": (0, manifest["head"]), "tail": tail}
+    pieces.update((index, block_ranges[index]) for index in missing_blocks)
+    fetched, download_size = _fetch_pieces(url, pieces)
+
+    compressed = {}
+    for index in missing_blocks:
+        block = fetched[index]
+        if _short_hash(block, hash_length) != manifest["blocks"][index][1]:
+            raise IOError(f"блок {index} не совпал с манифестом")
+        compressed[index] = block
+        raw = zlib.decompress(block)
+        new_dat[index * block_size : index * block_size + len(raw)] = raw
+
+    view = memoryview(new_dat)
+    offset = 0
+    for length, chunk_hash in dat_info["chunks"]:
+        if _short_hash(view[offset : offset + length], hash_length) != chunk_hash:
+            raise IOError(f"кусок .dat по смещению {offset} не совпал с манифестом")
+        offset += length
+    if hashlib.sha256(new_dat).hexdigest() != dat_info["sha256"]:
+        raise IOError("контрольная сумма собранного .dat не совпала с манифестом")
+
+    # Остальные блоки сжимаются заново; если zlib дал другой результат - блок докачивается
+    level = manifest["compression_level"]
+    local_blocks = [index for index in range(len(block_ranges)) if index not in compressed]
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        recompressed = executor.map(lambda index: zlib.compress(view[index * block_size : (index + 1) * block_size], level),
+                                    local_blocks)
+        mismatched = []
+        for index, block in zip(local_blocks, recompressed):
+            if _short_hash(block, hash_length) == manifest["blocks"][index][1]:
+                compressed[index] = block
+            else:
+                mismatched.append(index)
+    if mismatched:
+        refetched, size = _fetch_pieces(url, {index: block_ranges[index] for index in mismatched})
+        download_size += size
+        for index in mismatched:
+            if _short_hash(refetched[index], hash_length) != manifest["blocks"][index][1]:
+                raise IOError(f"блок {index} не совпал с манифестом")
+            compressed[index] = refetched[index]
+
+    print(f"🧩 Дельта-обновление: скачано {download_size} из {manifest['size']} байт "
+          f"(блоков {len(missing_blocks) + len(mismatched)} из {len(block_ranges)})")
+
+    output_file = output_file or target_file
+    temp_file = output_file + ".part"
+    new_hash = hashlib.sha256()
+    try:
+        with open(temp_file, 'wb') as new:
+            for data in [fetched["head"], *(compressed[index] for index in range(len(block_ranges))), fetched["tail"]]:
+                new_hash.update(data)
+                new.write(data)
+
+        if new_hash.hexdigest() != manifest["sha256"]:
+            raise IOError("контрольная сумма собранного файла не совпала с манифестом")
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+    print(f"\n🎉 Успех! Файл обновлён, скачано {download_size} байт вместо {manifest['size']}.")
+    return True
+
+# ----------------------------------------------------
+# МНОГОФАЙЛОВЫЙ РЕЛИЗ
+# ----------------------------------------------------
+
+def fetch_release_manifest():
+    """
+    Скачивает манифест релиза:
+        {"version": 1, "release": "...", "artifacts": [
+            {"name", "url", "size", "sha256", "target", ["delta_manifest"]}, ...]}
+    url и delta_manifest - относительно самого манифеста, target - путь
+    внутри папки игры через "/". None, если манифеста нет.
+    """
+    try:
+        response = requests.get(RELEASE_MANIFEST_URL, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        release = response.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+    if release.get("version") != RELEASE_MANIFEST_VERSION:
+        return None
+
+    for artifact in release["artifacts"]:
+        artifact["url"] = urllib.parse.urljoin(RELEASE_MANIFEST_URL, artifact["url"])
+        if artifact.get("delta_manifest"):
+            artifact["delta_manifest"] = urllib.parse.urljoin(RELEASE_MANIFEST_URL, artifact["delta_manifest"])
+    return release
+
+def release_matches_server(release):
+    """
+    Сверяет размер каждого файла релиза с ответом сервера на HEAD. release.json
+    публикуется отдельно от файлов и может отставать от них: с устаревшим
+    манифестом старая версия считается актуальной, а новая не проходит проверку
+    SHA-256. False, если хотя бы один файл не совпал или сервер не ответил.
+    """
+    for artifact in release["artifacts"]:
+        try:
+            response = requests.head(artifact["url"], allow_redirects=True, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ {artifact['name']}: не удалось проверить файл на сервере ({e})")
+            return False
+        size = response.headers.get("Content-Length")
+        if size is not None and response.headers.get("Content-Encoding") is None and int(size) != artifact["size"]:
+            print(f"⚠️ {artifact['name']}: размер на сервере {size} байт, в манифесте релиза {artifact['size']}")
+            return False
+    return True
+
+def _artifact_path(game_path, target):
+    """Путь файла релиза в папке игры; пути за пределы папки игры отклоняются."""
+    game_path = os.path.abspath(game_path)
+    path = os.path.abspath(os.path.join(game_path, *target.split("/")))
+    if os.path.commonpath([game_path, path]) != game_path:
+        raise ValueError(f"путь {target} указывает за пределы папки игры")
+    return path
+
+def _is_installed(artifact, target_file):
+    return (os.path.exists(target_file) and os.path.getsize(target_file) == artifact["size"]
+            and sha256_file(target_file) == artifact["sha256"])
+
+class _ReleaseProgress:
+    """Общий прогресс всех одновременно скачиваемых файлов."""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self._lock = threading.Lock()
+
+    def add(self, size):
+        with self._lock:
+            self.done = min(self.total, self.done + size)
+            print(f"\r   Скачано: {self.done / 1048576:.1f} из {self.total / 1048576:.1f} МБ", end="", flush=True)
+
+def fetch_artifact(artifact, target_file, staging_file, progress):
+    """
+    Скачивает один файл релиза в staging_file (целевой файл не трогается):
+    дельтой от установленной версии, если есть её манифест, иначе целиком.
+    """
+    if artifact.get("delta_manifest") and os.path.exists(target_file):
+        manifest = fetch_delta_manifest(artifact["delta_manifest"])
+        if manifest and manifest["sha256"] == artifact["sha256"]:
+            try:
+                if delta_update(target_file, manifest, artifact["url"], staging_file):
+                    progress(artifact["size"])
+                    return
+            except (requests.exceptions.RequestException, IOError) as e:
+                print(f"\n⚠️ {artifact['name']}: дельта-обновление не удалось ({e}), скачивается целиком.")
+
+    response = requests.get(artifact["url"], stream=True, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    if supports_ranges(response):
+        response.close()
+        ranged_download(artifact["url"], staging_file, int(response.headers["Content-Length"]),
+                        etag=response.headers.get("ETag"), expected_sha256=artifact["sha256"],
+                        progress=progress)
+        return
+
+    if stream_to_file(response, staging_file, progress) != artifact["sha256"]:
+        os.remove(staging_file)
+        raise IOError(f"{artifact['name']}: контрольная сумма не совпала с манифестом релиза")
+
+def commit_staged(staged):
+    """
+    Ставит все скачанные файлы на место разом: старые версии сначала уходят
+    в .bak, затем новые переименовываются в целевые. При любой ошибке
+    (например, файл занят запущенной игрой) всё возвращается как было.
+    """
+    backups = []
+    moved = []
+    try:
+        for target_file, staging_file in staged:
+            if os.path.exists(target_file):
+                os.replace(target_file, target_file + ".bak")
+                backups.append(target_file)
+        for target_file, staging_file in staged:
+            os.replace(staging_file, target_file)
+            moved.append(target_file)
+    except OSError:
+        for target_file in moved:
+            os.remove(target_file)
+        for target_file in backups:
+            os.replace(target_file + ".bak", target_file)
+        raise
+
+    for target_file in backups:
+        try:
+            os.remove(target_file + ".bak")
+        except OSError:
+            pass
+
+async def install_release(game_path, release):
+    """
+    Устанавливает релиз: проверяет, какие файлы устарели, скачивает их
+    одновременно (не больше MAX_PARALLEL_ARTIFACTS), и только если скачались
+    все - подменяет их разом. Возвращает True при успехе.
+    """
+    outdated = []
+    for artifact in release["artifacts"]:
+        try:
+            target_file = _artifact_path(game_path, artifact["target"])
+        except ValueError as e:
+            print(f"❌ Манифест релиза отклонён: {e}")
+            return False
+        if not await asyncio.to_thread(_is_installed, artifact, target_file):
+            outdated.append((artifact, target_file))
+
+    if not outdated:
+        print("\n✅ Все файлы релиза актуальны, скачивание не требуется.")
+        return True
+
+    print(f"\n🌐 Релиз {release.get('release', '')}: обновляются файлы ({len(outdated)} из {len(release['artifacts'])}):")
+    for artifact, target_file in outdated:
+        print(f"   {artifact['name']} -> {target_file}")
+
+    progress = _ReleaseProgress(sum(artifact["size"] for artifact, _ in outdated))
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_ARTIFACTS)
+
+    async def install(artifact, target_file):
+        async with semaphore:
+            os.makedirs(os.path.dirname(target_file), exist_ok=True)
+            staging_file = target_file + ".new"
+            await asyncio.to_thread(fetch_artifact, artifact, target_file, staging_file, progress.add)
+            return target_file, staging_file
+
+    results = await asyncio.gather(*(install(artifact, target_file) for artifact, target_file in outdated),
+                                   return_exceptions=True)
+    print()
+
+    staged = [result for result in results if not isinstance(result, BaseException)]
+    errors = [(artifact, result) for (artifact, _), result in zip(outdated, results) if isinstance(result, BaseException)]
+    if errors:
+        for artifact, error in errors:
+            print(f"❌ {artifact['name']}: {error}")
+        for _, staging_file in staged:
+            os.remove(staging_file)
+        print("   Ни один файл не был изменён. Запустите обновление ещё раз.")
+        return False
+
+    try:
+        commit_staged(staged)
+    except OSError as e:
+        for _, staging_file in staged:
+            if os.path.exists(staging_file):
+                os.remove(staging_file)
+        print(f"❌ Не удалось заменить файлы: {e}")
+        print("   Закройте игру и запустите обновление ещё раз. Ни один файл не был изменён.")
+        return False
+
+    print(f"\n🎉 Успех! Обновлено файлов: {len(staged)}.")
+    return True
+
 def download_and_update(game_path):
     """Скачивает файл локализации и помещает его в целевую папку."""
     
@@ -72,20 +781,49 @@ def download_and_update(game_path):
         print(f"   Проверьте права доступа или путь к игре: {game_path}")
         return
 
-    # 2. Скачивание файла
-    print(f"\n🌐 Запуск скачивания: {TARGET_FILENAME}")
+    print(f"\n🌐 Проверка обновления: {TARGET_FILENAME}")
     print(f"   Назначение: {target_file}")
-    
+
     try:
-        # Используем requests для скачивания
-        response = requests.get(DOWNLOAD_URL, stream=True)
+        # 2. Условный запрос: если файл на сервере не менялся, ответ 304 без тела
+        state = load_update_state()
+        headers = conditional_headers(state, target_file)
+        response = requests.get(DOWNLOAD_URL, headers=headers, stream=True, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            response.close()
+            print("\n✅ Файл на сервере не изменился, установлена актуальная версия.")
+            return
         response.raise_for_status() # Вызывает ошибку, если код ответа 4xx или 5xx
 
-        # Запись файла по частям
-        with open(target_file, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        # 3. Дельта-обновление: докачиваются только изменившиеся блоки.
+        #    Манифест устарел и не используется, если не совпадает с ответом по размеру
+        #    или описывает установленную версию, хотя сервер сообщил, что файл изменился.
+        manifest = fetch_delta_manifest() if os.path.exists(target_file) else None
+        if manifest and (not manifest_matches_response(manifest, response)
+                         or (headers and manifest["sha256"] == state["sha256"])):
+            print("ℹ️ Манифест не соответствует файлу на сервере, будет скачан весь файл.")
+            manifest = None
+        if manifest:
+            try:
+                if delta_update(target_file, manifest):
+                    response.close()
+                    # delta_update проверил установленный файл по SHA-256 манифеста
+                    save_update_state(make_update_state(response, target_file, manifest["sha256"]))
+                    return
+            except (requests.exceptions.RequestException, IOError) as e:
+                print(f"⚠️ Дельта-обновление не удалось ({e}), будет скачан весь файл.")
+
+        # 4. Скачивание файла целиком: во временный файл, затем атомарная замена.
+        #    Если сервер принимает Range - частями в несколько соединений с докачкой.
+        print("\n⬇️ Скачивание файла целиком...")
+        if supports_ranges(response):
+            response.close()
+            sha256 = ranged_download(DOWNLOAD_URL, target_file, int(response.headers["Content-Length"]),
+                                     etag=response.headers.get("ETag"),
+                                     expected_sha256=manifest["sha256"] if manifest else None)
+        else:
+            sha256 = stream_to_file(response, target_file)
+        save_update_state(make_update_state(response, target_file, sha256))
 
         print("\n🎉 Успех! Файл успешно скачан и обновлен.")
     except requests.exceptions.RequestException as e:
@@ -106,8 +844,15 @@ def main():
     game_path = get_game_path(saved_path)
 
     if game_path:
-        # 2. Скачиваем и обновляем
-        download_and_update(game_path)
+        # 2. Скачиваем и обновляем: по манифесту релиза, а без него - один пак
+        release = fetch_release_manifest()
+        if release and not release_matches_server(release):
+            print("⚠️ Манифест релиза устарел, обновляется только основной файл локализации.")
+            release = None
+        if release:
+            asyncio.run(install_release(game_path, release))
+        else:
+            download_and_update(game_path)
     
     input("\nГотово. Нажмите Enter для выхода...")
 